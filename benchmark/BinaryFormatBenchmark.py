@@ -0,0 +1,59 @@
+"""
+Benchmark for the binary files of the repositories
+Compares the pickled lines the binary repositories used to save with the struct-packed records they save now,
+loading and saving the same rentals and movies.
+
+Run from the project root:
+    python -m benchmark.BinaryFormatBenchmark [items]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from time import perf_counter
+
+from domain.Movie import Movie
+from domain.Rental import Rental
+from repository.MovieCollectionBinary import MovieCollectionBinary
+from repository.Persistence import PickleFile
+from repository.RentalHistoryBinary import RentalHistoryBinary
+
+ITEMS = 200000
+
+
+def measure(persistence, items):
+    start = perf_counter()
+    persistence.save(items)
+    save = perf_counter() - start
+    start = perf_counter()
+    persistence.load()
+    load = perf_counter() - start
+    return save, load, os.path.getsize(persistence.file_name)
+
+
+def main(count):
+    directory = tempfile.mkdtemp()
+    file_name = os.path.join(directory, 'items.bin')
+    first = date(2010, 1, 1)
+    cases = [
+        ('rentals', RentalHistoryBinary(file_name),
+         [Rental(str(i % 5000), str(i), first + timedelta(days=i % 3000), first + timedelta(days=i % 3000 + 7),
+                 first + timedelta(days=i % 3000 + 5) if i % 4 else None) for i in range(count)]),
+        ('movies', MovieCollectionBinary(file_name),
+         [Movie(str(i), 'Title ' + str(i), 'Description of movie ' + str(i), 'action, drama') for i in range(count)]),
+    ]
+    print('{} items'.format(count))
+    print('{:<10} {:<8} {:>14} {:>14} {:>10}'.format('items', 'format', 'save items/s', 'load items/s', 'MB'))
+    for name, repository, items in cases:
+        formats = [('pickle', PickleFile(file_name, repository.string_to_obj, repository.obj_to_string)),
+                   ('struct', repository.persistence)]
+        for format, persistence in formats:
+            save, load, size = measure(persistence, items)
+            print('{:<10} {:<8} {:>14.0f} {:>14.0f} {:>10.1f}'.format(name, format, count / save, count / load,
+                                                                      size / 2 ** 20))
+    os.remove(file_name)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ITEMS)
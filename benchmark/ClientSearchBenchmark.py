@@ -0,0 +1,55 @@
+"""
+Benchmark for the substring searches of ClientBase
+Compares scanning every client, as search_client_by_id and search_client_by_name used to, with the trigram indexes
+they use now, for queries matching few and many clients.
+
+Run from the project root:
+    python -m benchmark.ClientSearchBenchmark [clients]
+"""
+import sys
+import tracemalloc
+from random import choice, seed
+from time import perf_counter
+
+from domain.Client import Client
+from repository.ClientBase import ClientBase
+
+CLIENTS = 1000000
+SYLLABLES = ['an', 'dre', 'i', 'ma', 'ri', 'us', 'el', 'ion', 'ge', 'or', 'vla', 'dim', 'cris', 'ti', 'na', 'lu']
+REPEAT = 5
+
+
+def random_word(syllables):
+    return ''.join(choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+
+def main(count):
+    seed(1)
+    tracemalloc.start()
+    clients = ClientBase()
+    start = perf_counter()
+    clients.add_many(Client(str(i), random_word(3) + ' ' + random_word(4)) for i in range(count))
+    print('{} clients, loaded and indexed in {:.1f} s, {:.0f} MB'.format(
+        count, perf_counter() - start, tracemalloc.get_traced_memory()[0] / 2 ** 20))
+    tracemalloc.stop()
+    queries = [('id', '777777'), ('id', '4242'), ('id', '99'), ('name', 'vladimcris'), ('name', 'andreima'),
+               ('name', 'ion')]
+    print('{:<6} {:<12} {:>8} {:>10} {:>10}'.format('field', 'query', 'matches', 'scan ms', 'index ms'))
+    for field, query in queries:
+        if field == 'id':
+            scan = lambda: clients.query_clients().where(lambda client: client.id.find(query) != -1).all()
+            search = lambda: clients.search_client_by_id(query)
+        else:
+            scan = lambda: clients.query_clients().where(lambda client: client.name.lower().find(query) != -1).all()
+            search = lambda: clients.search_client_by_name(query)
+        timings = []
+        for run in (scan, search):
+            start = perf_counter()
+            for _ in range(REPEAT):
+                matches = len(run())
+            timings.append((perf_counter() - start) / REPEAT * 1000)
+        print('{:<6} {:<12} {:>8} {:>10.2f} {:>10.2f}'.format(field, query, matches, timings[0], timings[1]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS)
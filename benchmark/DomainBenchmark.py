@@ -0,0 +1,144 @@
+"""
+Benchmark for the domain classes
+Reports the bytes taken by every Client, Movie and Rental and the attribute reads per second, for the slot based
+classes and for the __dict__ and property based classes they replaced, which are kept below for comparison.
+
+Run from the project root:
+    python -m benchmark.DomainBenchmark [instances]
+"""
+import sys
+import tracemalloc
+from datetime import date
+from timeit import timeit
+
+from domain.Client import Client
+from domain.Movie import Movie
+from domain.Rental import Rental
+
+INSTANCES = 1000000
+
+
+class DictClient:
+    def __init__(self, id, name, worthy=True):
+        self._id = id
+        self._name = name
+        self._worthy = worthy
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def worthy(self):
+        return self._worthy
+
+
+class DictMovie:
+    def __init__(self, id='', title='', description='', genre=''):
+        self._id = id
+        self._title = title
+        self._description = description
+        self._genre = genre
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def title(self):
+        return self._title
+
+    @property
+    def description(self):
+        return self._description
+
+    @property
+    def genre(self):
+        return self._genre
+
+
+class DictRental:
+    def __init__(self, movie_id, client_id, rented_date, due_date, returned_date=None):
+        self._id = movie_id + client_id + str(rented_date) + str(due_date)
+        self._movie_id = movie_id
+        self._client_id = client_id
+        self._rented_date = rented_date
+        self._due_date = due_date
+        self._returned_date = returned_date
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def movie_id(self):
+        return self._movie_id
+
+    @property
+    def client_id(self):
+        return self._client_id
+
+    @property
+    def rented_date(self):
+        return self._rented_date
+
+    @property
+    def due_date(self):
+        return self._due_date
+
+    @property
+    def returned_date(self):
+        return self._returned_date
+
+
+RENTED = date(2020, 1, 1)
+DUE = date(2020, 1, 15)
+
+# name, class, function building instance i, attribute read in the throughput test
+CASES = [
+    ('Client', Client, lambda cls, i: cls('c', 'name', True), 'name'),
+    ('Movie', Movie, lambda cls, i: cls('m', 'title', 'description', 'genre'), 'title'),
+    ('Rental', Rental, lambda cls, i: cls('m', 'c', RENTED, DUE), 'movie_id'),
+    ('Rental dates', Rental, lambda cls, i: cls('m', 'c', RENTED, DUE), 'due_date'),
+]
+LEGACY = {Client: DictClient, Movie: DictMovie, Rental: DictRental}
+
+
+def bytes_per_object(cls, build, count):
+    """
+    Returns: the memory taken by every instance, measured over count instances sharing the same field values - float
+    """
+    tracemalloc.start()
+    objects = [build(cls, i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the objects is not part of their size
+    return size / len(objects) - 8
+
+
+def reads_per_second(cls, build, attribute, count):
+    """
+    Returns: how many times the attribute can be read per second, reading it from count instances - float
+    """
+    objects = [build(cls, i) for i in range(count)]
+    statement = 'for item in objects: item.' + attribute
+    seconds = timeit(statement, globals={'objects': objects}, number=1)
+    return count / seconds
+
+
+def main(count):
+    print('{} instances'.format(count))
+    print('{:<14} {:<8} {:>16} {:>18}'.format('class', 'layout', 'bytes per object', 'reads per second'))
+    for name, cls, build, attribute in CASES:
+        for layout, layout_cls in [('dict', LEGACY[cls]), ('slots', cls)]:
+            size = bytes_per_object(layout_cls, build, count)
+            speed = reads_per_second(layout_cls, build, attribute, count)
+            print('{:<14} {:<8} {:>16.1f} {:>18,.0f}'.format(name, layout, size, speed))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else INSTANCES)
@@ -0,0 +1,55 @@
+"""
+Benchmark for the fuzzy search of clients by name
+Compares computing the edit distance to every name with the BK-tree behind fuzzy_search_client_by_name.
+
+Run from the project root:
+    python -m benchmark.FuzzySearchBenchmark [clients]
+"""
+import sys
+from random import choice, randint, seed
+from time import perf_counter
+
+from domain.Client import Client
+from repository.BKTree import BKTree, edit_distance, normalise
+
+CLIENTS = 100000
+SYLLABLES = ['an', 'dre', 'i', 'ma', 'ri', 'us', 'el', 'ion', 'ge', 'or', 'vla', 'dim', 'cris', 'ti', 'na', 'lu']
+QUERIES = 20
+
+
+def random_name():
+    return ''.join(choice(SYLLABLES) for _ in range(randint(2, 4))).capitalize()
+
+
+def mistype(name):
+    position = randint(0, len(name) - 1)
+    return name[:position] + choice('aeiou') + name[position + 1:]
+
+
+def main(count):
+    seed(1)
+    clients = [Client(str(i), random_name() + ' ' + random_name()) for i in range(count)]
+    tree = BKTree(lambda client: client.name)
+    start = perf_counter()
+    tree.add_many(clients)
+    tree.search('', 0)
+    print('{} clients, {} distinct names, indexed in {:.1f} s'.format(count, len(tree._nodes), perf_counter() - start))
+    queries = [mistype(choice(clients).name) for _ in range(QUERIES)]
+    names = [(client.id, normalise(client.name)) for client in clients]
+    print('{:<14} {:>14} {:>14}'.format('max distance', 'scan ms', 'BK-tree ms'))
+    for max_distance in (1, 2):
+        start = perf_counter()
+        for query in queries:
+            query = normalise(query)
+            sorted((distance, id) for id, distance in
+                   ((id, edit_distance(query, name, max_distance)) for id, name in names) if distance <= max_distance)
+        scan = (perf_counter() - start) / len(queries) * 1000
+        start = perf_counter()
+        for query in queries:
+            tree.search(query, max_distance, 5)
+        search = (perf_counter() - start) / len(queries) * 1000
+        print('{:<14} {:>14.1f} {:>14.1f}'.format(max_distance, scan, search))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS)
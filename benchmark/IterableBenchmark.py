@@ -0,0 +1,81 @@
+"""
+Benchmark for the Iterable data structure
+Measures the average latency of append, lookup, replace and delete for growing collection sizes.
+With the id index every operation should take about the same time, whatever the size of the collection.
+
+Run from the project root:
+    python -m benchmark.IterableBenchmark [size ...]
+"""
+import sys
+from random import sample
+from time import perf_counter
+
+from domain.Client import Client
+from repository.Iterable import Iterable
+
+SIZES = [1000, 10000, 100000, 1000000]
+OPERATIONS = 1000
+
+
+def build(size):
+    """
+    Builds an Iterable holding size clients
+    Args:
+        size: number of clients - int
+
+    Returns: the filled Iterable and the time spent per append in microseconds - (Iterable, float)
+
+    """
+    clients = [Client(str(i), 'client' + str(i)) for i in range(size)]
+    it = Iterable()
+    start = perf_counter()
+    for client in clients:
+        it.append(client)
+    elapsed = perf_counter() - start
+    return it, elapsed / size * 1e6
+
+
+def time_per_operation(function, keys):
+    """
+    Calls the function once for every key
+    Returns: the average time per call in microseconds - float
+    """
+    start = perf_counter()
+    for key in keys:
+        function(key)
+    elapsed = perf_counter() - start
+    return elapsed / len(keys) * 1e6
+
+
+def run(size):
+    """
+    Runs the benchmark for a collection of the given size
+    Returns: the average latency of every operation in microseconds - dict
+    """
+    it, append_time = build(size)
+    keys = [str(i) for i in sample(range(size), min(OPERATIONS, size))]
+
+    def replace(key):
+        it[key] = Client(key, 'replaced')
+
+    def delete(key):
+        del it[key]
+
+    return {
+        'append': append_time,
+        'lookup': time_per_operation(it.find_item_by_id, keys),
+        'replace': time_per_operation(replace, keys),
+        'delete': time_per_operation(delete, keys),
+    }
+
+
+def main(sizes):
+    print('{:>10} {:>12} {:>12} {:>12} {:>12}'.format('size', 'append us', 'lookup us', 'replace us', 'delete us'))
+    for size in sizes:
+        result = run(size)
+        print('{:>10} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f}'.format(
+            size, result['append'], result['lookup'], result['replace'], result['delete']))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or SIZES)
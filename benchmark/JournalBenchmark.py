@@ -0,0 +1,49 @@
+"""
+Benchmark for saving the text rental history after every change
+Compares rewriting the whole file, as before the journal, with appending the change to the journal.
+
+Run from the project root:
+    python -m benchmark.JournalBenchmark [rentals]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from time import perf_counter
+
+from domain.Rental import Rental
+from repository.Persistence import TextFile
+from repository.RentalHistoryText import RentalHistoryText
+
+RENTALS = 200000
+RETURNS = 20
+
+
+def main(count):
+    directory = tempfile.mkdtemp()
+    file_name = os.path.join(directory, 'rentals.txt')
+    first = date(2010, 1, 1)
+    rentals = [Rental(str(i % 5000), str(i), first + timedelta(days=i % 3000), first + timedelta(days=i % 3000 + 7))
+               for i in range(count)]
+    print('{} rentals, {} returns'.format(count, RETURNS))
+    print('{:<14} {:>12} {:>14}'.format('persistence', 'ms/return', 'load s'))
+    for name in ('rewrite', 'journal'):
+        history = RentalHistoryText(file_name)
+        if name == 'rewrite':
+            history.persistence = TextFile(file_name, history.string_to_obj, history.obj_to_string)
+        history.add_many(rentals)
+        history.save_file()
+        start = perf_counter()
+        for rental in rentals[:RETURNS]:
+            history.update_rental_returned_date(rental.id, rental.due_date)
+        returns = (perf_counter() - start) / RETURNS * 1000
+        start = perf_counter()
+        RentalHistoryText(file_name).load_file()
+        print('{:<14} {:>12.3f} {:>14.2f}'.format(name, returns, perf_counter() - start))
+        for file in os.listdir(directory):
+            os.remove(os.path.join(directory, file))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
@@ -0,0 +1,44 @@
+"""
+Benchmark for searching movies by title
+Compares the substring scan of search_movie_by_title with the word index behind search_movie_by_words.
+
+Run from the project root:
+    python -m benchmark.MovieSearchBenchmark [movies]
+"""
+import sys
+from random import choice, randint, seed
+from time import perf_counter
+
+from domain.Movie import Movie
+from repository.MovieCollection import MovieCollection
+
+MOVIES = 500000
+VOCABULARY = 20000
+QUERIES = 50
+
+
+def main(count):
+    seed(1)
+    words = ['w' + str(i) for i in range(VOCABULARY)]
+    collection = MovieCollection()
+    start = perf_counter()
+    collection.add_many(Movie(str(i), ' '.join(choice(words) for _ in range(randint(1, 4))), '', '')
+                        for i in range(count))
+    print('{} movies, indexed in {:.1f} s'.format(count, perf_counter() - start))
+    queries = [choice(words) + ' ' + choice(words) for _ in range(QUERIES)]
+    cases = [
+        ('substring, one word', lambda query: collection.search_movie_by_title(query.split()[0])),
+        ('words, one word', lambda query: collection.search_movie_by_words('title', query.split()[0])),
+        ('words, AND', lambda query: collection.search_movie_by_words('title', query)),
+        ('words, OR', lambda query: collection.search_movie_by_words('title', query, False)),
+    ]
+    print('{:<22} {:>12}'.format('search', 'ms per query'))
+    for name, search in cases:
+        start = perf_counter()
+        for query in queries:
+            search(query)
+        print('{:<22} {:>12.3f}'.format(name, (perf_counter() - start) / len(queries) * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES)
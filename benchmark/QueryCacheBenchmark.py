@@ -0,0 +1,64 @@
+"""
+Benchmark for the query cache
+Repeats the same searches and statistics between mutations, with the cache disabled and enabled.
+
+Run from the project root:
+    python -m benchmark.QueryCacheBenchmark [movies]
+"""
+import sys
+from datetime import date
+from random import choice, randint, seed
+from time import perf_counter
+
+from domain.Client import Client
+from domain.Movie import Movie
+from domain.Rental import Rental
+from repository.ClientBase import ClientBase
+from repository.MovieCollection import MovieCollection
+from repository.RentalHistory import RentalHistory
+from service.StatisticsService import StatisticsService
+
+MOVIES = 100000
+REPEATS = 20
+GENRES = ['action', 'animation', 'adventure', 'comedy', 'drama', 'horror']
+
+
+def build(count):
+    seed(1)
+    movies = MovieCollection()
+    movies.add_many(Movie(str(i), 'title ' + str(i), 'description ' + str(i),
+                          ', '.join({choice(GENRES) for _ in range(randint(1, 3))})) for i in range(count))
+    clients = ClientBase()
+    clients.add_many(Client(str(i), 'client ' + str(i)) for i in range(count // 10))
+    rentals = RentalHistory()
+    rentals.add_many(Rental(str(i), str(i % (count // 10)), date(2020, 1, 1), date(2020, 1, 10),
+                            date(2020, 1, randint(2, 20))) for i in range(count))
+    return StatisticsService(clients, movies, rentals)
+
+
+def main(count):
+    service = build(count)
+    cases = [
+        ('search_movie_by_description', lambda: service.movie_repo.search_movie_by_description('ption 12')),
+        ('search_movie_by_genre', lambda: service.movie_repo.search_movie_by_genre('drama')),
+        ('most_rented_movies', lambda: service.most_rented_movies(10)),
+        ('most_active_clients', lambda: service.most_active_clients(10)),
+    ]
+    print('{} movies, {} repeats'.format(count, REPEATS))
+    print('{:<30} {:>12} {:>12}'.format('query', 'no cache ms', 'cache ms'))
+    for name, query in cases:
+        timings = []
+        for size in (0, 128):
+            service.cache.size = size
+            service.movie_repo.cache.size = size
+            start = perf_counter()
+            for _ in range(REPEATS):
+                query()
+            timings.append((perf_counter() - start) / REPEATS * 1000)
+        print('{:<30} {:>12.3f} {:>12.3f}'.format(name, *timings))
+    print('statistics', service.cache.info())
+    print('movies', service.movie_repo.cache.info())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MOVIES)
@@ -0,0 +1,69 @@
+"""
+Benchmark for the memory-mapped rental history
+Compares the binary rental history, loaded whole, with the mapped one, opened without reading the rentals:
+the time until the first rental is served, a rent and a return, and the first query needing the indexes.
+
+Run from the project root:
+    python -m benchmark.RentalFileBenchmark [rentals]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from time import perf_counter
+
+from domain.Rental import Rental
+from repository.RentalHistoryBinary import RentalHistoryBinary
+from repository.RentalHistoryMapped import RentalHistoryMapped
+
+RENTALS = 200000
+
+
+def main(count):
+    directory = tempfile.mkdtemp()
+    first = date(2010, 1, 1)
+    rentals = [Rental(str(i % 5000), str(i), first + timedelta(days=i % 3000), first + timedelta(days=i % 3000 + 7))
+               for i in range(count)]
+    rental = rentals[count // 2]
+    print('{} rentals'.format(count))
+    print('{:<8} {:>10} {:>16} {:>10} {:>12} {:>14}'.format('history', 'open ms', 'first find ms', 'rent ms',
+                                                             'return ms', 'first query s'))
+    for name, history_class in (('binary', RentalHistoryBinary), ('mapped', RentalHistoryMapped)):
+        file_name = os.path.join(directory, 'rentals.' + name)
+        history = history_class(file_name)
+        history.add_many(rentals)
+        history.save_file()
+        if name == 'mapped':
+            history.close()
+        start = perf_counter()
+        history = history_class(file_name)
+        history.load_file()
+        opened = perf_counter() - start
+        start = perf_counter()
+        history.find_rental_by_id(rental.id)
+        found = perf_counter() - start
+        start = perf_counter()
+        history.movie_rented_until(rental.movie_id)
+        history.add_rental(Rental(rental.movie_id, rental.client_id, first + timedelta(days=4000),
+                                  first + timedelta(days=4007)))
+        history.save_file()
+        rented = perf_counter() - start
+        start = perf_counter()
+        history.update_rental_returned_date(rental.id, rental.due_date)
+        history.save_file()
+        returned = perf_counter() - start
+        start = perf_counter()
+        history.rentals_between('rented_date', first, first + timedelta(days=7))
+        queried = perf_counter() - start
+        print('{:<8} {:>10.2f} {:>16.2f} {:>10.2f} {:>12.2f} {:>14.2f}'.format(name, opened * 1000, found * 1000,
+                                                                               rented * 1000, returned * 1000,
+                                                                               queried))
+        if name == 'mapped':
+            history.close()
+    for file in os.listdir(directory):
+        os.remove(os.path.join(directory, file))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
@@ -0,0 +1,62 @@
+"""
+Benchmark for the id of rentals
+Compares finding rentals by the legacy string id, the fields concatenated, with finding them by RentalKey:
+building the id from the fields as the services do, then looking it up in a dict and in a RentalHistory.
+
+Run from the project root:
+    python -m benchmark.RentalKeyBenchmark [rentals]
+"""
+import sys
+from datetime import date
+from random import randint, sample
+from timeit import timeit
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.RentalHistory import RentalHistory
+
+RENTALS = 100000
+LOOKUPS = 20000
+MOVIES = 5000
+CLIENTS = 20000
+
+
+def generate_rentals(count):
+    first_day = date(2000, 1, 1).toordinal()
+    rentals = {}
+    while len(rentals) < count:
+        rented = first_day + randint(0, 3650)
+        rental = Rental(str(randint(1, MOVIES)), str(randint(1, CLIENTS)), date.fromordinal(rented),
+                        date.fromordinal(rented + randint(1, 14)))
+        rentals[rental.id] = rental
+    return list(rentals.values())
+
+
+def legacy_id(movie_id, client_id, rented_date, due_date):
+    return movie_id + client_id + str(rented_date) + str(due_date)
+
+
+def main(count):
+    rentals = generate_rentals(count)
+    queries = [(rental.movie_id, rental.client_id, rental.rented_date, rental.due_date)
+               for rental in sample(rentals, min(LOOKUPS, count))]
+    by_string = {str(rental.id): rental for rental in rentals}
+    by_key = {rental.id: rental for rental in rentals}
+    history = RentalHistory()
+    history.add_many(rentals)
+    cases = [
+        ('build string id', lambda: [legacy_id(*query) for query in queries]),
+        ('build RentalKey', lambda: [RentalKey(*query) for query in queries]),
+        ('dict, string id', lambda: [by_string[legacy_id(*query)] for query in queries]),
+        ('dict, RentalKey', lambda: [by_key[RentalKey(*query)] for query in queries]),
+        ('find_rental_by_id', lambda: [history.find_rental_by_id(RentalKey(*query)) for query in queries]),
+    ]
+    print('{} rentals, {} lookups'.format(count, len(queries)))
+    print('{:<20} {:>14}'.format('operation', 'ns per lookup'))
+    for name, run in cases:
+        seconds = min(timeit(run, number=1) for _ in range(5))
+        print('{:<20} {:>14.0f}'.format(name, seconds / len(queries) * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
@@ -0,0 +1,72 @@
+"""
+Memory benchmark for the storage of RentalHistory
+Compares the memory taken by rentals kept as a list of Rental objects with the memory taken by RentalColumns:
+the rows alone, the rows with the id index of Iterable, and a whole RentalHistory with its secondary indexes, the
+last also with its lookups kept on rows, as by RentalHistoryColumnar.
+
+Run from the project root:
+    python -m benchmark.RentalMemoryBenchmark [rentals]
+"""
+import sys
+import tracemalloc
+from datetime import date
+from random import randint
+
+from domain.Rental import Rental
+from repository.Iterable import Iterable
+from repository.RentalColumns import RentalColumns
+from repository.RentalHistory import RentalHistory
+from repository.RentalHistoryColumnar import RentalHistoryColumnar
+
+RENTALS = 200000
+MOVIES = 5000
+CLIENTS = 20000
+
+
+def generate_rentals(count):
+    """
+    Generates count rentals, one at a time, so that only the stored ones are measured
+    """
+    first_day = date(2000, 1, 1).toordinal()
+    for i in range(count):
+        rented = first_day + i // 50
+        due = rented + randint(1, 14)
+        returned = rented + randint(1, 20) if randint(0, 9) > 0 else None
+        yield Rental(str(randint(1, MOVIES)), str(randint(1, CLIENTS)), date.fromordinal(rented),
+                     date.fromordinal(due), None if returned is None else date.fromordinal(returned))
+
+
+def measure(make_store, add, count):
+    """
+    Fills a new store with count rentals
+    Returns: the memory kept by the store, in bytes - int
+    """
+    tracemalloc.start()
+    store = make_store()
+    for rental in generate_rentals(count):
+        add(store, rental)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main(count):
+    layouts = [
+        ('rows', 'list', lambda: [], list.append),
+        ('rows', 'RentalColumns', lambda: RentalColumns(), RentalColumns.append),
+        ('Iterable', 'list', lambda: Iterable(), Iterable.append),
+        ('Iterable', 'RentalColumns', lambda: Iterable(rows=RentalColumns()), Iterable.append),
+        ('RentalHistory', 'list', lambda: RentalHistory(), RentalHistory.add_rental),
+        ('RentalHistory', 'RentalColumns', lambda: RentalHistory(Iterable(rows=RentalColumns())),
+         RentalHistory.add_rental),
+        ('RentalHistory', 'RentalTable', lambda: RentalHistoryColumnar(), RentalHistory.add_rental),
+    ]
+    print('{} rentals'.format(count))
+    print('{:<14} {:<14} {:>10} {:>16}'.format('structure', 'storage', 'MB', 'bytes per rental'))
+    for structure, storage, make_store, add in layouts:
+        size = measure(make_store, add, count)
+        print('{:<14} {:<14} {:>10.1f} {:>16.1f}'.format(structure, storage, size / 2 ** 20, size / count))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
@@ -0,0 +1,49 @@
+"""
+Benchmark for time window queries on the rental history
+Compares filtering every rental with the range scans of rentals_between, for windows of growing width.
+
+Run from the project root:
+    python -m benchmark.RentalWindowBenchmark [rentals]
+"""
+import sys
+from datetime import date, timedelta
+from random import randint, seed
+from time import perf_counter
+
+from domain.Rental import Rental
+from repository.RentalHistory import RentalHistory
+
+RENTALS = 300000
+DAYS = 3650
+QUERIES = 20
+
+
+def main(count):
+    seed(1)
+    first = date(2010, 1, 1)
+    history = RentalHistory()
+    rentals = []
+    for i in range(count):
+        rented_date = first + timedelta(days=randint(0, DAYS))
+        due_date = rented_date + timedelta(days=randint(1, 30))
+        rentals.append(Rental(str(i % 5000), str(i), rented_date, due_date, due_date + timedelta(days=randint(-5, 5))))
+    start = perf_counter()
+    history.add_many(rentals)
+    print('{} rentals, indexed in {:.1f} s'.format(count, perf_counter() - start))
+    print('{:<8} {:>10} {:>14} {:>14}'.format('days', 'rentals', 'scan ms', 'index ms'))
+    for width in (1, 7, 31, 365):
+        windows = [first + timedelta(days=randint(0, DAYS - width)) for _ in range(QUERIES)]
+        start = perf_counter()
+        for low in windows:
+            high = low + timedelta(days=width - 1)
+            scanned = [rental for rental in history.list if low <= rental.rented_date <= high]
+        scan = (perf_counter() - start) / QUERIES * 1000
+        start = perf_counter()
+        for low in windows:
+            found = list(history.rentals_between('rented_date', low, low + timedelta(days=width - 1)))
+        index = (perf_counter() - start) / QUERIES * 1000
+        print('{:<8} {:>10} {:>14.3f} {:>14.3f}'.format(width, len(found), scan, index))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
@@ -0,0 +1,72 @@
+"""
+Benchmark for the SQLite rental history
+Compares the in-memory and the SQLite rental history on startup, lookups, totals and returns, the SQLite one
+committing every return or a batch of them.
+
+Run from the project root:
+    python -m benchmark.SQLiteBenchmark [rentals]
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from random import randint, seed
+from time import perf_counter
+
+from domain.Rental import Rental
+from repository.RentalHistory import RentalHistory
+from repository.RentalHistorySQLite import RentalHistorySQLite
+
+RENTALS = 200000
+REPEATS = 20
+
+
+def timed(action, repeats=REPEATS):
+    start = perf_counter()
+    for _ in range(repeats):
+        action()
+    return (perf_counter() - start) / repeats * 1000
+
+
+def main(count):
+    seed(1)
+    first = date(2010, 1, 1)
+    rentals = []
+    for i in range(count):
+        rented_date = first + timedelta(days=randint(0, 3650))
+        due_date = rented_date + timedelta(days=randint(1, 30))
+        rentals.append(Rental(str(i % 5000), str(i), rented_date, due_date))
+    directory = tempfile.mkdtemp()
+    file_name = os.path.join(directory, 'rentals.db')
+    RentalHistorySQLite(file_name).add_many(rentals)
+    print('{} rentals'.format(count))
+    print('{:<24} {:>14} {:>14}'.format('operation', 'memory ms', 'sqlite ms'))
+    timings = {}
+    for name in ('memory', 'sqlite'):
+        start = perf_counter()
+        if name == 'memory':
+            history = RentalHistory()
+            history.add_many(rentals)
+        else:
+            history = RentalHistorySQLite(file_name)
+        timings.setdefault('startup', []).append((perf_counter() - start) * 1000)
+        timings.setdefault('rentals_of_client', []).append(timed(lambda: history.rentals_of_client('17017')))
+        timings.setdefault('is_movie_free', []).append(
+            timed(lambda: history.is_movie_free('17', date(2015, 1, 1), date(2015, 1, 7))))
+        timings.setdefault('rented_days_by_movie', []).append(timed(history.rented_days_by_movie, 3))
+        returns = iter(rentals)
+        timings.setdefault('return', []).append(
+            timed(lambda: history.update_rental_returned_date(next(returns).id, date(2020, 1, 1))))
+        with history.batch():
+            timings.setdefault('return in batch', []).append(
+                timed(lambda: history.update_rental_returned_date(next(returns).id, date(2020, 1, 1))))
+    for operation, (memory, sqlite) in timings.items():
+        print('{:<24} {:>14.3f} {:>14.3f}'.format(operation, memory, sqlite))
+    history.close()
+    for file in os.listdir(directory):
+        os.remove(os.path.join(directory, file))
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RENTALS)
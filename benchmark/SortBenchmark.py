@@ -0,0 +1,69 @@
+"""
+Benchmark for Iterable.sort
+Compares the gnome sort the repository used to have with the key based sort, sorting movies by title
+the way the console does.
+Gnome sort is quadratic, so it is only timed on smaller catalogs and its time for the full catalog is
+extrapolated from the largest of them.
+
+Run from the project root:
+    python -m benchmark.SortBenchmark [movies] [gnome_movies]
+"""
+import sys
+from random import choice, randint
+from time import perf_counter
+
+from domain.Movie import Movie
+from repository.Iterable import Iterable, gnome_sort
+
+MOVIES = 100000
+GNOME_MOVIES = 4000
+WORDS = ['the', 'cars', 'alien', 'avatar', 'return', 'night', 'mission', 'impossible', 'black', 'panther',
+         'wolf', 'street', 'holmes', 'spider', 'man', 'ford', 'ferrari', 'armageddon', 'avengers', 'king']
+
+
+def generate_movies(count):
+    movies = []
+    for i in range(count):
+        title = ' '.join(choice(WORDS) for _ in range(randint(1, 4))).title()
+        movies.append(Movie(str(i), title, 'description', 'genre'))
+    return movies
+
+
+def compare_titles(a, b):
+    return str(a.title).lower() <= str(b.title).lower()
+
+
+def time_sort(movies, **arguments):
+    it = Iterable(movies)
+    start = perf_counter()
+    it.sort(**arguments)
+    return perf_counter() - start
+
+
+def time_gnome_sort(movies):
+    items = movies[:]
+    start = perf_counter()
+    gnome_sort(items, compare_titles)
+    return perf_counter() - start
+
+
+def main(count, gnome_count):
+    movies = generate_movies(count)
+
+    key_time = time_sort(movies, key=lambda movie: str(movie.title).lower())
+    print('key sort, {} movies: {:.3f} s'.format(count, key_time))
+    adapter_time = time_sort(movies, function=compare_titles)
+    print('comparison function adapter, {} movies: {:.3f} s'.format(count, adapter_time))
+
+    gnome_time = 0
+    for size in [gnome_count // 4, gnome_count // 2, gnome_count]:
+        gnome_time = time_gnome_sort(movies[:size])
+        print('gnome sort, {} movies: {:.3f} s'.format(size, gnome_time))
+    estimate = gnome_time * (count / gnome_count) ** 2
+    print('gnome sort, {} movies (extrapolated): {:.0f} s'.format(count, estimate))
+    print('speedup of the key sort: {:.0f}x'.format(estimate / key_time))
+
+
+if __name__ == '__main__':
+    arguments = [int(arg) for arg in sys.argv[1:]]
+    main(arguments[0] if len(arguments) > 0 else MOVIES, arguments[1] if len(arguments) > 1 else GNOME_MOVIES)
@@ -4,11 +4,17 @@ The UI class
 from random import randint
 from domain.Rental import RentalError
 from repository.ClientBaseBinary import ClientBaseBinary
+from repository.ClientBaseSQLite import ClientBaseSQLite
 from repository.ClientBaseText import ClientBaseText
+from repository.FlushPolicy import FlushPolicy
 from repository.MovieCollection import MovieCollectionError
 from repository.MovieCollectionBinary import MovieCollectionBinary
+from repository.MovieCollectionSQLite import MovieCollectionSQLite
 from repository.MovieCollectionText import MovieCollectionText
 from repository.RentalHistoryBinary import RentalHistoryBinary
+from repository.RentalHistoryColumnar import RentalHistoryColumnar
+from repository.RentalHistoryMapped import RentalHistoryMapped
+from repository.RentalHistorySQLite import RentalHistorySQLite
 from repository.RentalHistoryText import RentalHistoryText
 from service.ClientService import ClientService
 from service.MovieService import MovieService
@@ -50,6 +56,8 @@ class UI:
 
 
     """
+    PAGE_SIZE = 20
+
     def __init__(self):
         s = Settings('../settings/settings.properties')
         self.repo_type = s.repository_type()
@@ -68,6 +76,26 @@ class UI:
             movie_repo = MovieCollectionBinary(s.movie_file())
             rental_repo = RentalHistoryBinary(s.rental_file())
 
+        elif self.repo_type == 'columnar':
+            client_repo = ClientBaseBinary(s.client_file())
+            movie_repo = MovieCollectionBinary(s.movie_file())
+            rental_repo = RentalHistoryColumnar(s.rental_file())
+
+        elif self.repo_type == 'mapped':
+            client_repo = ClientBaseBinary(s.client_file())
+            movie_repo = MovieCollectionBinary(s.movie_file())
+            rental_repo = RentalHistoryMapped(s.rental_file())
+
+        elif self.repo_type == 'sqlite':
+            client_repo = ClientBaseSQLite(s.client_file())
+            movie_repo = MovieCollectionSQLite(s.movie_file())
+            rental_repo = RentalHistorySQLite(s.rental_file())
+
+        flush_policy = s.flush_policy()
+        if flush_policy is not None:
+            for repo in (client_repo, movie_repo, rental_repo):
+                repo.flush_policy = FlushPolicy.parse(flush_policy)
+
         undo_service = UndoService()
         self._undo_service = undo_service
         self._rental_service = RentalService(client_repo, movie_repo, rental_repo, undo_service)
@@ -119,6 +147,7 @@ class UI:
         print('7. Search client by name')
         print('8. Sort client by id')
         print('9. Sort client by name')
+        print('10. Update client id')
 
     @staticmethod
     def print_movie_menu():
@@ -136,12 +165,43 @@ class UI:
         print('B.Sort movie by title')
         print('C.Sort movie by description')
         print('D.Sort movie by genre')
+        print('E.Search movie by genre tags')
+        print('F.Update movie id')
 
     @staticmethod
     def print_statistics_menu():
         print("1. Most rented movies")
         print("2. Most active clients")
         print("3. Late rentals")
+        print("4. Most common genres")
+
+    @staticmethod
+    def print_results(results):
+        """
+        Prints the results one by one, as they are produced
+        Args:
+            results: the items to be printed - iterable
+
+        Returns: number of items printed - int
+
+        """
+        count = 0
+        for item in results:
+            print(str(item))
+            count += 1
+        return count
+
+    @staticmethod
+    def print_pages(cursor):
+        """
+        Prints the pages of a cursor one at a time, asking before each following page
+        Args:
+            cursor: Cursor
+        """
+        for page in cursor:
+            UI.print_results(page)
+            if not page.last and input("More? (yes/no): ").strip() != 'yes':
+                break
 
     def client_options(self):
         self.print_client_menu()
@@ -149,7 +209,7 @@ class UI:
         nr = nr.strip()
         if nr.isnumeric():
             nr = int(nr)
-            if 1 <= nr <= 9:
+            if 1 <= nr <= 10:
                 if nr == 1:
                     self.add_client_ui()
                 elif nr == 2:
@@ -168,6 +228,8 @@ class UI:
                     self.sort_clients_by_id_ui()
                 elif nr == 9:
                     self.sort_clients_by_name_ui()
+                elif nr == 10:
+                    self.update_client_id()
             else:
                 raise UIError("Your wish doesn't exist")
         else:
@@ -190,14 +252,18 @@ class UI:
             self.client_service.remove_client(id)
 
     def list_clients(self):
-        for client in self.rental_service.client_repo.list:
-            print(client.__str__())
+        self.print_pages(self.rental_service.client_repo.cursor(self.PAGE_SIZE))
 
     def update_client_name(self):
         id = input("Client ID: ")
         name = input("Client name: ")
         self.client_service.update_client_name(id.strip(), name.strip())
 
+    def update_client_id(self):
+        id = input("Client ID: ")
+        new_id = input("New client ID: ")
+        self.client_service.update_client_id(id.strip(), new_id.strip())
+
     def update_client_worthiness(self):
         id = input("Client ID: ")
         worthy = input("yes/no: ")
@@ -212,29 +278,23 @@ class UI:
 
     def search_client_by_id_ui(self):
         id = input("Client ID: ").strip()
-        # result = self.rental_service.client_repo.search_client_by_id(id)
-        result = self.rental_service.client_repo.list.filter(lambda x: x.id.find(id) != -1)
-        if len(result) == 0:
+        if self.print_results(self.rental_service.client_repo.search_client_by_id(id)) == 0:
             raise ClientBaseError("Clients can't be found")
-        else:
-            for client in result:
-                print(str(client))
 
     def search_client_by_name_ui(self):
         name = input("Client name: ").strip().lower()
-        # result = self.rental_service.client_repo.search_client_by_name(name)
-        result = self.rental_service.client_repo.list.filter(lambda x: x.name.lower().find(name) != -1)
-        if len(result) == 0:
-            raise ClientBaseError("Clients can't be found")
-        else:
-            for client in result:
-                print(str(client))
+        if self.print_results(self.rental_service.client_repo.search_client_by_name(name)) == 0:
+            closest = self.rental_service.client_repo.fuzzy_search_client_by_name(name)
+            if len(closest) == 0:
+                raise ClientBaseError("Clients can't be found")
+            print("No client has this name, the closest names are:")
+            self.print_results(closest)
 
     def sort_clients_by_id_ui(self):
-        self.client_service.client_repo.list.sort(lambda a, b: int(a.id) <= int(b.id))
+        self.print_results(self.client_service.client_repo.clients_ordered_by('id'))
 
     def sort_clients_by_name_ui(self):
-        self.client_service.client_repo.list.sort(lambda a, b: str(a.name).lower() <= str(b.name).lower())
+        self.print_results(self.client_service.client_repo.clients_ordered_by('name'))
 
     def movie_options(self):
         self.print_movie_menu()
@@ -278,6 +338,10 @@ class UI:
                     self.sort_movie_by_description()
                 elif nr == 'D':
                     self.sort_movie_by_genre()
+                elif nr == 'E':
+                    self.search_movie_by_tags_ui()
+                elif nr == 'F':
+                    self.update_movie_id()
 
                 else:
                     raise UIError("Your wish doesn't exist")
@@ -304,8 +368,12 @@ class UI:
         #     raise RentalServiceError("Movie can't be removed as it's rented")
 
     def list_movies(self):
-        for movie in self.rental_service.movie_repo.list:
-            print(str(movie))
+        self.print_pages(self.rental_service.movie_repo.cursor(self.PAGE_SIZE))
+
+    def update_movie_id(self):
+        id = input("Movie ID: ").strip()
+        new_id = input("New movie ID: ").strip()
+        self.movie_service.update_movie_id(id, new_id)
 
     def update_movie_title(self):
         id = input("Movie ID: ").strip()
@@ -324,55 +392,40 @@ class UI:
 
     def search_movie_by_id_ui(self):
         id = input("Movie ID: ").strip()
-        # result = self.rental_service.movie_repo.search_movie_by_id(id)
-        result = self.rental_service.movie_repo.list.filter(lambda x: x.id.find(id) != -1)
-        if len(result) == 0:
+        if self.print_results(self.rental_service.movie_repo.search_movie_by_id(id)) == 0:
             raise ClientBaseError("Movies can't be found")
-        else:
-            for movie in result:
-                print(str(movie))
 
     def search_movie_by_title_ui(self):
         title = input("Movie title: ").strip().lower()
-        # result = self.rental_service.movie_repo.search_movie_by_title(title)
-        result = self.rental_service.movie_repo.list.filter(lambda x: x.title.lower().find(title) != -1)
-        if len(result) == 0:
+        if self.print_results(self.rental_service.movie_repo.search_movie_by_title(title)) == 0:
             raise ClientBaseError("Movies can't be found")
-        else:
-            for movie in result:
-                print(str(movie))
 
     def search_movie_by_description_ui(self):
-        description = input("Movie description: ").strip().lower()
-        # result = self.rental_service.movie_repo.search_movie_by_description(description)
-        result = self.rental_service.movie_repo.list.filter(lambda x: x.description.lower().find(description) != -1)
-        if len(result) == 0:
+        query = input("Movie description (e.g. space AND war OR alien): ").strip()
+        if self.print_results(self.rental_service.movie_repo.search_movie_by_description_words(query)) == 0:
             raise ClientBaseError("Movies can't be found")
-        else:
-            for movie in result:
-                print(str(movie))
 
     def search_movie_by_genre_ui(self):
-        genre = input("Movie genre: ").strip().lower()
-        # result = self.rental_service.movie_repo.search_movie_by_genre(genre)
-        result = self.rental_service.movie_repo.list.filter(lambda x: x.genre.lower().find(genre) != -1)
-        if len(result) == 0:
+        genre = input("Movie genre: ").strip()
+        if self.print_results(self.rental_service.movie_repo.search_movie_by_genre(genre)) == 0:
+            raise ClientBaseError("Movies can't be found")
+
+    def search_movie_by_tags_ui(self):
+        query = input("Genre tags (e.g. action AND NOT animation): ").strip()
+        if self.print_results(self.rental_service.movie_repo.search_movie_by_tags(query)) == 0:
             raise ClientBaseError("Movies can't be found")
-        else:
-            for movie in result:
-                print(str(movie))
 
     def sort_movie_by_id(self):
-        self.movie_service.movie_repo.list.sort(lambda a, b: int(a.id) <= int(b.id))
+        self.print_results(self.movie_service.movie_repo.movies_ordered_by('id'))
 
     def sort_movie_by_title(self):
-        self.movie_service.movie_repo.list.sort(lambda a, b: str(a.title).lower() <= str(b.title).lower())
+        self.print_results(self.movie_service.movie_repo.movies_ordered_by('title'))
 
     def sort_movie_by_description(self):
-        self.movie_service.movie_repo.list.sort(lambda a, b: str(a.description).lower() <= str(b.description).lower())
+        self.print_results(self.movie_service.movie_repo.movies_ordered_by('description'))
 
     def sort_movie_by_genre(self):
-        self.movie_service.movie_repo.list.sort(lambda a, b: str(a.genre).lower() <= str(b.genre).lower())
+        self.print_results(self.movie_service.movie_repo.movies_ordered_by('genre'))
 
     def statistics_ui(self):
         self.print_statistics_menu()
@@ -380,39 +433,57 @@ class UI:
         nr = nr.strip()
         if nr.isnumeric():
             nr = int(nr)
-            if 1 <= nr <= 3:
+            if 1 <= nr <= 4:
                 if nr == 1:
                     self.most_rented_movies_ui()
                 if nr == 2:
                     self.most_active_clients_ui()
                 if nr == 3:
                     self.late_rentals_ui()
+                if nr == 4:
+                    self.most_common_genres_ui()
             else:
                 raise UIError("Your wish doesn't exist")
 
         else:
             raise UIError("Your wish must be a number")
 
+    @staticmethod
+    def read_limit():
+        limit = input("How many entries (leave empty for all)? ").strip()
+        if limit == '':
+            return None
+        if not limit.isnumeric():
+            raise UIError("The number of entries must be a number")
+        return int(limit)
+
     def most_rented_movies_ui(self):
-        result = self.statistics.most_rented_movies()
+        result = self.statistics.most_rented_movies(self.read_limit())
         if len(result) == 0:
             raise RentalServiceError("No rentals done")
         for entry in result:
             print(str(entry))
 
     def most_active_clients_ui(self):
-        result = self.statistics.most_active_clients()
+        result = self.statistics.most_active_clients(self.read_limit())
         if len(result) == 0:
             raise RentalServiceError("No rentals done")
         for entry in result:
             print(str(entry))
 
+    def most_common_genres_ui(self):
+        result = self.statistics.most_common_genres(self.read_limit())
+        if len(result) == 0:
+            raise RentalServiceError("No movies added")
+        for entry in result:
+            print(str(entry))
+
     def late_rentals_ui(self):
         year = int(input("Today date year: ").strip())
         month = int(input("Today date month: ").strip())
         day = int(input("Today date month: ").strip())
         today = date(year, month, day)
-        result = self.statistics.late_rentals(today)
+        result = self.statistics.late_rentals(today, self.read_limit())
         if len(result) == 0:
             raise RentalServiceError("No rentals done")
         for entry in result:
@@ -457,8 +528,7 @@ class UI:
         self.rental_service.return_movie(movie_id, client_id, rented_date, due_date, returned_date)
 
     def list_rentals(self):
-        for rental in self.rental_service.rental_repo.list:
-            print(str(rental))
+        self.print_pages(self.rental_service.rental_repo.cursor(self.PAGE_SIZE))
 
     def undo_ui(self):
         self.undo_service.undo()
@@ -478,41 +548,43 @@ class UI:
                 self.rental_service.rental_repo.load_file()
             except (EOFError, ClientBaseError, MovieCollectionError, RentalHistoryError) as error:
                 print(str(error))
-        done = False
-        while not done:
-            self.print_menu()
-            nr = input("What is your wish? ")
-            nr = nr.strip()
-            if nr.isnumeric():
-                nr = int(nr)
-                if 0 <= nr <= 8:
-                    try:
-                        if nr == 1:
-                            self.client_options()
-                        elif nr == 2:
-                            self.movie_options()
-                        elif nr == 3:
-                            self.rent_movie_ui()
-                        elif nr == 4:
-                            self.return_movie_ui()
-                        elif nr == 5:
-                            self.list_rentals()
-                        elif nr == 6:
-                            self.statistics_ui()
-                        elif nr == 7:
-                            self.undo_ui()
-                        elif nr == 8:
-                            self.redo_ui()
-                        else:
-                            print('See you l8er, alligator!')
-                            done = True
-                    except (UIError, MovieCollectionError, ClientBaseError, RentalHistoryError, RentalServiceError,
-                            RentalError, UndoServiceError) as error:
-                        print(str(error))
+        # The pending changes are saved however the loop ends, by Ctrl-C or an error too
+        with self.client_service.client_repo, self.movie_service.movie_repo, self.rental_service.rental_repo:
+            done = False
+            while not done:
+                self.print_menu()
+                nr = input("What is your wish? ")
+                nr = nr.strip()
+                if nr.isnumeric():
+                    nr = int(nr)
+                    if 0 <= nr <= 8:
+                        try:
+                            if nr == 1:
+                                self.client_options()
+                            elif nr == 2:
+                                self.movie_options()
+                            elif nr == 3:
+                                self.rent_movie_ui()
+                            elif nr == 4:
+                                self.return_movie_ui()
+                            elif nr == 5:
+                                self.list_rentals()
+                            elif nr == 6:
+                                self.statistics_ui()
+                            elif nr == 7:
+                                self.undo_ui()
+                            elif nr == 8:
+                                self.redo_ui()
+                            else:
+                                print('See you l8er, alligator!')
+                                done = True
+                        except (UIError, MovieCollectionError, ClientBaseError, RentalHistoryError, RentalServiceError,
+                                RentalError, UndoServiceError) as error:
+                            print(str(error))
+                    else:
+                        print("Your wish doesn't exist")
                 else:
-                    print("Your wish doesn't exist")
-            else:
-                print("Your wish must be a number")
+                    print("Your wish must be a number")
 
     def generate_clients(self):
         client_names = ['Ana', 'Dan', 'Mirel', 'Patricia', 'Maria', 'Vlad', 'Alex', 'Mircea', 'Gabriel', 'Bogdan'
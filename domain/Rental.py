@@ -1,5 +1,7 @@
 from datetime import datetime
 
+from domain.RentalKey import RentalKey
+
 
 class RentalError(Exception):
     """
@@ -13,7 +15,7 @@ class Rental:
     """
     Rental class
     Attributes:
-        id: string
+        id: RentalKey
         movie_id: string
         client_id: string
         rented_date: datetime
@@ -21,38 +23,16 @@ class Rental:
         returned_date: datetime
     """
 
+    __slots__ = ('id', 'movie_id', 'client_id', '_rented_date', '_due_date', '_returned_date')
+
     def __init__(self, movie_id, client_id, rented_date, due_date, returned_date=None):
-        self._id = movie_id + client_id + str(rented_date) + str(due_date)
-        self._movie_id = movie_id
-        self._client_id = client_id
+        self.id = RentalKey(movie_id, client_id, rented_date, due_date)
+        self.movie_id = movie_id
+        self.client_id = client_id
         self._rented_date = rented_date
         self._due_date = due_date
         self._returned_date = returned_date
 
-    @property
-    def id(self):
-        return self._id
-
-    @id.setter
-    def id(self, id):
-        self._id = id
-
-    @property
-    def movie_id(self):
-        return self._movie_id
-
-    @movie_id.setter
-    def movie_id(self, movie_id):
-        self._movie_id = movie_id
-
-    @property
-    def client_id(self):
-        return self._client_id
-
-    @client_id.setter
-    def client_id(self, client_id):
-        self._client_id = client_id
-
     @property
     def rented_date(self):
         return self._rented_date
@@ -90,6 +70,6 @@ class Rental:
                 raise RentalError("Returned date before rented date")
 
     def __str__(self):
-        txt = 'id:' + self.id + ' movie id:' + self.movie_id + ' client id:' + self.client_id + ' ' \
+        txt = 'id:' + str(self.id) + ' movie id:' + self.movie_id + ' client id:' + self.client_id + ' ' \
               + str(self.rented_date) + ' ' + str(self.due_date) + ' ' + str(self.returned_date)
         return txt
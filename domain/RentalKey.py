@@ -0,0 +1,21 @@
+from collections import namedtuple
+
+
+class RentalKey(namedtuple('RentalKey', ['movie_id', 'client_id', 'rented_date', 'due_date'])):
+    """
+    RentalKey class, the id of a Rental
+    A tuple of the fields that identify a rental, so it hashes and compares field by field:
+    movie '1' with client '23' is a different key from movie '12' with client '3'.
+    Attributes:
+        movie_id: string
+        client_id: string
+        rented_date: date
+        due_date: date
+
+    Methods:
+        __str__: returns the legacy string id, the fields concatenated, as stored in the files
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return self.movie_id + self.client_id + str(self.rented_date) + str(self.due_date)
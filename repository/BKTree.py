@@ -0,0 +1,251 @@
+"""
+BKTree class
+"""
+import unicodedata
+from heapq import heappush, heappushpop, nsmallest
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+def normalise(text):
+    """
+    Normalises a name for fuzzy matching: lowercase, without accents and with single spaces
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ' '.join(''.join(char for char in text if not unicodedata.combining(char)).split())
+
+
+def edit_distance(first, second, bound=None):
+    """
+    Levenshtein distance: the number of inserted, removed or replaced characters turning a string into another
+    Args:
+        first, second: the strings - string
+        bound: stop as soon as the distance is known to be larger, None to compute it exactly - int
+
+    Returns: the distance, or a number larger than the bound - int
+    """
+    # The common prefix and suffix do not change the distance
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    end = 0
+    while end < len(first) - start and end < len(second) - start and first[-1 - end] == second[-1 - end]:
+        end += 1
+    first = first[start:len(first) - end]
+    second = second[start:len(second) - end]
+    if len(first) < len(second):
+        first, second = second, first
+    if bound is not None and len(first) - len(second) > bound:
+        return bound + 1
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if bound is not None and min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+
+class _Node:
+    __slots__ = ('text', 'ids', 'children')
+
+    def __init__(self, text):
+        self.text = text
+        self.ids = {}
+        self.children = {}
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over the normalised text of the items, finding the texts close to a query in edit distance
+    Every node holds a distinct text and the ids of the items having it; its children are kept by their distance to it.
+    By the triangle inequality, a search within a distance only visits the children whose distance to a node differs
+    by at most that much from the distance of the query to the node, which prunes most of the tree.
+    A node whose items are all discarded is kept to route searches, and the tree is rebuilt once such nodes are the
+    majority.
+    The tree is only built by the first search, so loading items nobody searches fuzzily costs no distance computation;
+    from then on it is kept up to date item by item.
+    Attributes:
+        text: function giving the text of an item - function
+        _root: the root node - _Node
+        _nodes: maps every text to its node - dict
+        _by_id: maps every indexed id to its normalised text and sequence number - dict
+        _built: whether the nodes exist yet - bool
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        search: the ids of the closest items within a distance
+    """
+    def __init__(self, text):
+        self._text = text
+        self._sequence = 0
+        self.clear()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._root = None
+        self._nodes = {}
+        self._by_id = {}
+        self._empty = 0
+        self._built = False
+
+    def add(self, item):
+        """
+        Adds the item to the index, or moves it to its new text if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        text = normalise(self._text(item))
+        if item.id in self._by_id:
+            if self._by_id[item.id][0] == text:
+                return
+            self.discard(item.id)
+        if self._built:
+            self._insert(text, item.id, self._sequence)
+        else:
+            self._by_id[item.id] = (text, self._sequence)
+        self._sequence += 1
+
+    def _insert(self, text, id, sequence):
+        node = self._nodes.get(text)
+        if node is None:
+            node = _Node(text)
+            self._nodes[text] = node
+            if self._root is None:
+                self._root = node
+            else:
+                parent = self._root
+                while True:
+                    distance = edit_distance(text, parent.text)
+                    child = parent.children.get(distance)
+                    if child is None:
+                        parent.children[distance] = node
+                        break
+                    parent = child
+        elif not node.ids:
+            self._empty -= 1
+        node.ids[id] = sequence
+        self._by_id[id] = (text, sequence)
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        if id not in self._by_id:
+            return
+        text, sequence = self._by_id.pop(id)
+        if not self._built:
+            return
+        node = self._nodes[text]
+        del node.ids[id]
+        if not node.ids:
+            self._empty += 1
+            if self._empty > len(self._nodes) // 2:
+                self._rebuild()
+
+    def discard_many(self, ids):
+        for id in ids:
+            self.discard(id)
+
+    def _rebuild(self):
+        """
+        Builds the tree from the texts that have items, dropping the empty nodes
+        """
+        entries = sorted((sequence, text, id) for id, (text, sequence) in self._by_id.items())
+        self.clear()
+        self._built = True
+        for sequence, text, id in entries:
+            self._insert(text, id, sequence)
+
+    def search(self, text, max_distance, limit=None):
+        """
+        Finds the items whose normalised text is the closest to the normalised query
+        Once limit items are found, the search radius shrinks to the distance of the farthest of them.
+        Args:
+            text: the query - string
+            max_distance: largest edit distance accepted - int
+            limit: maximum number of ids returned, None for all within the distance - int
+
+        Returns: the ids, closest first, then in the order the items were added - list
+        """
+        if not self._built:
+            self._rebuild()
+        text = normalise(text)
+        # Max-heap of the best (distance, sequence, id) found, as negated tuples
+        best = []
+        stack = [self._root] if self._root is not None else []
+        radius = max_distance
+        while stack:
+            node = stack.pop()
+            # Past radius plus the largest edge, neither the node nor any child can match
+            bound = radius + max(node.children, default=0)
+            distance = edit_distance(text, node.text, bound)
+            if distance > bound:
+                continue
+            if distance <= radius:
+                for id, sequence in node.ids.items():
+                    entry = (-distance, -sequence, id)
+                    if limit is None or len(best) < limit:
+                        heappush(best, entry)
+                    elif entry > best[0]:
+                        heappushpop(best, entry)
+                if limit is not None and len(best) == limit:
+                    radius = min(radius, -best[0][0])
+            for edge, child in node.children.items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return [id for distance, sequence, id in nsmallest(len(best), ((-d, -s, id) for d, s, id in best))]
+
+
+class TestBKTree(TestCase):
+    def setUp(self):
+        self.tree = BKTree(lambda client: client.name)
+        self.tree.add_many([Client('1', 'Mirel'), Client('2', 'Marcela'), Client('3', 'Mirela'),
+                            Client('4', 'Ionuț Popescu'), Client('5', 'Miruna'), Client('6', 'mirel')])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('', 'abc'), 3)
+        self.assertEqual(edit_distance('abc', 'abc'), 0)
+        self.assertEqual(edit_distance('kitten', 'sitting', 1), 2)
+        self.assertEqual(edit_distance('a', 'abcdef', 2), 3)
+
+    def test_normalise(self):
+        self.assertEqual(normalise('  Ionuț   POPESCU '), 'ionut popescu')
+
+    def test_search(self):
+        self.assertEqual(self.tree.search('Mirell', 1), ['1', '3', '6'])
+        self.assertEqual(self.tree.search('mirel', 0), ['1', '6'])
+        self.assertEqual(self.tree.search('Mirel', 2, limit=3), ['1', '6', '3'])
+        self.assertEqual(self.tree.search('Mirel', 3), ['1', '6', '3', '2', '5'])
+        self.assertEqual(self.tree.search('ionut popesku', 2), ['4'])
+        self.assertEqual(self.tree.search('xyz', 2), [])
+
+    def test_update(self):
+        self.tree.add(Client('1', 'Marcel'))
+        self.assertEqual(self.tree.search('mirel', 0), ['6'])
+        self.assertEqual(self.tree.search('marcel', 1), ['1', '2'])
+        self.tree.discard_many(['2', '3', '5', '6'])
+        self.assertEqual(self.tree.search('mirel', 1), [])
+        self.assertEqual(self.tree.search('marcel', 2), ['1'])
+        self.assertEqual(len(self.tree), 2)
+
+    def test_rebuild(self):
+        self.assertEqual(self.tree._nodes, {})
+        self.tree.search('Mirel', 0)
+        self.tree.add_many(Client(str(i), 'name' + str(i)) for i in range(10, 60))
+        self.assertEqual(len(self.tree._nodes), 55)
+        self.tree.discard_many(str(i) for i in range(10, 59))
+        self.assertLess(len(self.tree._nodes), 10)
+        self.assertEqual(self.tree.search('name58', 1), ['59'])
+        self.assertEqual(self.tree.search('Mirel', 0), ['1', '6'])
@@ -1,7 +1,11 @@
 from unittest import TestCase
 
 from domain.Client import Client
-from repository.Iterable import Iterable
+from repository.BKTree import BKTree
+from repository.QueryCache import cached
+from repository.Repository import Repository
+from repository.SortedIndex import SortedIndex, id_key
+from repository.TrigramIndex import TrigramIndex
 
 
 class ClientBaseError(Exception):
@@ -9,9 +13,11 @@ class ClientBaseError(Exception):
         self._message = message
 
 
-class ClientBase:
+class ClientBase(Repository):
     """
     The ClientBase class represents a repository for Clients
+    Indexed by id and name for listing, by the trigrams of the id and name for searching
+    and by a BK-tree of the names for fuzzy searches
     Attributes:
         list: list of Client
 
@@ -21,127 +27,117 @@ class ClientBase:
         update_client: changes the attributes of a Client
         find_client: finds a client in the list by the id
     """
+    error = ClientBaseError
+    duplicate_message = "Client with the same id already found"
+    missing_message = "Client doesn't exist in the list"
+    indexes = {
+        'id': lambda: SortedIndex(lambda client: id_key(client.id)),
+        'name': lambda: SortedIndex(lambda client: client.name.lower()),
+        'id_trigrams': lambda: TrigramIndex(lambda client: client.id),
+        'name_trigrams': lambda: TrigramIndex(lambda client: client.name.lower()),
+        'name_tree': lambda: BKTree(lambda client: client.name),
+    }
+
+    def clients_ordered_by(self, field, reverse=False):
+        """
+        Lists the clients ordered by a field, without changing the order of the repository
+        Args:
+            field: 'id' or 'name' - string
+            reverse: descending order - bool
 
-    def __init__(self, list=None):
-        if list is None:
-            self._list = Iterable()
-        else:
-            self._list = list
-
-    @property
-    def list(self):
-        return self._list
-
-    @list.setter
-    def list(self, list):
-        self._list = list[:]
+        Returns: the clients - generator
+        """
+        return self.ordered(field, reverse)
 
     def find_client(self, id):
         """
         Find the client with the given id from the list
         If not found, return false
         """
-        for client in self.list:
-            if client.id == id:
-                return client
-        return False
+        return self.find(id)
+
+    def query_clients(self):
+        """
+        Starts a lazy query over the clients
+        Returns: Query
+        """
+        return self.query()
 
-    def search_client_by_id(self, id):
+    @cached
+    def search_client_by_id(self, id, limit=None):
         """
         Finds all clients that have the given in their id
         Args:
             id: id to be searched by - string
+            limit: maximum number of clients returned, None for all - int
 
         Returns: a list of Client
 
         """
-        result = []
-        for client in self.list:
-            if client.id.find(id) != -1:
-                result.append(client)
-        return result
+        return list(self.list.items(self.list.index('id_trigrams').search(id, limit)))
 
-    def search_client_by_name(self, name):
+    @cached
+    def search_client_by_name(self, name, limit=None):
         """
         Finds a list of clients with the given name in their name
         Args:
             name: name of the client - string
+            limit: maximum number of clients returned, None for all - int
 
         Returns: list of Clients
 
         """
-        result = []
-        for client in self.list:
-            if client.name.lower().find(name.lower()) != -1:
-                result.append(client)
-        return result
+        return list(self.list.items(self.list.index('name_trigrams').search(name.lower(), limit)))
+
+    @cached
+    def fuzzy_search_client_by_name(self, name, max_distance=2, limit=5):
+        """
+        Finds the clients whose name is the closest to a possibly mistyped name
+        Names are compared lowercase, without accents and extra spaces, by edit distance.
+        Args:
+            name: name of the client - string
+            max_distance: largest number of typos accepted - int
+            limit: maximum number of clients returned, None for all within max_distance - int
+
+        Returns: list of Client, the closest first
+
+        """
+        return list(self.list.items(self.list.index('name_tree').search(name, max_distance, limit)))
 
     def add_client(self, client):
         """
         Adds the given Client to the list.
         Raise ClientBaseError in case that a client with the same id already found
         """
-        if not self.find_client(client.id):
-            self.list.append(client)
-        else:
-            raise ClientBaseError("Client with the same id already found")
+        self.add(client)
 
     def remove_client(self, id):
         """
         Removes the Client with the given id from the list
         Raises ClientBaseError in case Client doesn't exist
         """
-        client = self.find_client(id)
-        if client:
-            self.list.remove(client)
-        else:
-            raise ClientBaseError("Client doesn't exist in the list")
+        self.remove(id)
 
     def update_client_name(self, id, name):
         """
         Updates the name of the Client with the given id
         Raises ClientBaseError in case the Client doesn't exist
         """
-        # for i in range(len(self.list)):
-        #     if self.list[i].id == id:
-        #         self.li
-        found = False
-        for customer in self.list:
-            if customer.id  == id:
-                customer.name = name
-                found = True
-        if not found:
-            raise ClientBaseError("Client doesn't exist in the list")
+        self.update(id, name=name)
 
     def update_client_id(self, id, new_id):
         """
         Updates the id of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
+        Raises ClientBaseError in case the Client doesn't exist or the new id is already found
         """
-        # for i in range(len(self.list)):
-        #     if self.list[i].id == id:
-        #         self.li
-        found = False
-        for customer in self.list:
-            if customer.id == id:
-                customer.id = new_id
-                found = True
-        if not found:
-            raise ClientBaseError("Client doesn't exist in the list")
+        self.rekey(id, new_id)
 
     def update_client_worthy(self, id, worthy):
         """
-        Updates the id of the Client with the given id
+        Updates the worthiness of the Client with the given id
         Raises ClientBaseError in case the Client doesn't exist
-                """
-        found = False
-        for customer in self.list:
-            if customer.id == id:
-                customer.worthy = worthy
-                found = True
-        if not found:
-            raise ClientBaseError("Client doesn't exist in the list")
-
+        """
+        self.update(id, worthy=worthy)
 
 
 class TestClientBase(TestCase):
@@ -223,7 +219,58 @@ class TestClientBase(TestCase):
         cb.add_client(Client('687', 'Marcela'))
         result = cb.search_client_by_name('r')
         self.assertEqual(len(result), 4)
+        result = cb.search_client_by_name('r', limit=2)
+        self.assertEqual([client.name for client in result], ['Mirel', 'Relu'])
+
+    def test_fuzzy_search_client_by_name(self):
+        cb = ClientBase()
+        cb.add_many([Client('213', 'Mirel'), Client('520', 'Relu'), Client('964', 'Dana'), Client('687', 'Marcela')])
+        self.assertEqual([client.id for client in cb.fuzzy_search_client_by_name('mirell')], ['213'])
+        self.assertEqual([client.id for client in cb.fuzzy_search_client_by_name('Marcel', 1)], ['687'])
+        self.assertEqual(cb.fuzzy_search_client_by_name('Ionut'), [])
+        cb.update_client_name('520', 'Mirela')
+        self.assertEqual([client.id for client in cb.fuzzy_search_client_by_name('Mirel', 2, 1)], ['213'])
+        self.assertEqual([client.id for client in cb.fuzzy_search_client_by_name('Mirela', 1)], ['520', '213'])
+        cb.remove_client('213')
+        self.assertEqual([client.id for client in cb.fuzzy_search_client_by_name('Mirel')], ['520'])
+
+    def test_clients_ordered_by(self):
+        cb = ClientBase()
+        cb.add_client(Client('213', 'Mirel'))
+        cb.add_client(Client('52', 'relu'))
+        cb.add_client(Client('964', 'Dana'))
+        cb.update_client_name('964', 'Sara')
+        self.assertEqual([client.id for client in cb.clients_ordered_by('id')], ['52', '213', '964'])
+        self.assertEqual([client.id for client in cb.clients_ordered_by('name')], ['213', '52', '964'])
+        self.assertEqual([client.id for client in cb.clients_ordered_by('name', True)], ['964', '52', '213'])
+        self.assertEqual([client.id for client in cb.list], ['213', '52', '964'])
+
+    def test_cursor(self):
+        cb = ClientBase()
+        cb.add_many([Client(str(i), 'Client' + str(i)) for i in range(1, 26)])
+        cursor = cb.cursor(10)
+        self.assertEqual([client.id for client in cursor.fetch()], [str(i) for i in range(1, 11)])
+        cb.remove_client('12')
+        self.assertEqual([len(page) for page in cursor], [10, 4])
 
+    def test_add_many(self):
+        cb = ClientBase()
+        cb.add_client(Client('213', 'Mirel'))
+        cb.add_many([Client('520', 'Relu'), Client('964', 'Dana')])
+        self.assertEqual(len(cb.list), 3)
+        with self.assertRaises(ClientBaseError):
+            cb.add_many([Client('1', 'Ana'), Client('213', 'Mirel')])
+        with self.assertRaises(ClientBaseError):
+            cb.add_many([Client('1', 'Ana'), Client('1', 'Ana')])
+        self.assertFalse(cb.find_client('1'))
+
+    def test_remove_many(self):
+        cb = ClientBase()
+        cb.add_many([Client('213', 'Mirel'), Client('520', 'Relu'), Client('964', 'Dana')])
+        with self.assertRaises(ClientBaseError):
+            cb.remove_many(['213', '1'])
+        cb.remove_many(['213', '964'])
+        self.assertEqual([client.id for client in cb.list], ['520'])
 
 # test_find_client()
 # tes_add_client()
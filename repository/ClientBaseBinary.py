@@ -1,7 +1,7 @@
 from unittest import TestCase
 from domain.Client import Client
 from repository.ClientBase import ClientBase, ClientBaseError
-import pickle
+from repository.Persistence import BinaryFormatError, StructFile
 
 
 class ClientBaseBinary(ClientBase):
@@ -18,16 +18,16 @@ class ClientBaseBinary(ClientBase):
     """
 
     def __init__(self, file):
-        super().__init__()
-        self._file_name = file
+        super().__init__(persistence=StructFile(file, 'ssb', self.obj_to_fields, Client, self.string_to_obj,
+                                                self.obj_to_string))
 
     @property
     def file_name(self):
-        return self._file_name
+        return self.persistence.file_name
 
     @file_name.setter
     def file_name(self, file_name):
-        self._file_name = file_name
+        self.persistence.file_name = file_name
 
     @staticmethod
     def string_to_obj(string):
@@ -40,7 +40,7 @@ class ClientBaseBinary(ClientBase):
 
         """
         attributes = string.strip().split(';')
-        client = Client(attributes[0].strip(), attributes[1].strip(), attributes[2].strip())
+        client = Client(attributes[0].strip(), attributes[1].strip(), attributes[2].strip() != 'False')
         return client
 
     @staticmethod
@@ -56,6 +56,18 @@ class ClientBaseBinary(ClientBase):
         string = client.id + ' ; ' + client.name + ' ; ' + str(client.worthy) + '\n'
         return string
 
+    @staticmethod
+    def obj_to_fields(client):
+        """
+        Gives the values of the fields stored in a record of the binary file for a Client
+        Args:
+            client: Client to be stored - Client
+
+        Returns: the values of the fields, in the order of the constructor of Client - tuple
+
+        """
+        return client.id, client.name, client.worthy
+
     def load_file(self):
         """
         Loads into the repo the data found in the auxiliary file
@@ -63,15 +75,11 @@ class ClientBaseBinary(ClientBase):
 
         """
         try:
-            f = open(self._file_name, "rb")
-            string_list = pickle.load(f)
-            for str in string_list:
-                super(ClientBaseBinary, self).add_client(self.string_to_obj(str))
-            f.close()
+            self.load()
         except EOFError:
             raise ClientBaseError("Empty binary file")
-        except IOError as e:
-            raise e
+        except BinaryFormatError:
+            raise ClientBaseError("Unsupported binary file")
 
     def save_file(self):
         """
@@ -79,88 +87,7 @@ class ClientBaseBinary(ClientBase):
         Returns:
 
         """
-        f = open(self._file_name, "wb")
-        string_list = []
-        for client in self.list:
-            client_str = self.obj_to_string(client)
-            string_list.append(client_str)
-        pickle.dump(string_list, f)
-        f.close()
-
-    def find_client(self, id):
-        """
-        Find the client with the given id from the list
-        If not found, return false
-        """
-        return super(ClientBaseBinary, self).find_client(id)
-
-    def search_client_by_id(self, id):
-        """
-        Finds all clients that have the given in their id
-        Args:
-            id: id to be searched by - string
-
-        Returns: a list of Client
-
-        """
-        result = []
-        for client in self.list:
-            if client.id.find(id) != -1:
-                result.append(client)
-        return result
-
-    def search_client_by_name(self, name):
-        """
-        Finds a list of clients with the given name in their name
-        Args:
-            name: name of the client - string
-
-        Returns: list of Clients
-
-        """
-        return super(ClientBaseBinary, self).search_client_by_name(name)
-
-    def add_client(self, client):
-        """
-        Adds the given Client to the list.
-        Raise ClientBaseError in case that a client with the same id already found
-        """
-        super(ClientBaseBinary, self).add_client(client)
-        self.save_file()
-
-    def remove_client(self, id):
-        """
-        Removes the Client with the given id from the list
-        Raises ClientBaseError in case Client doesn't exist
-        """
-
-        super(ClientBaseBinary, self).remove_client(id)
-        self.save_file()
-
-    def update_client_name(self, id, name):
-        """
-        Updates the name of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-
-        super(ClientBaseBinary, self).update_client_name(id, name)
-        self.save_file()
-
-    def update_client_id(self, id, new_id):
-        """
-        Updates the id of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-        super(ClientBaseBinary, self).update_client_id(id, new_id)
-        self.save_file()
-
-    def update_client_worthy(self, id, worthy):
-        """
-        Updates the id of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-        super(ClientBaseBinary, self).update_client_worthy(id, worthy)
-        self.save_file()
+        self.save()
 
 
 # cb = ClientBaseBinary()
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from domain.Client import Client
+from repository.ClientBase import ClientBase, ClientBaseError
+from repository.QueryCache import cached
+from repository.SQLiteRepository import SQLiteRepository
+
+
+class ClientBaseSQLite(SQLiteRepository, ClientBase):
+    """
+    The ClientBase class represents a repository for Clients, kept in the clients table of an SQLite database
+    The substring searches run in SQL, the fuzzy search builds the BK-tree of the names from the table.
+    Attributes:
+        list: the clients table - SQLiteTable
+
+    Methods:
+        add_client: adds a Client to the list
+        remove_client: removes a Client from the list
+        update_client: changes the attributes of a Client
+        find_client: finds a client in the list by the id
+    """
+    table = 'clients'
+    columns = ('id', 'name', 'worthy')
+    schema = [
+        'CREATE TABLE IF NOT EXISTS clients (id TEXT PRIMARY KEY, name TEXT NOT NULL, worthy INTEGER NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS clients_name ON clients (lower(name))',
+    ]
+    orders = {
+        'id': ('length(id)', 'id'),
+        'name': ('lower(name)',),
+    }
+
+    def to_obj(self, row):
+        return Client(row[0], row[1], bool(row[2]))
+
+    def to_row(self, client):
+        return client.id, client.name, int(client.worthy)
+
+    @cached
+    def search_client_by_id(self, id, limit=None):
+        return list(self.list.select('instr(id, ?) > 0', (id,), limit=limit))
+
+    @cached
+    def search_client_by_name(self, name, limit=None):
+        return list(self.list.select('instr(lower(name), ?) > 0', (name.lower(),), limit=limit))
+
+    @cached
+    def fuzzy_search_client_by_name(self, name, max_distance=2, limit=5):
+        return list(self.list.items(self.index('name_tree').search(name, max_distance, limit)))
+
+
+class TestClientBaseSQLite(TestCase):
+    def setUp(self):
+        self.cb = ClientBaseSQLite(':memory:')
+        self.cb.add_many([Client('213', 'Mirel'), Client('520', 'Relu'), Client('964', 'Dana'),
+                          Client('120', 'Lorin'), Client('687', 'Marcela')])
+
+    def test_add_remove_update(self):
+        with self.assertRaises(ClientBaseError):
+            self.cb.add_client(Client('687', 'Marcela'))
+        self.cb.remove_client('120')
+        self.assertFalse(self.cb.find_client('120'))
+        with self.assertRaises(ClientBaseError):
+            self.cb.remove_client('120')
+        self.cb.update_client_name('520', 'Gelu')
+        self.cb.update_client_worthy('520', False)
+        self.assertEqual((self.cb.find_client('520').name, self.cb.find_client('520').worthy), ('Gelu', False))
+        self.cb.update_client_id('520', '000')
+        self.assertEqual(self.cb.find_client('000').name, 'Gelu')
+        with self.assertRaises(ClientBaseError):
+            self.cb.update_client_id('000', '213')
+
+    def test_search(self):
+        self.assertEqual(len(self.cb.search_client_by_id('2')), 3)
+        self.assertEqual([client.name for client in self.cb.search_client_by_name('r', limit=2)], ['Mirel', 'Relu'])
+        self.assertEqual([client.id for client in self.cb.fuzzy_search_client_by_name('mirell')], ['213'])
+        self.cb.update_client_name('520', 'Mirela')
+        self.assertEqual([client.id for client in self.cb.fuzzy_search_client_by_name('Mirela', 1)], ['520', '213'])
+
+    def test_order(self):
+        self.cb.add_client(Client('52', 'relu'))
+        self.assertEqual([client.id for client in self.cb.clients_ordered_by('id')][:2], ['52', '120'])
+        self.assertEqual([client.id for client in self.cb.clients_ordered_by('name', True)][:2], ['520', '52'])
+        self.assertEqual([len(page) for page in self.cb.cursor(4)], [4, 2])
@@ -2,6 +2,7 @@ from unittest import TestCase
 
 from domain.Client import Client
 from repository.ClientBase import ClientBase
+from repository.Persistence import JournalFile
 
 
 class ClientBaseText(ClientBase):
@@ -18,16 +19,15 @@ class ClientBaseText(ClientBase):
     """
 
     def __init__(self, file):
-        super().__init__()
-        self._file_name = file
+        super().__init__(persistence=JournalFile(file, self.string_to_obj, self.obj_to_string))
 
     @property
     def file_name(self):
-        return self._file_name
+        return self.persistence.file_name
 
     @file_name.setter
     def file_name(self, file_name):
-        self._file_name = file_name
+        self.persistence.file_name = file_name
 
     @staticmethod
     def string_to_obj(string):
@@ -58,109 +58,20 @@ class ClientBaseText(ClientBase):
 
     def load_file(self):
         """
-        Loads into the repo the data found in the auxiliary file
+        Loads into the repo the data found in the auxiliary file and the changes journaled since it was written
         Returns:
 
         """
-        try:
-            f = open(self._file_name, "r")
-            line = f.readline()
-            while len(line) > 0:
-                super(ClientBaseText, self).add_client(self.string_to_obj(line))
-                line = f.readline()
-            f.close()
-        except IOError as e:
-            raise e
+        self.load()
 
     def save_file(self):
         """
-        Saves into the auxiliary file the current state of the repo
+        Saves into the auxiliary file the current state of the repo, folding the journal into it
+        Every change is only appended to the journal, see repository.Persistence.JournalFile
         Returns:
 
         """
-        f = open(self._file_name, "w")
-        try:
-            for client in self.list:
-                client_str = self.obj_to_string(client)
-                f.write(client_str)
-            f.close()
-        except Exception as e:
-            raise e
-
-    def find_client(self, id):
-        """
-        Find the client with the given id from the list
-        If not found, return false
-        """
-        return super(ClientBaseText, self).find_client(id)
-
-    def search_client_by_id(self, id):
-        """
-        Finds all clients that have the given in their id
-        Args:
-            id: id to be searched by - string
-
-        Returns: a list of Client
-
-        """
-        result = []
-        for client in self.list:
-            if client.id.find(id) != -1:
-                result.append(client)
-        return result
-
-    def search_client_by_name(self, name):
-        """
-        Finds a list of clients with the given name in their name
-        Args:
-            name: name of the client - string
-
-        Returns: list of Clients
-
-        """
-        return super(ClientBaseText, self).search_client_by_name(name)
-
-    def add_client(self, client):
-        """
-        Adds the given Client to the list.
-        Raise ClientBaseError in case that a client with the same id already found
-        """
-        super(ClientBaseText, self).add_client(client)
-        self.save_file()
-
-    def remove_client(self, id):
-        """
-        Removes the Client with the given id from the list
-        Raises ClientBaseError in case Client doesn't exist
-        """
-
-        super(ClientBaseText, self).remove_client(id)
-        self.save_file()
-
-    def update_client_name(self, id, name):
-        """
-        Updates the name of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-
-        super(ClientBaseText, self).update_client_name(id, name)
-        self.save_file()
-
-    def update_client_id(self, id, new_id):
-        """
-        Updates the id of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-        super(ClientBaseText, self).update_client_id(id, new_id)
-        self.save_file()
-
-    def update_client_worthy(self, id, worthy):
-        """
-        Updates the id of the Client with the given id
-        Raises ClientBaseError in case the Client doesn't exist
-        """
-        super(ClientBaseText, self).update_client_worthy(id, worthy)
-        self.save_file()
+        self.save()
 
 
 # cb = ClientBaseText()
@@ -183,7 +94,7 @@ class TestClientBaseText(TestCase):
         self.cb.add_client(Client('3', 'Mircea'))
 
     def test_load_file(self):
-        f = open(self.cb._file_name, "w")
+        f = open(self.cb.file_name, "w")
         f.write('7 ; m ; True\n')
         f.write('8 ; n ; True\n')
         f.write('9 ; mvp ; True\n')
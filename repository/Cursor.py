@@ -0,0 +1,131 @@
+"""
+Cursor class
+"""
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+class CursorError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class Page:
+    """
+    One page of results
+    Attributes:
+        items: the items on the page - list
+        token: resume token of the next page, None if this is the last page - tuple
+    """
+    def __init__(self, items, token):
+        self._items = items
+        self._token = token
+
+    @property
+    def items(self):
+        return self._items
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def last(self):
+        return self._token is None
+
+    def __iter__(self):
+        return self._items.__iter__()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Cursor:
+    """
+    Pages through an Iterable in the order of one of its sorted indexes, using keyset pagination
+    Each page costs O(log n + page size) and only the current page is kept in memory. The resume token of a
+    cursor can be saved and given to a new cursor to continue from the same place, even after the items changed.
+    Attributes:
+        iterable: the items - Iterable
+        index_name: name of the SortedIndex giving the order - string
+        page_size: maximum number of items on a page - int
+        token: where the next page starts, None for the beginning - tuple
+
+    Methods:
+        fetch: returns the next page
+    """
+    def __init__(self, iterable, index_name, page_size=20, token=None):
+        if page_size < 1:
+            raise CursorError("Page size must be at least 1")
+        self._iterable = iterable
+        self._index_name = index_name
+        self._page_size = page_size
+        self._token = token
+        self._done = False
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def done(self):
+        return self._done
+
+    def fetch(self):
+        """
+        Returns: the next page, empty once all the items were returned - Page
+        """
+        if self._done:
+            return Page([], None)
+        items, self._token = self._iterable.page(self._index_name, self._page_size, self._token)
+        self._done = self._token is None
+        return Page(items, self._token)
+
+    def __iter__(self):
+        """
+        Returns: the remaining pages - generator
+        """
+        while not self._done:
+            yield self.fetch()
+
+
+class TestCursor(TestCase):
+    def setUp(self):
+        # Imported here, as Iterable itself imports this module
+        from repository.Iterable import Iterable
+        from repository.SortedIndex import SortedIndex
+
+        self.it = Iterable([Client(str(i), 'name' + str(i)) for i in range(10)])
+        self.it.add_index('id', SortedIndex(lambda client: int(client.id)))
+
+    def test_fetch(self):
+        cursor = Cursor(self.it, 'id', 4)
+        self.assertEqual([client.id for client in cursor.fetch()], ['0', '1', '2', '3'])
+        page = cursor.fetch()
+        self.assertEqual([client.id for client in page], ['4', '5', '6', '7'])
+        self.assertFalse(page.last)
+        page = cursor.fetch()
+        self.assertEqual([client.id for client in page], ['8', '9'])
+        self.assertTrue(page.last)
+        self.assertTrue(cursor.done)
+        self.assertEqual(len(cursor.fetch()), 0)
+
+    def test_resume(self):
+        cursor = Cursor(self.it, 'id', 3)
+        cursor.fetch()
+        del self.it['1']
+        del self.it['3']
+        resumed = Cursor(self.it, 'id', 3, cursor.token)
+        self.assertEqual([client.id for client in resumed.fetch()], ['4', '5', '6'])
+
+    def test_iter(self):
+        pages = [page.items for page in Cursor(self.it, 'id', 5)]
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[1][-1].id, '9')
+        with self.assertRaises(CursorError):
+            Cursor(self.it, 'id', 0)
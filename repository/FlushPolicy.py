@@ -0,0 +1,109 @@
+"""
+FlushPolicy class
+"""
+from unittest import TestCase
+
+
+class FlushPolicyError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class FlushPolicy:
+    """
+    Decides when a repository writes the changes it has not saved yet
+    The interval is checked when a change is made, and the repository starts a timer when changes stay pending, so
+    they are written once the interval has passed even if no other change comes.
+    Attributes:
+        every: number of pending changes written together, None to not count them - int
+        interval: milliseconds after which the pending changes are written, None to not time them - int
+
+    Methods:
+        immediate: writes every change
+        every_changes: writes every n changes
+        every_milliseconds: writes the changes made in a time interval together
+        manual: writes only on flush
+        parse: the policy described by a setting
+        due: whether the pending changes must be written
+    """
+    def __init__(self, every=1, interval=None):
+        self._every = every
+        self._interval = interval
+
+    @property
+    def every(self):
+        return self._every
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @staticmethod
+    def immediate():
+        return FlushPolicy(1)
+
+    @staticmethod
+    def every_changes(count):
+        return FlushPolicy(count)
+
+    @staticmethod
+    def every_milliseconds(interval):
+        return FlushPolicy(None, interval)
+
+    @staticmethod
+    def manual():
+        return FlushPolicy(None)
+
+    @staticmethod
+    def parse(text):
+        """
+        Finds the policy described by a setting
+        Args:
+            text: 'immediate', 'every <changes>', 'interval <milliseconds>' or 'manual' - string
+
+        Returns: FlushPolicy
+        Raises FlushPolicyError if the text describes no policy
+        """
+        tokens = text.strip().lower().split()
+        if tokens == ['immediate']:
+            return FlushPolicy.immediate()
+        if tokens == ['manual']:
+            return FlushPolicy.manual()
+        if len(tokens) == 2 and tokens[1].isnumeric() and int(tokens[1]) > 0:
+            if tokens[0] == 'every':
+                return FlushPolicy.every_changes(int(tokens[1]))
+            if tokens[0] == 'interval':
+                return FlushPolicy.every_milliseconds(int(tokens[1]))
+        raise FlushPolicyError("Unknown flush policy")
+
+    def due(self, pending, elapsed):
+        """
+        Checks whether the pending changes must be written
+        Args:
+            pending: number of changes not written - int
+            elapsed: milliseconds since the last write - float
+
+        Returns: True if they must, False if not
+        """
+        if self._every is not None and pending >= self._every:
+            return True
+        return self._interval is not None and elapsed >= self._interval
+
+
+class TestFlushPolicy(TestCase):
+    def test_due(self):
+        self.assertTrue(FlushPolicy.immediate().due(1, 0))
+        self.assertFalse(FlushPolicy.every_changes(3).due(2, 10 ** 6))
+        self.assertTrue(FlushPolicy.every_changes(3).due(3, 0))
+        self.assertFalse(FlushPolicy.every_milliseconds(500).due(100, 499))
+        self.assertTrue(FlushPolicy.every_milliseconds(500).due(1, 500))
+        self.assertFalse(FlushPolicy.manual().due(10 ** 6, 10 ** 6))
+
+    def test_parse(self):
+        self.assertEqual(FlushPolicy.parse(' Every 100 ').every, 100)
+        self.assertEqual(FlushPolicy.parse('interval 250').interval, 250)
+        self.assertIsNone(FlushPolicy.parse('manual').every)
+        self.assertEqual(FlushPolicy.parse('immediate').every, 1)
+        for text in ('every', 'every 0', 'sometimes', 'interval x'):
+            with self.assertRaises(FlushPolicyError):
+                FlushPolicy.parse(text)
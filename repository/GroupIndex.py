@@ -0,0 +1,121 @@
+"""
+GroupIndex class
+"""
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+class GroupIndex:
+    """
+    Secondary index grouping the ids of items by a key, a multimap from every key to the items having it
+    Every group keeps its ids in the order the items were added to it. Items whose key is None are not indexed,
+    so a key function returning True or None keeps the set of items satisfying a condition.
+    Attributes:
+        key: function giving the group of an item - function
+        _groups: maps every key to its ids, kept as the keys of a dict to remove them in O(1) - dict of dict
+        _by_id: maps every indexed id to its key - dict
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        ids: the ids of the items having a key
+        count: the number of items having a key
+    """
+    def __init__(self, key):
+        self._key = key
+        self._groups = {}
+        self._by_id = {}
+
+    @property
+    def key(self):
+        return self._key
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._groups = {}
+        self._by_id = {}
+
+    def add(self, item):
+        """
+        Adds the item to the index, or moves it to its new group if its key changed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        key = self._key(item)
+        if item.id in self._by_id:
+            if self._by_id[item.id] == key:
+                return
+            self.discard(item.id)
+        if key is not None:
+            self._groups.setdefault(key, {})[item.id] = None
+            self._by_id[item.id] = key
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        if id in self._by_id:
+            key = self._by_id.pop(id)
+            group = self._groups[key]
+            del group[id]
+            if not group:
+                del self._groups[key]
+
+    def discard_many(self, ids):
+        for id in ids:
+            self.discard(id)
+
+    def ids(self, key):
+        """
+        Returns: the ids of the items having the key, in the order they were added - list
+        """
+        return list(self._groups.get(key, ()))
+
+    def count(self, key):
+        """
+        Returns: the number of items having the key - int
+        """
+        return len(self._groups.get(key, ()))
+
+    def keys(self):
+        """
+        Returns: the keys having at least one item - list
+        """
+        return list(self._groups)
+
+
+class TestGroupIndex(TestCase):
+    def setUp(self):
+        self.index = GroupIndex(lambda client: client.name)
+        self.index.add_many([Client('1', 'Ana'), Client('2', 'Dan'), Client('3', 'Ana'), Client('4', 'Ion')])
+
+    def test_ids(self):
+        self.assertEqual(self.index.ids('Ana'), ['1', '3'])
+        self.assertEqual(self.index.ids('Vlad'), [])
+        self.assertEqual(self.index.count('Ana'), 2)
+        self.assertEqual(self.index.keys(), ['Ana', 'Dan', 'Ion'])
+
+    def test_update(self):
+        self.index.add(Client('1', 'Dan'))
+        self.assertEqual(self.index.ids('Ana'), ['3'])
+        self.assertEqual(self.index.ids('Dan'), ['2', '1'])
+        self.index.discard('3')
+        self.assertEqual(self.index.keys(), ['Dan', 'Ion'])
+        self.index.discard_many(['1', '4', '9'])
+        self.assertEqual(len(self.index), 1)
+
+    def test_condition(self):
+        index = GroupIndex(lambda client: True if client.worthy else None)
+        index.add_many([Client('1', 'Ana'), Client('2', 'Dan', False)])
+        self.assertEqual(index.ids(True), ['1'])
+        index.add(Client('2', 'Dan', True))
+        index.add(Client('1', 'Ana', False))
+        self.assertEqual(index.ids(True), ['2'])
+        self.assertEqual(len(index), 1)
@@ -0,0 +1,202 @@
+"""
+IntervalIndex class
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from unittest import TestCase
+
+from domain.Rental import Rental
+
+
+class IntervalIndex:
+    """
+    Secondary index of the date intervals items occupy, grouped by a key, such as the rentals of every movie
+    Every group keeps its intervals sorted by start together with the running maximum of their ends (the reach),
+    so whether a date or a range overlaps an interval of the group is found with a binary search.
+    Intervals are closed: an interval ending on a day still occupies that day.
+    Attributes:
+        group: function giving the group of an item - function
+        interval: function giving the (start, end) dates of an item - function
+        _entries: maps every group to its (start, sequence number, end, id), sorted - dict of list
+        _reach: maps every group to the running maximum of the ends of its entries - dict of list
+        _by_id: maps every indexed id to its group and entry - dict
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        reach: the latest end of the intervals of a group
+        is_free: whether a date or a range overlaps no interval of a group
+        next_free: the first free window of some days in a group
+    """
+    def __init__(self, group, interval):
+        self._group = group
+        self._interval = interval
+        self._entries = {}
+        self._reach = {}
+        self._by_id = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._entries = {}
+        self._reach = {}
+        self._by_id = {}
+
+    def add(self, item):
+        """
+        Adds the item to the index, or moves its interval if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        self.discard(item.id)
+        group = self._group(item)
+        start, end = self._interval(item)
+        entry = (start, self._sequence, end, item.id)
+        self._sequence += 1
+        entries = self._entries.setdefault(group, [])
+        position = bisect_left(entries, entry)
+        entries.insert(position, entry)
+        self._refresh_reach(group, position)
+        self._by_id[item.id] = (group, entry)
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        if id not in self._by_id:
+            return
+        group, entry = self._by_id.pop(id)
+        entries = self._entries[group]
+        position = bisect_left(entries, entry)
+        del entries[position]
+        if entries:
+            self._refresh_reach(group, position)
+        else:
+            del self._entries[group]
+            del self._reach[group]
+
+    def discard_many(self, ids):
+        for id in ids:
+            self.discard(id)
+
+    def _refresh_reach(self, group, position):
+        """
+        Recomputes the running maximum of the ends from a position on, which is only the new entry when appending
+        """
+        entries = self._entries[group]
+        reach = self._reach.setdefault(group, [])
+        del reach[position:]
+        current = reach[-1] if reach else None
+        for entry in entries[position:]:
+            if current is None or entry[2] > current:
+                current = entry[2]
+            reach.append(current)
+
+    def groups(self):
+        """
+        Returns: the groups having at least one interval - list
+        """
+        return list(self._entries)
+
+    def reach(self, group):
+        """
+        Returns: the latest end of the intervals of the group, None if it has none - date
+        """
+        reach = self._reach.get(group)
+        return reach[-1] if reach else None
+
+    def is_free(self, group, start, end=None):
+        """
+        Checks whether no interval of the group overlaps a date or a range of dates, in O(log n)
+        Args:
+            group: the group checked
+            start: the date, or the first day of the range - date
+            end: the last day of the range, None to check only the start - date
+
+        Returns: True if free, False if not
+        """
+        if end is None:
+            end = start
+        entries = self._entries.get(group)
+        if not entries:
+            return True
+        # The intervals starting at most on the last day are a prefix, they overlap the range if one reaches its start
+        count = bisect_right(entries, (end, float('inf')))
+        return count == 0 or self._reach[group][count - 1] < start
+
+    def next_free(self, group, after, days):
+        """
+        Finds the first window of consecutive days overlapping no interval of the group
+        Args:
+            group: the group checked
+            after: first day the window may start on - date
+            days: length of the window - int
+
+        Returns: the first day of the window - date, None if there is no such window
+        """
+        entries = self._entries.get(group, [])
+        candidate = after
+        # Skips, with a binary search, the intervals all ending before the first day possible
+        position = bisect_left(self._reach.get(group, []), after)
+        for start, sequence, end, id in entries[position:]:
+            if (start - candidate).days >= days:
+                return candidate
+            if end >= candidate:
+                if end == date.max:
+                    return None
+                candidate = end + timedelta(days=1)
+        try:
+            candidate + timedelta(days=days - 1)
+        except OverflowError:
+            return None
+        return candidate
+
+
+class TestIntervalIndex(TestCase):
+    def setUp(self):
+        self.index = IntervalIndex(lambda rental: rental.movie_id,
+                                   lambda rental: (rental.rented_date, rental.returned_date or date.max))
+        self.index.add_many([Rental('1', '1', date(2002, 1, 1), date(2002, 1, 20), date(2002, 2, 10)),
+                             Rental('1', '2', date(2002, 1, 5), date(2002, 1, 10), date(2002, 1, 9)),
+                             Rental('1', '3', date(2002, 2, 20), date(2002, 3, 1), date(2002, 2, 25)),
+                             Rental('2', '1', date(2002, 3, 1), date(2002, 3, 10))])
+
+    def test_is_free(self):
+        self.assertFalse(self.index.is_free('1', date(2002, 1, 15)))
+        self.assertFalse(self.index.is_free('1', date(2002, 2, 10)))
+        self.assertTrue(self.index.is_free('1', date(2002, 2, 11)))
+        self.assertTrue(self.index.is_free('1', date(2002, 2, 11), date(2002, 2, 19)))
+        self.assertFalse(self.index.is_free('1', date(2002, 2, 11), date(2002, 2, 20)))
+        self.assertTrue(self.index.is_free('1', date(2001, 1, 1), date(2001, 12, 31)))
+        self.assertTrue(self.index.is_free('2', date(2002, 2, 28)))
+        self.assertFalse(self.index.is_free('2', date(2003, 1, 1)))
+        self.assertTrue(self.index.is_free('3', date(2003, 1, 1)))
+
+    def test_reach(self):
+        self.assertEqual(self.index.reach('1'), date(2002, 2, 25))
+        self.assertEqual(self.index.reach('2'), date.max)
+        self.assertIsNone(self.index.reach('3'))
+
+    def test_next_free(self):
+        self.assertEqual(self.index.next_free('1', date(2002, 1, 3), 5), date(2002, 2, 11))
+        self.assertEqual(self.index.next_free('1', date(2002, 1, 3), 10), date(2002, 2, 26))
+        self.assertEqual(self.index.next_free('1', date(2001, 12, 1), 10), date(2001, 12, 1))
+        self.assertEqual(self.index.next_free('1', date(2002, 2, 12), 3), date(2002, 2, 12))
+        self.assertEqual(self.index.next_free('2', date(2002, 1, 1), 5), date(2002, 1, 1))
+        self.assertIsNone(self.index.next_free('2', date(2002, 2, 27), 5))
+        self.assertEqual(self.index.next_free('3', date(2002, 1, 1), 5), date(2002, 1, 1))
+
+    def test_update(self):
+        self.index.add(Rental('2', '1', date(2002, 3, 1), date(2002, 3, 10), date(2002, 3, 5)))
+        self.assertEqual(self.index.reach('2'), date(2002, 3, 5))
+        self.index.discard(Rental('1', '1', date(2002, 1, 1), date(2002, 1, 20)).id)
+        self.assertTrue(self.index.is_free('1', date(2002, 1, 15)))
+        self.assertEqual(self.index.next_free('1', date(2002, 1, 3), 5), date(2002, 1, 10))
+        self.index.discard_many([Rental('2', '1', date(2002, 3, 1), date(2002, 3, 10)).id])
+        self.assertEqual(self.index.groups(), ['1'])
@@ -1,9 +1,13 @@
 """
 Iterable class
 """
+from functools import cmp_to_key
 from unittest import TestCase
 import unittest
 from domain.Client import Client
+from repository.Cursor import Cursor
+from repository.Query import Query
+from repository.SortedIndex import SortedIndex
 
 
 class IterableError(Exception):
@@ -11,83 +15,369 @@ class IterableError(Exception):
         self._message = message
 
 
+def gnome_sort(list, function):
+    """
+    Gnome sort, in place
+    list: the list to be sorted - list
+    function: should return true if the first parameter is "smaller" than the second - boolean function
+    """
+    i = 1
+    while i < len(list):
+        if i > 0 and not function(list[i-1], list[i]):
+            list[i-1], list[i] = list[i], list[i-1]
+            i -= 1
+        else:
+            i += 1
+
+
+def comparison_to_key(function):
+    """
+    Adapts a two parameter comparison function to a sort key
+    Args:
+        function: should return true if the first parameter is "smaller" than the second - boolean function
+
+    Returns: key function usable by Iterable.sort - function
+
+    """
+    def compare(a, b):
+        if function(a, b):
+            return 0 if function(b, a) else -1
+        return 1 if function(b, a) else 0
+
+    return cmp_to_key(compare)
+
+
 class Iterable:
-    def __init__(self):
-        # self._dict = {}
-        self._list = []
+    """
+    Iterable data structure keeping the items in insertion order, indexed by their id
+    The items are kept in a Python list by default. Another row store, such as RentalColumns, can be given instead;
+    it has to behave like a list whose slots can be set to None, and be constructible from an iterable of items. A
+    row store whose slots must not move, as the records of RentalFile, sets keeps_holes to True instead: its empty
+    slots are then never compacted. The items a row store already holds are indexed when it is given.
+    Attributes:
+        list: the stored items, in order - list
+        _positions: maps the id of every item to its slot in the list - dict
+        _holes: number of slots emptied by deletions and not yet compacted - int
+        _indexes: secondary indexes kept up to date with the items, by name - dict
+    """
+    def __init__(self, items=None, rows=None):
+        if rows is None:
+            rows = []
+        self._list = rows
+        self._positions = {}
+        self._holes = 0
+        self._indexes = {}
+        self._cursor = None
+        if len(rows) > 0:
+            self._reindex_positions()
+        if items is not None:
+            for item in items:
+                self.append(item)
 
     @property
     def list(self):
+        self._compact()
         return self._list
 
+    def _compact(self):
+        """
+        Drops the slots emptied by deletions and rebuilds the positions of the remaining items
+        """
+        if self._holes > 0 and not getattr(self._list, 'keeps_holes', False):
+            self._list = type(self._list)(item for item in self._list if item is not None)
+            self._reindex_positions()
+
+    def _reindex_positions(self):
+        self._positions = {}
+        self._holes = 0
+        for i, item in enumerate(self._list):
+            if item is None:
+                self._holes += 1
+            else:
+                self._positions[item.id] = i
+
     def find_item_by_id(self, id):
-        for entry in self._list:
-            if entry.id == id:
-                return entry
+        position = self._positions.get(id)
+        if position is None:
+            return False
+        return self._list[position]
 
-        return False
+    def __contains__(self, id):
+        return id in self._positions
 
     def append(self, item):
         """
-        Adds an item to the list
+        Adds an item to the list, unless an item with the same id is already stored
         Args:
             item: item to be added
 
         Returns:
 
         """
-        if not self.find_item_by_id(item.id):
+        if item.id not in self._positions:
+            self._positions[item.id] = len(self._list)
             self._list.append(item)
+            for index in self._indexes.values():
+                index.add(item)
+
+    def extend(self, items):
+        """
+        Adds several items in a single pass, skipping those whose id is already stored or repeated
+        Args:
+            items: items to be added - iterable
+
+        Returns: the items actually added - list
+
+        """
+        added = []
+        for item in items:
+            if item.id not in self._positions:
+                self._positions[item.id] = len(self._list)
+                self._list.append(item)
+                added.append(item)
+        for index in self._indexes.values():
+            index.add_many(added)
+        return added
+
+    def remove_many(self, ids):
+        """
+        Removes the items with the given ids, rebuilding the list once
+        Args:
+            ids: ids of the items to be removed - iterable
+
+        Raises IterableError if an item is not found, in which case nothing is removed
+        """
+        ids = set(ids)
+        for id in ids:
+            if id not in self._positions:
+                raise IterableError("Item not found")
+        for id in ids:
+            self._list[self._positions.pop(id)] = None
+        self._holes += len(ids)
+        for index in self._indexes.values():
+            index.discard_many(ids)
+        self._compact()
+
+    def remove(self, item):
+        """
+        Removes the given item from the list
+        Args:
+            item: item to be removed
+
+        Raises IterableError if the item is not in the list
+        """
+        self.__delitem__(item.id)
+
+    def rekey(self, id, new_id, item=None):
+        """
+        Changes the id of the item with the given id, keeping its place in the list
+        Args:
+            id: current id of the item
+            new_id: replacement id
+            item: replacement of the item, having the new id, None to only change the id of the item
+
+        Raises IterableError if the item is not found or the new id is already taken
+        """
+        if id not in self._positions:
+            raise IterableError("Item not found")
+        if new_id != id and new_id in self._positions:
+            raise IterableError("Item with the same id already exists")
+        position = self._positions.pop(id)
+        if item is None:
+            item = self._list[position]
+            item.id = new_id
+        for index in self._indexes.values():
+            index.discard(id)
+        self._list[position] = item
+        self._positions[new_id] = position
+        for index in self._indexes.values():
+            index.add(item)
+
+    def add_index(self, name, index):
+        """
+        Adds a secondary index, filled with the items already stored and kept up to date from then on
+        Args:
+            name: name of the index - string
+            index: the index, having add(item), add_many(items), discard(id), discard_many(ids)
+                and clear() - SortedIndex
+        """
+        index.clear()
+        index.add_many(self)
+        self._indexes[name] = index
+
+    def index(self, name):
+        """
+        Returns: the secondary index with the given name
+        Raises IterableError if there is no such index
+        """
+        if name not in self._indexes:
+            raise IterableError("Index not found")
+        return self._indexes[name]
+
+    def reindex(self, id):
+        """
+        Updates the secondary indexes after the item with the given id was changed in place
+        Raises IterableError if the item is not found
+        """
+        item = self.find_item_by_id(id)
+        if item is False:
+            raise IterableError("Item not found")
+        for index in self._indexes.values():
+            index.add(item)
+
+    def ordered(self, name, reverse=False):
+        """
+        Lists the items in the order of a sorted index, without changing the order of the list
+        Args:
+            name: name of a SortedIndex - string
+            reverse: descending order - bool
+
+        Returns: the items - generator
+        """
+        return self.items(self.index(name).ids(reverse))
+
+    def between(self, name, low=None, high=None, reverse=False):
+        """
+        Lists the items whose key in a sorted index is between low and high, both included
+        Args:
+            name: name of a SortedIndex - string
+            low: smallest key, None for no lower bound
+            high: largest key, None for no upper bound
+            reverse: descending order - bool
+
+        Returns: the items, in the order of the index - generator
+        """
+        return self.items(self.index(name).between(low, high, reverse))
+
+    def page(self, name, size, token=None):
+        """
+        Finds one page of items in the order of a sorted index, see SortedIndex.page
+        Args:
+            name: name of a SortedIndex - string
+            size: maximum number of items returned - int
+            token: token returned with the previous page, None for the first page - tuple
+
+        Returns: the items of the page and the token of the next page, None after the last page - (list, tuple)
+        """
+        ids, token = self.index(name).page(size, token)
+        return list(self.items(ids)), token
+
+    def cursor(self, name, page_size=20, token=None):
+        """
+        Returns: a Cursor paging through the items in the order of a sorted index - Cursor
+        """
+        return Cursor(self, name, page_size, token)
+
+    def items(self, ids):
+        """
+        Returns: the items with the given ids, in the order of the ids - generator
+        """
+        for id in ids:
+            yield self._list[self._positions[id]]
 
     def __getitem__(self, key):
-        # return self._dict[key]
         return self.find_item_by_id(key)
 
     def __delitem__(self, key):
-        # self._dict.pop(key)
-        item = self.find_item_by_id(key)
-        self._list.remove(item)
+        position = self._positions.pop(key, None)
+        if position is None:
+            raise IterableError("Item not found")
+        self._list[position] = None
+        self._holes += 1
+        for index in self._indexes.values():
+            index.discard(key)
+        # Compact once most of the slots are empty, keeping deletions amortized O(1)
+        if self._holes > len(self._positions):
+            self._compact()
 
     def __setitem__(self, key, value):
-        # self._dict[key] = value
-        found = False
-        for i in range(len(self._list)):
-            if self._list[i].id == key:
-                self._list[i] = value
-                found = True
-
-        # for entry in self._list:
-        #     if entry.id == key:
-        #         entry = value
-        #         found = True
-        if not found:
+        position = self._positions.get(key)
+        if position is None:
             raise IterableError("Item not found")
+        if value.id != key:
+            if value.id in self._positions:
+                raise IterableError("Item with the same id already exists")
+            del self._positions[key]
+            self._positions[value.id] = position
+            for index in self._indexes.values():
+                index.discard(key)
+        self._list[position] = value
+        for index in self._indexes.values():
+            index.add(value)
 
     def __iter__(self):
-        # return iter(self._dict)
-        return self._list.__iter__()
+        if self._holes == 0:
+            return self._list.__iter__()
+        return (item for item in self._list if item is not None)
 
     def __next__(self):
-        # return next(self.__iter__())
-        return self.__iter__().__next__()
+        """
+        Returns the item after the one returned by the previous call
+        Raises StopIteration after the last item, the following call starting over from the first one
+        """
+        if self._cursor is None:
+            self._cursor = self.__iter__()
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            self._cursor = None
+            raise
 
     def __len__(self):
-        return len(self._list)
+        return len(self._positions)
 
-    def sort(self, function):
+    def sort(self, function=None, key=None, reverse=False):
         """
-        Gnome sort
-        list: the list to be sorted - iterable
-        function: should return true if the first parameter is "smaller" than the second - boolean function
+        Stable O(n log n) sort of the list, by a key or by a comparison function
+        Args:
+            function: should return true if the first parameter is "smaller" than the second - boolean function
+            key: function giving the value to sort an item by, or a list of such functions to sort by several
+                criteria, the first one being the most important - function / list of functions
+            reverse: sort in descending order, either for all the keys or given for each key - bool / list of bool
+
+        Raises IterableError if both or none of function and key are given
         """
-        i = 1
-        while i < len(self._list):
-            # print(function(self._list[i-1], self._list[i]))
-            if i > 0 and not function(self._list[i-1], self._list[i]):
-                self._list[i-1], self._list[i] = self._list[i], self._list[i-1]
-                i -= 1
+        if (function is None) == (key is None):
+            raise IterableError("Sort either by a comparison function or by a key")
+        if function is not None:
+            key = comparison_to_key(function)
+        keys = list(key) if isinstance(key, (list, tuple)) else [key]
+        orders = list(reverse) if isinstance(reverse, (list, tuple)) else [reverse] * len(keys)
+        if len(orders) != len(keys):
+            raise IterableError("Give one sort order for every key")
+
+        self._compact()
+        if len(set(orders)) == 1:
+            if len(keys) == 1:
+                self._list.sort(key=keys[0], reverse=orders[0])
             else:
-                i += 1
+                self._list.sort(key=lambda item: tuple(k(item) for k in keys), reverse=orders[0])
+        else:
+            # Sorting is stable, so sorting by the least important key first keeps the ties in order
+            for k, order in reversed(list(zip(keys, orders))):
+                self._list.sort(key=k, reverse=order)
+        self._reindex_positions()
+
+    def top_k(self, key, k, reverse=False):
+        """
+        Finds the first k items in the order given by key, using a heap of k items instead of sorting all of them
+        Args:
+            key: function giving the value to order an item by - function
+            k: number of items wanted - int
+            reverse: take the k largest items instead of the k smallest - bool
+
+        Returns: at most k items, in order - list
+
+        """
+        return self.query().order_by(key, reverse).limit(k).all()
+
+    def query(self):
+        """
+        Starts a lazy query over the items, see Query
+        Returns: Query
+
+        """
+        return Query(self)
 
     def filter(self, function):
         """
@@ -101,7 +391,7 @@ class Iterable:
 
         """
         result = []
-        for item in self._list:
+        for item in self:
             if function(item):
                 result.append(item)
         return result
@@ -132,6 +422,12 @@ class TestIterable(unittest.TestCase):
         self.assertEqual(self.it['2'], Client('2', 'x'))
         with self.assertRaises(IterableError):
             self.it['5'] = 'a'
+        with self.assertRaises(IterableError):
+            self.it['2'] = Client('3', 'x')
+        self.it['2'] = Client('4', 'y')
+        self.assertFalse(self.it['2'])
+        self.assertEqual(self.it['4'].name, 'y')
+        self.assertEqual(self.it.list[1].name, 'y')
 
     def test__iter__(self):
         result = []
@@ -148,6 +444,11 @@ class TestIterable(unittest.TestCase):
         self.assertEqual(next(i).name, 'a')
         self.assertEqual(next(i).name, 'b')
         self.assertEqual(next(i).name, 'c')
+        self.assertEqual(next(self.it).name, 'b')
+        self.assertEqual(next(self.it).name, 'c')
+        with self.assertRaises(StopIteration):
+            next(self.it)
+        self.assertEqual(next(self.it).name, 'a')
 
     def test__len__(self):
         self.assertEqual(len(self.it), 3)
@@ -180,3 +481,143 @@ class TestIterable(unittest.TestCase):
         result = self.it.filter(lambda a: len(a.name) == 3)
         for r in result:
             self.assertEqual(len(r.name), 3)
+
+    def test_remove(self):
+        self.it.remove(Client('2', 'b'))
+        self.assertFalse(self.it['2'])
+        self.assertEqual([item.id for item in self.it], ['1', '3'])
+        with self.assertRaises(IterableError):
+            self.it.remove(Client('2', 'b'))
+
+    def test_append_duplicate(self):
+        self.it.append(Client('2', 'x'))
+        self.assertEqual(len(self.it), 3)
+        self.assertEqual(self.it['2'].name, 'b')
+
+    def test_rekey(self):
+        self.it.rekey('2', '20')
+        self.assertFalse(self.it['2'])
+        self.assertEqual(self.it['20'].name, 'b')
+        self.assertEqual(self.it.list[1].id, '20')
+        with self.assertRaises(IterableError):
+            self.it.rekey('1', '3')
+        with self.assertRaises(IterableError):
+            self.it.rekey('2', '5')
+        self.it.rekey('20', '4', Client('4', 'd'))
+        self.assertEqual([(item.id, item.name) for item in self.it], [('1', 'a'), ('4', 'd'), ('3', 'c')])
+
+    def test_order_after_deletions(self):
+        for i in range(4, 20):
+            self.it.append(Client(str(i), 'n' + str(i)))
+        for i in range(2, 15):
+            del self.it[str(i)]
+        self.assertEqual([item.id for item in self.it], ['1', '15', '16', '17', '18', '19'])
+        self.assertEqual(self.it['17'].name, 'n17')
+        self.assertEqual(len(self.it), 6)
+        self.it.append(Client('2', 'b'))
+        self.assertEqual(self.it.list[-1].id, '2')
+        self.assertTrue('15' in self.it)
+
+    def test_constructor_items(self):
+        it = Iterable([Client('1', 'a'), Client('2', 'b'), Client('1', 'c')])
+        self.assertEqual(len(it), 2)
+        self.assertEqual(it['1'].name, 'a')
+
+    def test_sort_key(self):
+        self.it.append(Client('4', 'B'))
+        self.it.append(Client('5', 'a'))
+        self.it.sort(key=lambda client: client.name.lower())
+        self.assertEqual([client.id for client in self.it], ['1', '5', '2', '4', '3'])
+        self.assertEqual(self.it['4'].name, 'B')
+        self.it.sort(key=lambda client: client.name.lower(), reverse=True)
+        self.assertEqual([client.id for client in self.it], ['3', '2', '4', '1', '5'])
+
+    def test_sort_multiple_keys(self):
+        self.it.append(Client('4', 'a'))
+        self.it.append(Client('5', 'b'))
+        self.it.sort(key=[lambda client: client.name, lambda client: int(client.id)], reverse=[False, True])
+        self.assertEqual([client.id for client in self.it], ['4', '1', '5', '2', '3'])
+        self.it.sort(key=(lambda client: client.name, lambda client: int(client.id)), reverse=True)
+        self.assertEqual([client.id for client in self.it], ['3', '5', '2', '4', '1'])
+
+    def test_sort_errors(self):
+        with self.assertRaises(IterableError):
+            self.it.sort()
+        with self.assertRaises(IterableError):
+            self.it.sort(lambda a, b: a.id <= b.id, key=lambda client: client.id)
+        with self.assertRaises(IterableError):
+            self.it.sort(key=[lambda client: client.id], reverse=[True, False])
+
+    def test_sort_comparison_is_stable(self):
+        self.it.append(Client('4', 'a'))
+        self.it.append(Client('0', 'b'))
+        self.it.sort(lambda a, b: a.name < b.name)
+        self.assertEqual([client.id for client in self.it], ['1', '4', '2', '0', '3'])
+
+    def test_gnome_sort(self):
+        numbers = [5, 3, 8, 1, 1, 9]
+        gnome_sort(numbers, lambda a, b: a <= b)
+        self.assertEqual(numbers, [1, 1, 3, 5, 8, 9])
+
+    def test_query(self):
+        query = self.it.query().where(lambda client: client.name != 'a').project(lambda client: client.id)
+        self.assertEqual(query.all(), ['2', '3'])
+
+    def test_sorted_index(self):
+        self.it.add_index('name', SortedIndex(lambda client: client.name))
+        self.it.append(Client('4', 'B'))
+        self.it.append(Client('5', 'ab'))
+        self.assertEqual([client.id for client in self.it.ordered('name')], ['4', '1', '5', '2', '3'])
+        self.assertEqual([client.id for client in self.it.ordered('name', reverse=True)], ['3', '2', '5', '1', '4'])
+        self.assertEqual([client.id for client in self.it.between('name', 'a', 'b')], ['1', '5', '2'])
+        self.assertEqual([client.id for client in self.it], ['1', '2', '3', '4', '5'])
+
+        del self.it['5']
+        self.it['2'] = Client('2', 'z')
+        self.it.rekey('1', '10')
+        self.it['3'].name = 'A'
+        self.it.reindex('3')
+        self.assertEqual([client.id for client in self.it.ordered('name')], ['3', '4', '10', '2'])
+        with self.assertRaises(IterableError):
+            self.it.reindex('5')
+        with self.assertRaises(IterableError):
+            self.it.index('title')
+
+    def test_top_k(self):
+        self.it.append(Client('4', 'b'))
+        self.it.append(Client('5', 'e'))
+        self.assertEqual([client.id for client in self.it.top_k(lambda client: client.name, 3)], ['1', '2', '4'])
+        self.assertEqual([client.id for client in self.it.top_k(lambda client: client.name, 3, reverse=True)],
+                         ['5', '3', '2'])
+        self.assertEqual(len(self.it.top_k(lambda client: client.name, 10)), 5)
+        self.assertEqual(self.it.top_k(lambda client: client.name, 0), [])
+
+    def test_extend(self):
+        self.it.add_index('name', SortedIndex(lambda client: client.name))
+        added = self.it.extend([Client('4', 'd'), Client('2', 'x'), Client('5', 'a'), Client('4', 'y')])
+        self.assertEqual([client.id for client in added], ['4', '5'])
+        self.assertEqual([client.id for client in self.it], ['1', '2', '3', '4', '5'])
+        self.assertEqual(self.it['4'].name, 'd')
+        self.assertEqual([client.id for client in self.it.ordered('name')], ['1', '5', '2', '3', '4'])
+
+    def test_remove_many(self):
+        self.it.add_index('name', SortedIndex(lambda client: client.name))
+        self.it.extend([Client('4', 'd'), Client('5', 'e')])
+        del self.it['1']
+        self.it.remove_many(['2', '4'])
+        self.assertEqual([client.id for client in self.it], ['3', '5'])
+        self.assertEqual(self.it['5'].name, 'e')
+        self.assertEqual([client.id for client in self.it.ordered('name')], ['3', '5'])
+        with self.assertRaises(IterableError):
+            self.it.remove_many(['3', '7'])
+        self.assertEqual(len(self.it), 2)
+
+    def test_page(self):
+        self.it.add_index('name', SortedIndex(lambda client: client.name))
+        items, token = self.it.page('name', 2)
+        self.assertEqual([client.id for client in items], ['1', '2'])
+        items, token = self.it.page('name', 2, token)
+        self.assertEqual([client.id for client in items], ['3'])
+        self.assertIsNone(token)
+        pages = [len(page) for page in self.it.cursor('name', 2)]
+        self.assertEqual(pages, [2, 1])
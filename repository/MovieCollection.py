@@ -3,6 +3,12 @@ from unittest import TestCase
 
 from domain.Movie import Movie
 from repository.Iterable import Iterable
+from repository.QueryCache import cached
+from repository.Repository import Repository
+from repository.SortedIndex import SortedIndex, id_key
+from repository.TagIndex import TagIndex, TagIndexError
+from repository.TokenIndex import TokenIndex
+from repository.TrigramIndex import TrigramIndex
 
 
 class MovieCollectionError(Exception):
@@ -10,9 +16,10 @@ class MovieCollectionError(Exception):
         self._message = message
 
 
-class MovieCollection:
+class MovieCollection(Repository):
     """
     The MovieCollection class represents a repository for Movies, the movies that exist at the rental shop
+    Indexed by id, title, description and genre for listing, by the words, trigrams and genre tags for searching
     Attributes:
         list: list of Movie
 
@@ -25,11 +32,20 @@ class MovieCollection:
             update_movie_description:
             update_movie_genre:
     """
-
-    def __init__(self, list=None):
-        if list is None:
-            list = Iterable()
-        self._list = list
+    error = MovieCollectionError
+    duplicate_message = "Movie with given id already exists"
+    missing_message = "Movie with given id not found"
+    indexes = {
+        'id': lambda: SortedIndex(lambda movie: id_key(movie.id)),
+        'title': lambda: SortedIndex(lambda movie: movie.title.lower()),
+        'description': lambda: SortedIndex(lambda movie: movie.description.lower()),
+        'genre': lambda: SortedIndex(lambda movie: movie.genre.lower()),
+        'title_words': lambda: TokenIndex(lambda movie: movie.title),
+        'description_words': lambda: TokenIndex(lambda movie: movie.description),
+        'id_trigrams': lambda: TrigramIndex(lambda movie: movie.id),
+        'title_trigrams': lambda: TrigramIndex(lambda movie: movie.title.lower()),
+        'genre_tags': lambda: TagIndex(lambda movie: movie.genre),
+    }
 
     @property
     def list(self):
@@ -37,7 +53,20 @@ class MovieCollection:
 
     @list.setter
     def list(self, list):
-        self._list = deepcopy(list)
+        self._list = Iterable(deepcopy(list))
+        self._create_indexes()
+        self._version += 1
+
+    def movies_ordered_by(self, field, reverse=False):
+        """
+        Lists the movies ordered by a field, without changing the order of the repository
+        Args:
+            field: 'id', 'title', 'description' or 'genre' - string
+            reverse: descending order - bool
+
+        Returns: the movies - generator
+        """
+        return self.ordered(field, reverse)
 
     def find_movie(self, id):
         """
@@ -48,83 +77,140 @@ class MovieCollection:
         Returns: the movie found - Movie , False if not found
 
         """
-        for movie in self.list:
-            if movie.id == id:
-                return movie
-        return False
+        return self.find(id)
+
+    def query_movies(self):
+        """
+        Starts a lazy query over the movies
+        Returns: Query
+        """
+        return self.query()
 
-    def search_movie_by_id(self, id):
+    @cached
+    def search_movie_by_id(self, id, limit=None):
         """
         Finds a list of movies with the given id in their id
         Args:
             id: id of movie - string
+            limit: maximum number of movies returned, None for all - int
 
         Returns: list of Movie
 
         """
-        result = []
-        for movie in self.list:
-            if movie.id.find(id) != -1:
-                result.append(movie)
-        return result
+        return list(self.list.items(self.list.index('id_trigrams').search(id, limit)))
 
-    def search_movie_by_title(self, title):
+    @cached
+    def search_movie_by_title(self, title, limit=None):
         """
         Finds a list of movies with the given title in their title
         Args:
             title: id of movie - string
+            limit: maximum number of movies returned, None for all - int
 
         Returns: list of Movie
 
         """
-        result = []
-        for movie in self.list:
-            if movie.title.lower().find(title.lower()) != -1:
-                result.append(movie)
-        return result
+        return list(self.list.items(self.list.index('title_trigrams').search(title.lower(), limit)))
 
-    def search_movie_by_description(self, description):
+    @cached
+    def search_movie_by_description(self, description, limit=None):
         """
         Finds a list of movies with the given description in their description
         Args:
             description: description of movie - string
+            limit: maximum number of movies returned, None for all - int
 
         Returns: list of Movie
 
         """
-        result = []
-        for movie in self.list:
-            if movie.description.lower().find(description.lower()) != -1:
-                result.append(movie)
-        return result
+        description = description.lower()
+        query = self.query_movies().where(lambda movie: movie.description.lower().find(description) != -1)
+        return query.limit(limit).all()
 
-    def search_movie_by_genre(self, genre):
+    @cached
+    def search_movie_by_words(self, field, words, match_all=True, limit=None):
         """
-        Finds a list of movies with the given genre in their genre
+        Finds the movies having whole words in their title or description, using the word indexes
+        Unlike the search_movie_by_* methods, 'car' does not match 'Cars'.
         Args:
-            genre: genre of movie - string
+            field: 'title' or 'description' - string
+            words: words searched for, case insensitive - string
+            match_all: True for the movies having all the words, False for the movies having any of them - bool
+            limit: maximum number of movies returned, None for all - int
 
-        Returns: list of Movie
+        Returns: list of Movie, in the order they were added
+
+        """
+        index = self.list.index(field + '_words')
+        ids = index.match_all(words) if match_all else index.match_any(words)
+        return list(self.list.items(ids[:limit]))
+
+    @cached
+    def search_movie_by_description_words(self, query, limit=None):
+        """
+        Finds the movies by the words of their description, for queries such as 'space war', 'space AND war OR alien'
+        or 'space AND NOT (war OR alien)', using the word index
+        Consecutive words must all be in the description. NOT binds tightest and AND binds tighter than OR, see
+        TokenIndex.search. When no movie matches, as when the query is part of a word, the descriptions are searched
+        for the query as a substring instead.
+        Args:
+            query: words joined by AND, OR, NOT and parentheses, case insensitive - string
+            limit: maximum number of movies returned, None for all - int
+
+        Returns: list of Movie, in the order they were added
+        Raises MovieCollectionError if the query is malformed
+        """
+        try:
+            ids = self.list.index('description_words').search(query)
+        except TagIndexError:
+            raise MovieCollectionError("Invalid description query")
+        if not ids:
+            return self.search_movie_by_description(query, limit)
+        return list(self.list.items(ids[:limit]))
+
+    def search_movie_by_genre(self, genre, limit=None):
+        """
+        Finds the movies having the given genre among their genre tags, using the tag index
+        'action' matches 'Action, drama' but not 'non-action'. The genre can also be a query, see search_movie_by_tags.
+        Args:
+            genre: genre of movie, case insensitive - string
+            limit: maximum number of movies returned, None for all - int
+
+        Returns: list of Movie, in the order they were added
+        Raises MovieCollectionError if the genre is a malformed query
+        """
+        return self.search_movie_by_tags(genre, limit)
+
+    @cached
+    def search_movie_by_tags(self, query, limit=None):
+        """
+        Finds the movies whose genre tags match a query such as 'action AND NOT animation'
+        The genre of a movie is a comma separated list of tags, a tag matches only as a whole: 'action' does not match
+        'non-action'. See TagIndex.search for the syntax of the query.
+        Args:
+            query: tags joined by AND, OR, NOT and parentheses, case insensitive - string
+            limit: maximum number of movies returned, None for all - int
 
+        Returns: list of Movie, in the order they were added
+        Raises MovieCollectionError if the query is malformed
         """
-        result = []
-        for movie in self.list:
-            if movie.genre.lower().find(genre.lower()) != -1:
-                result.append(movie)
-        return result
+        try:
+            ids = self.list.index('genre_tags').search(query)
+        except TagIndexError:
+            raise MovieCollectionError("Invalid genre query")
+        return list(self.list.items(ids[:limit]))
+
+    def genre_counts(self):
+        """
+        Returns: the number of movies having every genre tag - dict
+        """
+        return self.list.index('genre_tags').counts()
 
     def add_movie(self, movie):
-        if not self.find_movie(movie.id):
-            self.list.append(movie)
-        else:
-            raise MovieCollectionError("Movie with given id already exists")
+        self.add(movie)
 
     def remove_movie(self, id):
-        movie = self.find_movie(id)
-        if isinstance(movie, Movie):
-            self.list.remove(movie)
-        else:
-            raise MovieCollectionError("Movie with given id not found")
+        self.remove(id)
 
     def update_movie_id(self, id, new_id):
         """
@@ -136,11 +222,7 @@ class MovieCollection:
         Returns:
         Raises MovieCollectionError if not found
         """
-        movie = self.find_movie(id)
-        if isinstance(movie, Movie):
-            movie.id = new_id
-        else:
-            raise MovieCollectionError("Movie with given id not found")
+        self.rekey(id, new_id)
 
     def update_movie_title(self, id, title):
         """
@@ -152,11 +234,7 @@ class MovieCollection:
         Returns:
         Raises MovieCollectionError if not found
         """
-        movie = self.find_movie(id)
-        if isinstance(movie, Movie):
-            movie.title = title
-        else:
-            raise MovieCollectionError("Movie with given id not found")
+        self.update(id, title=title)
 
     def update_movie_description(self, id, description):
         """
@@ -168,11 +246,7 @@ class MovieCollection:
         Returns:
         Raises MovieCollectionError if not found
         """
-        movie = self.find_movie(id)
-        if isinstance(movie, Movie):
-            movie.description = description
-        else:
-            raise MovieCollectionError("Movie with given id not found")
+        self.update(id, description=description)
 
     def update_movie_genre(self, id, genre):
         """
@@ -184,11 +258,7 @@ class MovieCollection:
         Returns:
         Raises MovieCollectionError if not found
         """
-        movie = self.find_movie(id)
-        if isinstance(movie, Movie):
-            movie.genre = genre
-        else:
-            raise MovieCollectionError("Movie with given id not found")
+        self.update(id, genre=genre)
 
 
 class TestMovieCollection(TestCase):
@@ -292,6 +362,8 @@ class TestMovieCollection(TestCase):
         mc.add_movie(Movie('782', 'Transformers', 'BOOM BOOM BOOM', 'action'))
         result = mc.search_movie_by_title('R')
         self.assertEqual(len(result), 2)
+        result = mc.search_movie_by_title('expandables', limit=2)
+        self.assertEqual([movie.id for movie in result], ['123', '021'])
 
     def test_search_movie_by_description(self):
         mc = MovieCollection()
@@ -303,6 +375,36 @@ class TestMovieCollection(TestCase):
         result = mc.search_movie_by_description('o')
         self.assertEqual(len(result), 4)
 
+    def test_search_movie_by_words(self):
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('title', 'expandables ii')], ['021'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('title', 'cars II', False)],
+                         ['021', '566'])
+        self.assertEqual(self.mc.search_movie_by_words('title', 'car'), [])
+        self.assertEqual(len(self.mc.search_movie_by_words('description', 'boom', limit=3)), 3)
+        self.mc.update_movie_title('566', 'Cars II')
+        self.mc.update_movie_description('782', 'life')
+        self.mc.remove_movie('021')
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('title', 'ii')], ['566'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('description', 'life')],
+                         ['566', '782'])
+        self.mc.update_movie_id('566', '567')
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('title', 'cars')], ['567'])
+
+    def test_search_movie_by_description_words(self):
+        self.mc.update_movie_description('566', 'Life is a highway')
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_description_words('life AND highway')], ['566'])
+        self.assertEqual(self.mc.search_movie_by_description_words('life boom'), [])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_description_words('highway OR boom', 2)],
+                         ['123', '021'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_description_words('high')], ['566'])
+        self.mc.update_movie_description('123', 'War of the worlds')
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_description_words('life AND boom OR war')],
+                         ['123'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_description_words('boom AND NOT war')],
+                         ['021', '156', '782'])
+        with self.assertRaises(MovieCollectionError):
+            self.mc.search_movie_by_description_words('war AND')
+
     def test_search_movie_by_genre(self):
         mc = MovieCollection()
         mc.add_movie(Movie('123', 'Expandables', 'BOOM', 'action'))
@@ -310,8 +412,50 @@ class TestMovieCollection(TestCase):
         mc.add_movie(Movie('156', 'Expandables III', 'BOOM', 'action'))
         mc.add_movie(Movie('566', 'Cars', 'LIFE', 'animation, adventure'))
         mc.add_movie(Movie('782', 'Transformers', 'BOOM BOOM BOOM', 'action'))
-        result = mc.search_movie_by_genre('ct')
+        mc.add_movie(Movie('1', 'Planes', 'LIFE', 'Animation, non-action'))
+        result = mc.search_movie_by_genre('Action')
         self.assertEqual(len(result), 4)
+        self.assertEqual(mc.search_movie_by_genre('ct'), [])
+        self.assertEqual([movie.id for movie in mc.search_movie_by_genre('animation', limit=1)], ['566'])
+
+    def test_search_movie_by_tags(self):
+        self.mc.add_movie(Movie('1', 'Planes', 'LIFE', 'Animation, non-action'))
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_tags('action')], ['123', '021', '156', '782'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_tags('animation AND NOT action')], ['566', '1'])
+        self.assertEqual(len(self.mc.search_movie_by_tags('action OR adventure', limit=2)), 2)
+        self.mc.update_movie_genre('782', 'adventure, Animation')
+        self.mc.remove_movie('123')
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_tags('adventure')], ['566', '782'])
+        self.assertEqual(self.mc.genre_counts(), {'action': 2, 'animation': 3, 'adventure': 2, 'non-action': 1})
+        with self.assertRaises(MovieCollectionError):
+            self.mc.search_movie_by_tags('action AND')
+
+    def test_movies_ordered_by(self):
+        self.mc.update_movie_title('021', 'A Team')
+        self.assertEqual([movie.id for movie in self.mc.movies_ordered_by('id')], ['021', '123', '156', '566', '782'])
+        self.assertEqual([movie.id for movie in self.mc.movies_ordered_by('title')],
+                         ['021', '566', '123', '156', '782'])
+        self.assertEqual([movie.id for movie in self.mc.movies_ordered_by('genre', True)],
+                         ['566', '123', '021', '156', '782'])
+        self.assertEqual([movie.id for movie in self.mc.list], ['123', '021', '156', '566', '782'])
+
+    def test_cursor(self):
+        cursor = self.mc.cursor(2)
+        self.assertEqual([movie.id for movie in cursor.fetch()], ['021', '123'])
+        resumed = self.mc.cursor(2, cursor.token)
+        self.assertEqual([[movie.id for movie in page] for page in resumed], [['156', '566'], ['782']])
+
+    def test_add_remove_many(self):
+        self.mc.add_many([Movie('1', 'a', 'a', 'a'), Movie('2', 'b', 'b', 'b')])
+        self.assertEqual(len(self.mc.list), 7)
+        with self.assertRaises(MovieCollectionError):
+            self.mc.add_many([Movie('3', 'c', 'c', 'c'), Movie('123', 'Expandables', 'BOOM', 'action')])
+        self.assertFalse(self.mc.find_movie('3'))
+        with self.assertRaises(MovieCollectionError):
+            self.mc.remove_many(['1', '3'])
+        self.mc.remove_many(['1', '123'])
+        self.assertEqual(len(self.mc.list), 5)
+        self.assertFalse(self.mc.find_movie('123'))
 
 # test_find_movie()
 # test_add_movie()
@@ -1,9 +1,8 @@
-import pickle
-from copy import deepcopy
 from unittest import TestCase
 
 from domain.Movie import Movie
 from repository.MovieCollection import MovieCollection, MovieCollectionError
+from repository.Persistence import BinaryFormatError, StructFile
 
 
 class MovieCollectionBinary(MovieCollection):
@@ -23,16 +22,16 @@ class MovieCollectionBinary(MovieCollection):
     """
 
     def __init__(self, file):
-        super().__init__()
-        self._file_name = file
+        super().__init__(persistence=StructFile(file, 'ssss', self.obj_to_fields, Movie, self.string_to_obj,
+                                                self.obj_to_string))
 
     @property
     def file_name(self):
-        return self._file_name
+        return self.persistence.file_name
 
     @file_name.setter
     def file_name(self, file_name):
-        self._file_name = file_name
+        self.persistence.file_name = file_name
 
     @staticmethod
     def string_to_obj(string):
@@ -61,6 +60,18 @@ class MovieCollectionBinary(MovieCollection):
         string = movie.id + ' ; ' + movie.title + ' ; ' + movie.description + ' ; ' + movie.genre + '\n'
         return string
 
+    @staticmethod
+    def obj_to_fields(movie):
+        """
+        Gives the values of the fields stored in a record of the binary file for a Movie
+        Args:
+            movie: Movie to be stored - Movie
+
+        Returns: the values of the fields, in the order of the constructor of Movie - tuple
+
+        """
+        return movie.id, movie.title, movie.description, movie.genre
+
     def load_file(self):
         """
         Loads into the repo the data found in the auxiliary file
@@ -68,15 +79,11 @@ class MovieCollectionBinary(MovieCollection):
 
         """
         try:
-            f = open(self._file_name, "rb")
-            string_list = pickle.load(f)
-            for str in string_list:
-                super(MovieCollectionBinary, self).add_movie(self.string_to_obj(str))
-            f.close()
+            self.load()
         except EOFError:
             raise MovieCollectionError("Empty binary file")
-        except IOError as e:
-            raise e
+        except BinaryFormatError:
+            raise MovieCollectionError("Unsupported binary file")
 
     def save_file(self):
         """
@@ -84,128 +91,7 @@ class MovieCollectionBinary(MovieCollection):
         Returns:
 
         """
-        f = open(self._file_name, "wb")
-        string_list = []
-        for movie in self.list:
-            movie_str = self.obj_to_string(movie)
-            string_list.append(movie_str)
-        pickle.dump(string_list, f)
-        f.close()
-
-    def find_movie(self, id):
-        """
-        Finds the film with the given id in th list
-        Args:
-            id: id of the movie - string
-
-        Returns: the movie found - Movie , False if not found
-
-        """
-        return super(MovieCollectionBinary, self).find_movie(id)
-
-    def search_movie_by_id(self, id):
-        """
-        Finds a list of movies with the given id in their id
-        Args:
-            id: id of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionBinary, self).search_movie_by_id(id)
-
-    def search_movie_by_title(self, title):
-        """
-        Finds a list of movies with the given title in their title
-        Args:
-            title: id of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionBinary, self).search_movie_by_title(title)
-
-    def search_movie_by_description(self, description):
-        """
-        Finds a list of movies with the given description in their description
-        Args:
-            description: description of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionBinary, self).search_movie_by_description(description)
-
-    def search_movie_by_genre(self, genre):
-        """
-        Finds a list of movies with the given genre in their genre
-        Args:
-            genre: genre of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionBinary, self).search_movie_by_genre(genre)
-
-    def add_movie(self, movie):
-        super(MovieCollectionBinary, self).add_movie(movie)
-        self.save_file()
-
-    def remove_movie(self, id):
-        super(MovieCollectionBinary, self).remove_movie(id)
-        self.save_file()
-
-    def update_movie_id(self, id, new_id):
-        """
-        Updates the id of the movie with the new id
-        Args:
-            id: initial id - string
-            new_id: replacement - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionBinary, self).update_movie_id(id, new_id)
-        self.save_file()
-
-    def update_movie_title(self, id, title):
-        """
-        Updates the title of the movie with the given id
-        Args:
-            id: id of the movie - string
-            title: replacement title - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionBinary, self).update_movie_title(id, title)
-        self.save_file()
-
-    def update_movie_description(self, id, description):
-        """
-        Updates the description of the movie with the given id
-        Args:
-            id: id of the movie - string
-            description: replacement description - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionBinary, self).update_movie_description(id, description)
-        self.save_file()
-
-    def update_movie_genre(self, id, genre):
-        """
-        Updates the genre of the movie with the given id
-        Args:
-            id: id of the movie - string
-            genre: replacement genre - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionBinary, self).update_movie_genre(id, genre)
-        self.save_file()
+        self.save()
 
 
 class TestMovieCollectionBinary(TestCase):
@@ -0,0 +1,107 @@
+from unittest import TestCase
+
+from domain.Movie import Movie
+from repository.MovieCollection import MovieCollection, MovieCollectionError
+from repository.QueryCache import cached
+from repository.SQLiteRepository import SQLiteRepository
+from repository.TagIndex import TagIndexError
+
+
+class MovieCollectionSQLite(SQLiteRepository, MovieCollection):
+    """
+    The MovieCollection class represents a repository for Movies, kept in the movies table of an SQLite database
+    The substring searches run in SQL, the word and genre tag searches build their indexes from the table.
+    Attributes:
+        list: the movies table - SQLiteTable
+
+    Methods:
+        add_movie: Adds a new Movie to the list
+        remove_movie: Removes the Movie with the given id from the list
+        update_movie: Updates the attributes of a Movie in the list
+    """
+    table = 'movies'
+    columns = ('id', 'title', 'description', 'genre')
+    schema = [
+        'CREATE TABLE IF NOT EXISTS movies (id TEXT PRIMARY KEY, title TEXT NOT NULL, description TEXT NOT NULL, '
+        'genre TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS movies_title ON movies (lower(title))',
+        'CREATE INDEX IF NOT EXISTS movies_genre ON movies (lower(genre))',
+    ]
+    orders = {
+        'id': ('length(id)', 'id'),
+        'title': ('lower(title)',),
+        'description': ('lower(description)',),
+        'genre': ('lower(genre)',),
+    }
+
+    def to_obj(self, row):
+        return Movie(*row)
+
+    def to_row(self, movie):
+        return movie.id, movie.title, movie.description, movie.genre
+
+    def _search(self, column, text, limit):
+        return list(self.list.select('instr(lower(' + column + '), ?) > 0', (text.lower(),), limit=limit))
+
+    @cached
+    def search_movie_by_id(self, id, limit=None):
+        return list(self.list.select('instr(id, ?) > 0', (id,), limit=limit))
+
+    @cached
+    def search_movie_by_title(self, title, limit=None):
+        return self._search('title', title, limit)
+
+    @cached
+    def search_movie_by_description(self, description, limit=None):
+        return self._search('description', description, limit)
+
+    @cached
+    def search_movie_by_words(self, field, words, match_all=True, limit=None):
+        index = self.index(field + '_words')
+        ids = index.match_all(words) if match_all else index.match_any(words)
+        return list(self.list.items(ids[:limit]))
+
+    @cached
+    def search_movie_by_tags(self, query, limit=None):
+        try:
+            ids = self.index('genre_tags').search(query)
+        except TagIndexError:
+            raise MovieCollectionError("Invalid genre query")
+        return list(self.list.items(ids[:limit]))
+
+    def genre_counts(self):
+        return self.index('genre_tags').counts()
+
+
+class TestMovieCollectionSQLite(TestCase):
+    def setUp(self):
+        self.mc = MovieCollectionSQLite(':memory:')
+        self.mc.add_movie(Movie('123', 'Expandables', 'BOOM', 'action'))
+        self.mc.add_movie(Movie('021', 'Expandables II', 'BOOM', 'action'))
+        self.mc.add_movie(Movie('156', 'Expandables III', 'BOOM', 'action'))
+        self.mc.add_movie(Movie('566', 'Cars', 'LIFE', 'animation, adventure'))
+        self.mc.add_movie(Movie('782', 'Transformers', 'BOOM BOOM BOOM', 'action'))
+
+    def test_update(self):
+        self.mc.update_movie_title('566', 'Cars 2')
+        self.mc.update_movie_genre('566', 'animation')
+        self.assertEqual((self.mc.find_movie('566').title, self.mc.find_movie('566').genre), ('Cars 2', 'animation'))
+        self.mc.update_movie_id('566', '1')
+        self.assertEqual([movie.id for movie in self.mc.movies_ordered_by('id')][:2], ['1', '021'])
+        with self.assertRaises(MovieCollectionError):
+            self.mc.update_movie_id('1', '123')
+        self.mc.remove_movie('1')
+        with self.assertRaises(MovieCollectionError):
+            self.mc.remove_movie('1')
+
+    def test_search(self):
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_id('5')], ['156', '566'])
+        self.assertEqual(len(self.mc.search_movie_by_title('expandables', limit=2)), 2)
+        self.assertEqual(len(self.mc.search_movie_by_description('boom')), 4)
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_genre('ANIMATION')], ['566'])
+        self.assertEqual([movie.id for movie in self.mc.search_movie_by_words('title', 'expandables ii')], ['021'])
+        self.assertEqual(len(self.mc.search_movie_by_tags('action AND NOT animation')), 4)
+        with self.assertRaises(MovieCollectionError):
+            self.mc.search_movie_by_tags('action AND')
+        self.mc.update_movie_genre('123', 'drama')
+        self.assertEqual(self.mc.genre_counts()['action'], 3)
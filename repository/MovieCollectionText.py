@@ -1,9 +1,9 @@
-from copy import deepcopy
 from unittest import TestCase
 
 from settings import Settings
 from domain.Movie import Movie
 from repository.MovieCollection import MovieCollection, MovieCollectionError
+from repository.Persistence import JournalFile
 
 
 class MovieCollectionText(MovieCollection):
@@ -23,16 +23,15 @@ class MovieCollectionText(MovieCollection):
     """
 
     def __init__(self, file):
-        super().__init__()
-        self._file_name = file
+        super().__init__(persistence=JournalFile(file, self.string_to_obj, self.obj_to_string))
 
     @property
     def file_name(self):
-        return self._file_name
+        return self.persistence.file_name
 
     @file_name.setter
     def file_name(self, file_name):
-        self._file_name = file_name
+        self.persistence.file_name = file_name
 
     @staticmethod
     def string_to_obj(string):
@@ -63,149 +62,20 @@ class MovieCollectionText(MovieCollection):
 
     def load_file(self):
         """
-        Loads into the repo the data found in the auxiliary file
+        Loads into the repo the data found in the auxiliary file and the changes journaled since it was written
         Returns:
 
         """
-        try:
-            f = open(self._file_name, "r")
-            line = f.readline()
-            while len(line) > 0:
-                super(MovieCollectionText, self).add_movie(self.string_to_obj(line))
-                line = f.readline()
-            f.close()
-        except IOError as e:
-            raise e
+        self.load()
 
     def save_file(self):
         """
-        Saves into the auxiliary file the current state of the repo
+        Saves into the auxiliary file the current state of the repo, folding the journal into it
+        Every change is only appended to the journal, see repository.Persistence.JournalFile
         Returns:
 
         """
-        f = open(self._file_name, "w")
-        try:
-            for movie in self.list:
-                movie_str = self.obj_to_string(movie)
-                f.write(movie_str)
-            f.close()
-        except Exception as e:
-            raise e
-
-    def find_movie(self, id):
-        """
-        Finds the film with the given id in th list
-        Args:
-            id: id of the movie - string
-
-        Returns: the movie found - Movie , False if not found
-
-        """
-        return super(MovieCollectionText, self).find_movie(id)
-
-    def search_movie_by_id(self, id):
-        """
-        Finds a list of movies with the given id in their id
-        Args:
-            id: id of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionText, self).search_movie_by_id(id)
-
-    def search_movie_by_title(self, title):
-        """
-        Finds a list of movies with the given title in their title
-        Args:
-            title: id of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionText, self).search_movie_by_title(title)
-
-    def search_movie_by_description(self, description):
-        """
-        Finds a list of movies with the given description in their description
-        Args:
-            description: description of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionText, self).search_movie_by_description(description)
-
-    def search_movie_by_genre(self, genre):
-        """
-        Finds a list of movies with the given genre in their genre
-        Args:
-            genre: genre of movie - string
-
-        Returns: list of Movie
-
-        """
-        return super(MovieCollectionText, self).search_movie_by_genre(genre)
-
-    def add_movie(self, movie):
-        super(MovieCollectionText, self).add_movie(movie)
-        self.save_file()
-
-    def remove_movie(self, id):
-        super(MovieCollectionText, self).remove_movie(id)
-        self.save_file()
-
-    def update_movie_id(self, id, new_id):
-        """
-        Updates the id of the movie with the new id
-        Args:
-            id: initial id - string
-            new_id: replacement - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionText, self).update_movie_id(id, new_id)
-        self.save_file()
-
-    def update_movie_title(self, id, title):
-        """
-        Updates the title of the movie with the given id
-        Args:
-            id: id of the movie - string
-            title: replacement title - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionText, self).update_movie_title(id, title)
-        self.save_file()
-
-    def update_movie_description(self, id, description):
-        """
-        Updates the description of the movie with the given id
-        Args:
-            id: id of the movie - string
-            description: replacement description - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionText, self).update_movie_description(id, description)
-        self.save_file()
-
-    def update_movie_genre(self, id, genre):
-        """
-        Updates the genre of the movie with the given id
-        Args:
-            id: id of the movie - string
-            genre: replacement genre - string
-
-        Returns:
-        Raises MovieCollectionError if not found
-        """
-        super(MovieCollectionText, self).update_movie_genre(id, genre)
-        self.save_file()
+        self.save()
 
 
 class TestMovieCollectionText(TestCase):
@@ -218,7 +88,7 @@ class TestMovieCollectionText(TestCase):
         self.mc.add_movie(Movie('782', 'Transformers', 'BOOM BOOM BOOM', 'action'))
 
     def test_load_file(self):
-        f = open(self.mc._file_name, "w")
+        f = open(self.mc.file_name, "w")
         f.write('7 ; m ; a ; a ; a\n')
         f.write('8 ; n ; a ; a ; a\n')
         f.write('9 ; mvp ; a ; a ; a\n')
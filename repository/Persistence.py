@@ -0,0 +1,400 @@
+"""
+Persistence strategies of the repositories: where and how the items of a Repository are saved
+Every strategy has load(), returning the items saved, save(items), replacing them, and
+record(items, added, updated, removed), called after every change with the items changed.
+"""
+import gc
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from itertools import accumulate
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+class BinaryFormatError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class TextFile:
+    """
+    Saves the items as the lines of a text file
+    Attributes:
+        file_name: path of the file - string
+        string_to_obj: function converting a line into an item - function
+        obj_to_string: function converting an item into a line ending in a newline - function
+    """
+    def __init__(self, file_name, string_to_obj, obj_to_string):
+        self._file_name = file_name
+        self._string_to_obj = string_to_obj
+        self._obj_to_string = obj_to_string
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    @file_name.setter
+    def file_name(self, file_name):
+        self._file_name = file_name
+
+    def load(self):
+        """
+        Returns: the items in the file - list
+        Raises IOError if the file can't be read
+        """
+        with open(self._file_name, "r") as f:
+            return [self._string_to_obj(line) for line in f]
+
+    def save(self, items):
+        with open(self._file_name, "w") as f:
+            for item in items:
+                f.write(self._obj_to_string(item))
+
+    def record(self, items, added=(), updated=(), removed=()):
+        """
+        Saves a change, by saving all the items again
+        Args:
+            items: all the items, after the change
+            added, updated, removed: the items added, changed and removed - list
+        """
+        self.save(items)
+
+
+class PickleFile(TextFile):
+    """
+    Saves the items as a pickled list of the lines a TextFile would hold
+    """
+    def load(self):
+        """
+        Returns: the items in the file - list
+        Raises IOError if the file can't be read, EOFError if it is empty
+        """
+        with open(self._file_name, "rb") as f:
+            return [self._string_to_obj(string) for string in pickle.load(f)]
+
+    def save(self, items):
+        with open(self._file_name, "wb") as f:
+            pickle.dump([self._obj_to_string(item) for item in items], f)
+
+
+@contextmanager
+def paused_collector():
+    """
+    Context manager pausing the cyclic garbage collector while many objects are created at once
+    The items hold no reference cycles, the collector would only go through them again and again as they are built.
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+class StructFile(PickleFile):
+    """
+    Saves the items in a versioned binary format, read and written in bulk, a column of values at a time
+    The file starts with a header: the magic bytes, the format version, the number of items and the kinds of their
+    fields. Every field follows as a column of the values of all the items, little endian:
+        s: string, the uint32 lengths of the UTF-8 bytes of the strings, then those bytes
+        d: date, the int32 proleptic ordinals of the dates, 0 for None
+        b: bool, one byte per value
+    A column is converted with array, bytes and map operations, with no splitting of lines, and the items are built
+    by mapping from_fields over the columns.
+    A file not starting with the magic bytes is read as the pickled lines of a PickleFile, so the files saved before
+    the format are still loaded, and saved in it the next time.
+    Attributes:
+        kinds: the kinds of the fields of an item, in order - string
+        to_fields: function giving the values of the fields of an item - function
+        from_fields: function building an item from the values of its fields - function
+    """
+    MAGIC = b'MRBF'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHIB')
+
+    def __init__(self, file_name, kinds, to_fields, from_fields, string_to_obj=None, obj_to_string=None):
+        super().__init__(file_name, string_to_obj, obj_to_string)
+        self._kinds = kinds
+        self._to_fields = to_fields
+        self._from_fields = from_fields
+
+    @property
+    def kinds(self):
+        return self._kinds
+
+    def load(self):
+        """
+        Returns: the items in the file - list
+        Raises IOError if the file can't be read, EOFError if it is empty or cut short,
+        BinaryFormatError if it was written in another version of the format or with other fields
+        """
+        with open(self._file_name, "rb") as f:
+            data = f.read()
+        if not data.startswith(self.MAGIC):
+            return super().load()
+        if len(data) < self.HEADER.size:
+            raise EOFError("Binary file cut short")
+        magic, version, count, length = self.HEADER.unpack_from(data)
+        offset = self.HEADER.size + length
+        if version != self.VERSION or data[self.HEADER.size:offset].decode('ascii') != self._kinds:
+            raise BinaryFormatError("Unsupported binary file")
+        with paused_collector():
+            return self._decode(data, offset, count)
+
+    def _decode(self, data, offset, count):
+        """
+        Returns: the items whose columns start at the offset - list
+        """
+        columns = []
+        for kind in self._kinds:
+            if kind == 'b':
+                values, offset = list(map(bool, data[offset:offset + count])), offset + count
+            else:
+                values, offset = self._numbers('I' if kind == 's' else 'i', data, offset, count)
+            if kind == 's':
+                end = offset + sum(values)
+                if end > len(data):
+                    raise EOFError("Binary file cut short")
+                values, offset = self._strings(data[offset:end], values), end
+            elif kind == 'd':
+                from_ordinal = date.fromordinal
+                values = [from_ordinal(ordinal) if ordinal else None for ordinal in values]
+            columns.append(values)
+        if offset > len(data):
+            raise EOFError("Binary file cut short")
+        return list(map(self._from_fields, *columns))
+
+    @staticmethod
+    def _numbers(typecode, data, offset, count):
+        """
+        Returns: the count 4 byte numbers at the offset and the offset after them - (array, int)
+        """
+        numbers = array(typecode)
+        end = offset + numbers.itemsize * count
+        if end > len(data):
+            raise EOFError("Binary file cut short")
+        numbers.frombytes(data[offset:end])
+        if sys.byteorder == 'big':
+            numbers.byteswap()
+        return numbers, end
+
+    @staticmethod
+    def _strings(data, lengths):
+        """
+        Returns: the strings encoded one after the other in the data, with the given lengths in bytes - list
+        """
+        bounds = list(accumulate(lengths, initial=0))
+        text = data.decode()
+        if len(text) == len(data):
+            # Only ASCII, so the bounds in bytes are the bounds in characters
+            return list(map(text.__getitem__, map(slice, bounds, bounds[1:])))
+        return [data[start:end].decode() for start, end in zip(bounds, bounds[1:])]
+
+    def save(self, items):
+        """
+        Writes the items, into one buffer first, aside and then over the file
+        """
+        with paused_collector():
+            data = self._encode(list(map(self._to_fields, items)))
+        with open(self._file_name + '.tmp', "wb") as f:
+            f.write(data)
+        os.replace(self._file_name + '.tmp', self._file_name)
+
+    def _encode(self, rows):
+        """
+        Returns: the file holding the items with the given fields - bytes
+        """
+        kinds = self._kinds.encode('ascii')
+        chunks = [self.HEADER.pack(self.MAGIC, self.VERSION, len(rows), len(kinds)), kinds]
+        for kind, values in zip(self._kinds, zip(*rows) if rows else [()] * len(kinds)):
+            if kind == 'b':
+                chunks.append(bytes(map(bool, values)))
+                continue
+            if kind == 's':
+                text = ''.join(values)
+                if text.isascii():
+                    # One byte per character, the strings are encoded all at once
+                    encoded = [text.encode('ascii')]
+                    numbers = array('I', map(len, values))
+                else:
+                    encoded = [value.encode() for value in values]
+                    numbers = array('I', map(len, encoded))
+            else:
+                numbers = array('i', [value.toordinal() if value is not None else 0 for value in values])
+            if sys.byteorder == 'big':
+                numbers.byteswap()
+            chunks.append(numbers.tobytes())
+            if kind == 's':
+                chunks.append(b''.join(encoded))
+        return b''.join(chunks)
+
+
+class JournalFile(TextFile):
+    """
+    Saves the items as a snapshot, the lines of a text file, followed by a journal of the changes made since
+    Every change appends one record per item changed to the journal, '<sequence number> <add|update|remove> <line>',
+    so a change costs the size of the items changed instead of the size of all of them. Loading replays the journal
+    over the snapshot; compacting writes a new snapshot and empties the journal. The journal is compacted by itself
+    once it has more records than the snapshot has lines, so a change still costs O(1) amortized.
+    A record writes or deletes the whole item, so replaying a journal twice, after a compaction interrupted between
+    replacing the snapshot and emptying the journal, gives the same items. A last record cut short by a crash is
+    dropped when loading.
+    Attributes:
+        journal_name: path of the journal, the file name followed by '.journal' - string
+        records: number of records in the journal - int
+        min_compaction: number of records below which the journal is never compacted by itself - int
+    """
+    def __init__(self, file_name, string_to_obj, obj_to_string, min_compaction=1000):
+        super().__init__(file_name, string_to_obj, obj_to_string)
+        self.min_compaction = min_compaction
+        self._sequence = 0
+        self._records = 0
+
+    @property
+    def journal_name(self):
+        return self._file_name + '.journal'
+
+    @property
+    def records(self):
+        return self._records
+
+    def load(self):
+        """
+        Returns: the items of the snapshot, with the changes of the journal applied - list
+        Raises IOError if the snapshot can't be read
+        """
+        items = {}
+        for item in super().load():
+            items[item.id] = item
+        self._records = 0
+        if not os.path.exists(self.journal_name):
+            return list(items.values())
+        with open(self.journal_name, "rb+") as f:
+            end = 0
+            for record in f:
+                if not record.endswith(b'\n'):
+                    break
+                end += len(record)
+                sequence, operation, line = record.decode().split(' ', 2)
+                item = self._string_to_obj(line)
+                if operation == 'remove':
+                    items.pop(item.id, None)
+                else:
+                    items[item.id] = item
+                self._sequence = int(sequence)
+                self._records += 1
+            f.truncate(end)
+        return list(items.values())
+
+    def save(self, items):
+        """
+        Writes a new snapshot of the items and empties the journal
+        The snapshot is written aside first, so a crash leaves either the old or the new one.
+        """
+        with open(self._file_name + '.tmp', "w") as f:
+            for item in items:
+                f.write(self._obj_to_string(item))
+        os.replace(self._file_name + '.tmp', self._file_name)
+        open(self.journal_name, "w").close()
+        self._records = 0
+
+    def compact(self, items):
+        """
+        Folds the journal into a new snapshot of the items
+        """
+        self.save(items)
+
+    def record(self, items, added=(), updated=(), removed=()):
+        """
+        Appends the change to the journal, compacting it if it has grown larger than the snapshot
+        Args:
+            items: all the items, after the change
+            added, updated, removed: the items added, changed and removed - list
+        """
+        records = []
+        for operation, changed in (('remove', removed), ('add', added), ('update', updated)):
+            for item in changed:
+                self._sequence += 1
+                records.append(str(self._sequence) + ' ' + operation + ' ' + self._obj_to_string(item))
+        with open(self.journal_name, "a", encoding="utf-8") as f:
+            f.writelines(records)
+        self._records += len(records)
+        if self._records > max(self.min_compaction, len(items)):
+            self.compact(items)
+
+
+class TestPersistence(TestCase):
+    def setUp(self):
+        descriptor, self.file_name = tempfile.mkstemp()
+        os.close(descriptor)
+        self.clients = [Client('1', 'Ana'), Client('2', 'Dan')]
+
+    def tearDown(self):
+        for name in (self.file_name, self.file_name + '.journal'):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def check(self, persistence):
+        persistence.save(self.clients)
+        self.assertEqual([(client.id, client.name) for client in persistence.load()], [('1', 'Ana'), ('2', 'Dan')])
+
+    def test_text_file(self):
+        self.check(TextFile(self.file_name, lambda line: Client(*line.strip().split(';')),
+                            lambda client: client.id + ';' + client.name + '\n'))
+
+    def test_pickle_file(self):
+        persistence = PickleFile(self.file_name, lambda string: Client(*string.split(';')),
+                                 lambda client: client.id + ';' + client.name)
+        with self.assertRaises(EOFError):
+            persistence.load()
+        self.check(persistence)
+
+    def test_journal_file(self):
+        persistence = JournalFile(self.file_name, lambda line: Client(*line.strip().split(';')),
+                                  lambda client: client.id + ';' + client.name + '\n', min_compaction=3)
+        persistence.save(self.clients)
+        self.clients[0].name = 'Anca'
+        persistence.record(self.clients, updated=[self.clients[0]])
+        persistence.record(self.clients[1:], removed=[self.clients[0]], added=[Client('3', 'Ion')])
+        with open(self.file_name) as f:
+            self.assertEqual(f.read(), '1;Ana\n2;Dan\n')
+        with open(persistence.journal_name, 'a') as f:
+            f.write('4 add 4;Cut')
+        self.assertEqual([(client.id, client.name) for client in persistence.load()], [('2', 'Dan'), ('3', 'Ion')])
+        self.assertEqual(persistence.records, 3)
+        with open(persistence.journal_name) as f:
+            self.assertEqual(f.read(), '1 update 1;Anca\n2 remove 1;Anca\n3 add 3;Ion\n')
+        persistence.record([Client('2', 'Dan')], removed=[Client('3', 'Ion')])
+        self.assertEqual(persistence.records, 0)
+        with open(self.file_name) as f:
+            self.assertEqual(f.read(), '2;Dan\n')
+        self.assertEqual([client.id for client in persistence.load()], ['2'])
+
+    def test_struct_file(self):
+        PickleFile(self.file_name, None, lambda client: client.id + ';' + client.name).save(self.clients)
+        persistence = StructFile(self.file_name, 'ssbd', lambda client: (client.id, client.name, client.worthy,
+                                                                         None if client.worthy else date(2020, 2, 29)),
+                                 lambda id, name, worthy, since: Client(id, name, (worthy, since)),
+                                 lambda string: Client(*string.split(';')))
+        self.assertEqual([(client.id, client.name) for client in persistence.load()], [('1', 'Ana'), ('2', 'Dan')])
+        self.clients.append(Client('3', 'Ştefan', False))
+        persistence.save(self.clients)
+        self.assertEqual([(client.id, client.name, client.worthy) for client in persistence.load()],
+                         [('1', 'Ana', (True, None)), ('2', 'Dan', (True, None)),
+                          ('3', 'Ştefan', (False, date(2020, 2, 29)))])
+        with open(self.file_name, 'rb+') as f:
+            f.truncate(os.path.getsize(self.file_name) - 2)
+        with self.assertRaises(EOFError):
+            persistence.load()
+        persistence.save([])
+        self.assertEqual(persistence.load(), [])
+        with self.assertRaises(BinaryFormatError):
+            StructFile(self.file_name, 'ss', None, None).load()
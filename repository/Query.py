@@ -0,0 +1,210 @@
+"""
+Query class
+"""
+import heapq
+from itertools import islice
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+class QueryError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class Query:
+    """
+    Lazy, chainable query over an iterable of items
+    Every method returns a new Query, the source is only read when the query is iterated, and the
+    results are streamed one by one.
+    Attributes:
+        source: the items to be queried - iterable
+
+    Methods:
+        where: keeps the items accepted by a function
+        order_by: orders the results by a key
+        offset: skips a number of results
+        limit: caps the number of results
+        project: transforms every result
+        all: the results as a list
+        first: the first result
+        count: the number of results
+    """
+    def __init__(self, source):
+        self._source = source
+        self._conditions = []
+        self._key = None
+        self._reverse = False
+        self._offset = 0
+        self._limit = None
+        self._projection = None
+
+    def _copy(self):
+        query = Query(self._source)
+        query._conditions = self._conditions[:]
+        query._key = self._key
+        query._reverse = self._reverse
+        query._offset = self._offset
+        query._limit = self._limit
+        query._projection = self._projection
+        return query
+
+    def where(self, function):
+        """
+        Keeps only the items for which the function returns true
+        Args:
+            function: acceptance function - boolean function
+
+        Returns: the new query - Query
+
+        """
+        query = self._copy()
+        query._conditions.append(function)
+        return query
+
+    def order_by(self, key, reverse=False):
+        """
+        Orders the results by the given key. The order is stable
+        Args:
+            key: function giving the value to order an item by - function
+            reverse: descending order - bool
+
+        Returns: the new query - Query
+
+        """
+        query = self._copy()
+        query._key = key
+        query._reverse = reverse
+        return query
+
+    def offset(self, count):
+        """
+        Skips the first count results
+        Raises QueryError if count is negative
+        """
+        if count < 0:
+            raise QueryError("Offset can't be negative")
+        query = self._copy()
+        query._offset = count
+        return query
+
+    def limit(self, count):
+        """
+        Returns at most count results, None meaning no limit
+        Raises QueryError if count is negative
+        """
+        if count is not None and count < 0:
+            raise QueryError("Limit can't be negative")
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def project(self, function):
+        """
+        Replaces every result with the value returned by the function
+        Args:
+            function: transformation of a result - function
+
+        Returns: the new query - Query
+
+        """
+        query = self._copy()
+        query._projection = function
+        return query
+
+    def __iter__(self):
+        items = iter(self._source)
+        for condition in self._conditions:
+            items = filter(condition, items)
+
+        stop = None if self._limit is None else self._offset + self._limit
+        if self._key is not None:
+            # With a limit, only the first offset + limit results are kept in a heap instead of sorting all of them
+            if stop is None:
+                items = iter(sorted(items, key=self._key, reverse=self._reverse))
+            elif self._reverse:
+                items = iter(heapq.nlargest(stop, items, key=self._key))
+            else:
+                items = iter(heapq.nsmallest(stop, items, key=self._key))
+
+        if self._offset > 0 or stop is not None:
+            items = islice(items, self._offset, stop)
+        if self._projection is not None:
+            items = map(self._projection, items)
+        return items
+
+    def all(self):
+        """
+        Returns: all the results - list
+        """
+        return list(self)
+
+    def first(self):
+        """
+        Returns: the first result, None if there is no result
+        """
+        return next(iter(self), None)
+
+    def count(self):
+        """
+        Returns: the number of results - int
+        """
+        count = 0
+        for _ in self:
+            count += 1
+        return count
+
+
+class TestQuery(TestCase):
+    def setUp(self):
+        self.clients = [Client('1', 'dan'), Client('2', 'ana'), Client('3', 'mara'),
+                        Client('4', 'ana'), Client('5', 'vlad'), Client('6', 'alex')]
+
+    def test_where(self):
+        query = Query(self.clients).where(lambda client: 'a' in client.name).where(lambda client: client.id > '2')
+        self.assertEqual([client.id for client in query], ['3', '4', '5', '6'])
+
+    def test_order_by(self):
+        query = Query(self.clients).order_by(lambda client: client.name)
+        self.assertEqual([client.id for client in query], ['6', '2', '4', '1', '3', '5'])
+        query = Query(self.clients).order_by(lambda client: client.name, reverse=True)
+        self.assertEqual([client.id for client in query], ['5', '3', '1', '2', '4', '6'])
+
+    def test_offset_limit(self):
+        query = Query(self.clients).offset(1).limit(2)
+        self.assertEqual([client.id for client in query], ['2', '3'])
+        query = Query(self.clients).order_by(lambda client: client.name).offset(1).limit(2)
+        self.assertEqual([client.id for client in query], ['2', '4'])
+        query = Query(self.clients).order_by(lambda client: client.name, reverse=True).limit(3)
+        self.assertEqual([client.id for client in query], ['5', '3', '1'])
+        self.assertEqual(Query(self.clients).limit(0).all(), [])
+        with self.assertRaises(QueryError):
+            Query(self.clients).limit(-1)
+        with self.assertRaises(QueryError):
+            Query(self.clients).offset(-1)
+
+    def test_project(self):
+        query = Query(self.clients).where(lambda client: client.name == 'ana').project(lambda client: client.id)
+        self.assertEqual(query.all(), ['2', '4'])
+
+    def test_first_count(self):
+        query = Query(self.clients).where(lambda client: client.name.startswith('a'))
+        self.assertEqual(query.first().id, '2')
+        self.assertEqual(query.count(), 3)
+        self.assertIsNone(query.where(lambda client: False).first())
+
+    def test_chaining_does_not_change_query(self):
+        query = Query(self.clients)
+        query.where(lambda client: False).limit(1)
+        self.assertEqual(query.count(), 6)
+
+    def test_lazy(self):
+        def numbers():
+            i = 0
+            while True:
+                yield i
+                i += 1
+
+        query = Query(numbers()).where(lambda number: number % 3 == 0).offset(2).limit(3)
+        self.assertEqual(query.all(), [6, 9, 12])
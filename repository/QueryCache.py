@@ -0,0 +1,139 @@
+"""
+QueryCache class
+"""
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from unittest import TestCase
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'size', 'length'])
+
+
+class QueryCache:
+    """
+    Least recently used cache of query results, keyed by (method, arguments, version)
+    The version is the mutation counter of the data the results are computed from: a result of an older version is
+    never returned, and the entries of older versions are dropped as soon as a newer version is seen, so they do not
+    push the current ones out.
+    Attributes:
+        size: maximum number of results kept, 0 to cache nothing - int
+        hits: number of results found in the cache - int
+        misses: number of results computed - int
+        _entries: the results, least recently used first - OrderedDict
+        _version: version of the results kept
+
+    Methods:
+        get: the cached result of a query, computing it on a miss
+        clear: drops all the results
+        info: the counters
+    """
+    def __init__(self, size=128):
+        self._size = size
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, size):
+        self._size = size
+        while len(self._entries) > size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get(self, key, version, compute):
+        """
+        Finds the result of a query, computing and keeping it if not cached
+        Args:
+            key: the method and arguments of the query, must be hashable
+            version: version of the data the query reads
+            compute: function computing the result - function
+
+        Returns: the result
+        """
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        key = (key, version)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        result = compute()
+        if self._size > 0:
+            self._entries[key] = result
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return result
+
+    def info(self):
+        """
+        Returns: the hits, misses, size and number of results kept - CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self._size, len(self._entries))
+
+
+def cached(method):
+    """
+    Decorates a query method of an object having a cache and a version, serving repeated calls from the cache
+    A list result is copied, so changing it does not change the cached one.
+    Calls with unhashable arguments are not cached.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+        result = self.cache.get(key, self.version, lambda: method(self, *args, **kwargs))
+        return list(result) if isinstance(result, list) else result
+    return wrapper
+
+
+class TestQueryCache(TestCase):
+    class Squares:
+        def __init__(self):
+            self.cache = QueryCache(2)
+            self.version = 0
+            self.calls = 0
+
+        @cached
+        def squares(self, count):
+            self.calls += 1
+            return [i * i for i in range(count)]
+
+    def test_cached(self):
+        squares = self.Squares()
+        self.assertEqual(squares.squares(3), [0, 1, 4])
+        squares.squares(3).append(9)
+        self.assertEqual(squares.squares(count=3), [0, 1, 4])
+        self.assertEqual(squares.squares(3), [0, 1, 4])
+        self.assertEqual(squares.calls, 2)
+        self.assertEqual(squares.cache.info(), CacheInfo(2, 2, 2, 2))
+        squares.version += 1
+        squares.squares(3)
+        self.assertEqual(squares.calls, 3)
+        self.assertEqual(len(squares.cache), 1)
+
+    def test_lru(self):
+        cache = QueryCache(2)
+        cache.get('a', 0, lambda: 1)
+        cache.get('b', 0, lambda: 2)
+        cache.get('a', 0, lambda: 1)
+        cache.get('c', 0, lambda: 3)
+        self.assertEqual(cache.get('a', 0, lambda: None), 1)
+        self.assertIsNone(cache.get('b', 0, lambda: None))
+        cache.size = 0
+        self.assertEqual(len(cache), 0)
+        cache.get('a', 0, lambda: 1)
+        self.assertEqual(len(cache), 0)
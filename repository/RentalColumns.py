@@ -0,0 +1,201 @@
+"""
+RentalColumns class, a columnar row store for rentals
+Use it as the storage of a RentalHistory:
+    RentalHistory(Iterable(rows=RentalColumns()))
+or, for the indexes to take as little memory as the rows, through RentalHistoryColumnar, whose RentalTable keeps
+the lookups of RentalHistory on its rows.
+"""
+from array import array
+from datetime import date
+from unittest import TestCase
+
+from domain.Rental import Rental
+from repository.Iterable import Iterable
+
+
+class RentalColumnsError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class Interner:
+    """
+    Maps strings to small ints and back, storing every distinct string once
+    """
+    def __init__(self):
+        self._codes = {}
+        self._values = []
+
+    def code(self, value):
+        """
+        Returns: the int standing for the value, a new one if the value is not known yet - int
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(value)
+        return code
+
+    def extend(self, values):
+        """
+        Gives the next ints to values known to be new and distinct, in their order
+        """
+        self._codes.update(zip(values, range(len(self._values), len(self._values) + len(values))))
+        self._values.extend(values)
+
+    def code_of(self, value):
+        """
+        Returns: the int standing for the value, None if the value is not known - int
+        """
+        return self._codes.get(value)
+
+    def value(self, code):
+        return self._values[code]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class RentalColumns:
+    """
+    Keeps rentals as typed arrays, one per field, instead of one Rental object per rental
+    Movie and client ids are interned to ints, dates are stored as their ordinal, 0 meaning no date.
+    Reading a row builds a new Rental from the columns. The Rental is a copy: changing it has no effect on the store
+    until it is written back, which the repositories do.
+    Behaves like the list of an Iterable: rows can be appended, read, replaced and set to None.
+    Attributes:
+        _movie_ids, _client_ids: interned ids - array of int
+        _rented, _due, _returned: date ordinals - array of int
+        _live: 1 for the rows holding a rental, 0 for the rows set to None - bytearray
+    """
+    COLUMNS = {'movie_id': '_movie_ids', 'client_id': '_client_ids', 'rented_date': '_rented', 'due_date': '_due',
+               'returned_date': '_returned', 'live': '_live'}
+
+    def __init__(self, rentals=None):
+        self._movies = Interner()
+        self._clients = Interner()
+        self._movie_ids = array('i')
+        self._client_ids = array('i')
+        self._rented = array('i')
+        self._due = array('i')
+        self._returned = array('i')
+        self._live = bytearray()
+        if rentals is not None:
+            for rental in rentals:
+                self.append(rental)
+
+    @property
+    def movies(self):
+        return self._movies
+
+    @property
+    def clients(self):
+        return self._clients
+
+    def column(self, name):
+        """
+        Returns: one of the columns, 'movie_id', 'client_id', 'rented_date', 'due_date', 'returned_date' or 'live',
+            to be read only - array of int
+        """
+        return getattr(self, self.COLUMNS[name])
+
+    @staticmethod
+    def date_to_ordinal(day):
+        return 0 if day is None else day.toordinal()
+
+    @staticmethod
+    def ordinal_to_date(ordinal):
+        return None if ordinal == 0 else date.fromordinal(ordinal)
+
+    def append(self, rental):
+        if rental is None:
+            raise RentalColumnsError("Only rentals can be appended")
+        self._movie_ids.append(self._movies.code(rental.movie_id))
+        self._client_ids.append(self._clients.code(rental.client_id))
+        self._rented.append(self.date_to_ordinal(rental.rented_date))
+        self._due.append(self.date_to_ordinal(rental.due_date))
+        self._returned.append(self.date_to_ordinal(rental.returned_date))
+        self._live.append(1)
+
+    def __len__(self):
+        return len(self._live)
+
+    def __getitem__(self, row):
+        if not self._live[row]:
+            return None
+        return Rental(self._movies.value(self._movie_ids[row]), self._clients.value(self._client_ids[row]),
+                      self.ordinal_to_date(self._rented[row]), self.ordinal_to_date(self._due[row]),
+                      self.ordinal_to_date(self._returned[row]))
+
+    def __setitem__(self, row, rental):
+        if rental is None:
+            self._live[row] = 0
+            return
+        self._movie_ids[row] = self._movies.code(rental.movie_id)
+        self._client_ids[row] = self._clients.code(rental.client_id)
+        self._rented[row] = self.date_to_ordinal(rental.rented_date)
+        self._due[row] = self.date_to_ordinal(rental.due_date)
+        self._returned[row] = self.date_to_ordinal(rental.returned_date)
+        self._live[row] = 1
+
+    def __iter__(self):
+        for row in range(len(self._live)):
+            yield self[row]
+
+    def sort(self, key, reverse=False):
+        """
+        Stable sort of the rows by a key computed on the rentals
+        """
+        order = sorted(range(len(self._live)), key=lambda row: key(self[row]), reverse=reverse)
+        for name in ['_movie_ids', '_client_ids', '_rented', '_due', '_returned']:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[row] for row in order)))
+        self._live = bytearray(self._live[row] for row in order)
+
+
+class TestRentalColumns(TestCase):
+    def setUp(self):
+        self.rows = RentalColumns()
+        self.rows.append(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        self.rows.append(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17)))
+        self.rows.append(Rental('245', '423', date(2002, 1, 17), date(2002, 1, 27), date(2002, 1, 20)))
+
+    def test_get(self):
+        rental = self.rows[1]
+        self.assertEqual(rental.movie_id, '2')
+        self.assertEqual(rental.client_id, '423')
+        self.assertEqual(rental.due_date, date(2002, 4, 17))
+        self.assertIsNone(rental.returned_date)
+        self.assertEqual(len(self.rows), 3)
+        self.assertEqual(len(self.rows._movies), 2)
+
+    def test_set(self):
+        rental = self.rows[1]
+        rental.returned_date = date(2002, 3, 1)
+        self.assertIsNone(self.rows[1].returned_date)
+        self.rows[1] = rental
+        self.assertEqual(self.rows[1].returned_date, date(2002, 3, 1))
+        self.rows[0] = None
+        self.assertIsNone(self.rows[0])
+        self.assertEqual([rental is None for rental in self.rows], [True, False, False])
+        with self.assertRaises(RentalColumnsError):
+            self.rows.append(None)
+
+    def test_sort(self):
+        self.rows.sort(key=lambda rental: rental.rented_date)
+        self.assertEqual([rental.movie_id + rental.client_id for rental in self.rows], ['245423', '2423', '2454243'])
+        self.rows.sort(key=lambda rental: rental.client_id, reverse=True)
+        self.assertEqual([rental.client_id for rental in self.rows], ['4243', '423', '423'])
+
+    def test_as_iterable_rows(self):
+        it = Iterable(self.rows, rows=RentalColumns())
+        first = self.rows[0]
+        second = self.rows[1]
+        self.assertEqual(it[second.id].client_id, '423')
+        del it[first.id]
+        del it[second.id]
+        self.assertEqual(len(it), 1)
+        self.assertEqual(len(it.list), 1)
+        self.assertFalse(it[first.id])
+        self.assertEqual(it.list[0].rented_date, date(2002, 1, 17))
@@ -0,0 +1,449 @@
+"""
+RentalFile class, a memory-mapped row store for rentals
+Use it as the storage of a RentalHistory:
+    RentalHistory(Iterable(rows=RentalFile('rentals.bin')))
+or through RentalHistoryMapped, which opens it without reading the rentals.
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+from unittest import TestCase
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.RentalColumns import Interner
+from repository.RentalFileIndex import RentalFileIndex
+
+
+class RentalFileError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+class RentalFile:
+    """
+    Keeps rentals as fixed width records of a memory-mapped file, instead of reading them all into memory
+    The file starts with a header: the magic bytes, the format version, the size of a record and the number of
+    records. A record holds the interned movie and client ids, the rented, due and returned dates as ordinals, 0
+    meaning no date, and whether it holds a rental, as little endian int32. The movie and client ids are appended,
+    the first time they are used, to a side file, '<file>.ids', whose lines are 'movie <id>' or 'client <id>', in the
+    order of their codes.
+    Opening the file maps it and reads only the ids: the records are read when they are accessed, in O(1) as they
+    all have the same width, and written in place, so returning a rental writes the 4 bytes of its returned date.
+    The file grows by doubling its capacity. The rows of a rental id, of a movie and of a client are found through a
+    RentalFileIndex, kept in a third file, '<file>.idx', so they are found without reading the other records, also
+    after reopening the file. The queries of a RentalHistory needed to rent and return movies read the ints of the
+    records they find, and build Rentals only for the rentals they return.
+    Reading a row builds a new Rental from its record, a copy, as with RentalColumns.
+    Behaves like the list of an Iterable: rows can be appended, read, replaced and set to None. A row set to None
+    keeps its record, marked as not holding a rental, so removing writes 4 bytes and the rows never move; compact()
+    drops them by writing a new file.
+    Attributes:
+        file_name: path of the file - string
+        ids_name: path of the file of the ids, the file name followed by '.ids' - string
+        movies, clients: the codes of the movie and client ids - Interner
+        index: the rows by rental key, movie and client - RentalFileIndex
+        _decoded: the rentals of the rows while reading(), None otherwise - list
+    """
+    MAGIC = b'MRRF'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHII')
+    RECORD = struct.Struct('<6i')
+    RETURNED = struct.Struct('<i')
+    RETURNED_OFFSET = 16
+    MIN_CAPACITY = 1024
+    # The returned date of the rentals not returned yet, for the queries on the intervals a movie is rented in
+    NOT_RETURNED = date.max.toordinal()
+    keeps_holes = True
+
+    def __init__(self, file_name):
+        self._file_name = file_name
+        self._movies = Interner()
+        self._clients = Interner()
+        self._decoded = None
+        if not os.path.exists(file_name) or os.path.getsize(file_name) == 0:
+            with open(file_name, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.RECORD.size, 0, 0))
+                f.truncate(self.HEADER.size + self.MIN_CAPACITY * self.RECORD.size)
+            open(self.ids_name, "w").close()
+        self._file = open(file_name, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, version, size, self._count, _ = self.HEADER.unpack_from(self._map)
+        if magic != self.MAGIC or version != self.VERSION or size != self.RECORD.size:
+            self._map.close()
+            self._file.close()
+            raise RentalFileError("Unsupported rental file")
+        self._read_ids()
+        self._ids = open(self.ids_name, "a", encoding="utf-8")
+        self._index = RentalFileIndex(self)
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    @property
+    def ids_name(self):
+        return self._file_name + '.ids'
+
+    @property
+    def movies(self):
+        return self._movies
+
+    @property
+    def clients(self):
+        return self._clients
+
+    @property
+    def index(self):
+        return self._index
+
+    def _read_ids(self):
+        if not os.path.exists(self.ids_name):
+            return
+        with open(self.ids_name, "r", encoding="utf-8") as f:
+            lines = f.read().split('\n')[:-1]
+        # Every id is written once, the first time it is used, so the lines give the codes in order
+        self._movies.extend([line[6:] for line in lines if line.startswith('movie ')])
+        self._clients.extend([line[7:] for line in lines if line.startswith('client ')])
+
+    def _code(self, interner, kind, id):
+        """
+        Returns: the code of an id, appending the id to the file of the ids if it is new - int
+        """
+        count = len(interner)
+        code = interner.code(id)
+        if code == count:
+            self._ids.write(kind + ' ' + id + '\n')
+            # Written before any record using the code, so the records never refer to a missing id
+            self._ids.flush()
+        return code
+
+    def _offset(self, row):
+        if not 0 <= row < self._count:
+            raise IndexError("Rental row out of range")
+        return self.HEADER.size + row * self.RECORD.size
+
+    def _record(self, rental):
+        return (self._code(self._movies, 'movie', rental.movie_id),
+                self._code(self._clients, 'client', rental.client_id),
+                rental.rented_date.toordinal(), rental.due_date.toordinal(),
+                0 if rental.returned_date is None else rental.returned_date.toordinal(), 1)
+
+    def _rental(self, record):
+        movie, client, rented, due, returned, live = record
+        if not live:
+            return None
+        return Rental(self._movies.value(movie), self._clients.value(client), date.fromordinal(rented),
+                      date.fromordinal(due), date.fromordinal(returned) if returned else None)
+
+    def _key(self, id):
+        """
+        Returns: the key of a rental id in the index of the rows, None if one of its ids was never used - tuple
+        """
+        movie = self._movies.code_of(id.movie_id)
+        client = self._clients.code_of(id.client_id)
+        if movie is None or client is None:
+            return None
+        return movie, client, id.rented_date.toordinal(), id.due_date.toordinal()
+
+    def records(self):
+        """
+        Returns: the records, as tuples of ints - iterator
+        """
+        return self.RECORD.iter_unpack(self._map[self.HEADER.size:self.HEADER.size + self._count * self.RECORD.size])
+
+    def unpack(self, row):
+        """
+        Returns: the record of a row: the movie code, client code, rented, due and returned ordinals, and 1 if it
+            holds a rental, 0 if not - tuple of int
+        """
+        return self.RECORD.unpack_from(self._map, self._offset(row))
+
+    def row(self, id):
+        """
+        Finds the row of a rental
+        Args:
+            id: id of the rental - RentalKey
+
+        Returns: the row - int, None if not found
+        """
+        key = self._key(id)
+        return None if key is None else self._index.row(key)
+
+    def _write(self, row, record):
+        offset = self._offset(row)
+        old = self.RECORD.unpack_from(self._map, offset)
+        self._index.changing()
+        self.RECORD.pack_into(self._map, offset, *record)
+        if record[5]:
+            self._index.added(row, record, old if old[5] else None)
+
+    def _grow(self):
+        """
+        Doubles the capacity of the file, mapping it again
+        """
+        capacity = max(self.MIN_CAPACITY, 2 * self._count)
+        self._map.close()
+        self._file.truncate(self.HEADER.size + capacity * self.RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _set_count(self, count):
+        self._count = count
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.VERSION, self.RECORD.size, count, 0)
+
+    def append(self, rental):
+        if rental is None:
+            raise RentalFileError("Only rentals can be appended")
+        if self.HEADER.size + (self._count + 1) * self.RECORD.size > len(self._map):
+            self._grow()
+        record = self._record(rental)
+        self._count += 1
+        self._write(self._count - 1, record)
+        self._set_count(self._count)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, row):
+        return self._rental(self.RECORD.unpack_from(self._map, self._offset(row)))
+
+    def __setitem__(self, row, rental):
+        if rental is None:
+            record = self.RECORD.unpack_from(self._map, self._offset(row))
+            self._write(row, record[:5] + (0,))
+        else:
+            self._write(row, self._record(rental))
+
+    def set_returned_date(self, row, returned_date):
+        """
+        Writes the returned date of the rental in a row, in place
+        Args:
+            row: row of the rental - int
+            returned_date: the returned date, None if not returned - date
+        """
+        self.RETURNED.pack_into(self._map, self._offset(row) + self.RETURNED_OFFSET,
+                                0 if returned_date is None else returned_date.toordinal())
+
+    def __iter__(self):
+        if self._decoded is not None:
+            return iter(self._decoded)
+        return map(self._rental, self.records())
+
+    @contextmanager
+    def reading(self):
+        """
+        Context manager decoding the records once for all the iterations over the rows in the block, instead of once
+        per iteration, as building the indexes of a RentalHistory does
+        The rows must not be changed in the block.
+        """
+        self._decoded = list(self)
+        try:
+            yield
+        finally:
+            self._decoded = None
+
+    def _rewrite(self, records):
+        """
+        Replaces the file by one holding the given records
+        The records are written to a temporary file next to it, which then replaces it, so a crash leaves either the
+        old file or the new one.
+        """
+        capacity = max(self.MIN_CAPACITY, len(records))
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._file_name)))
+        try:
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.RECORD.size, len(records), 0))
+                f.write(b''.join(self.RECORD.pack(*record) for record in records))
+                f.truncate(self.HEADER.size + capacity * self.RECORD.size)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(self._file_name, temporary)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self._ids.flush()
+        # The index is rebuilt if the file is opened again before it is
+        self._index.changing()
+        self._map.close()
+        self._file.close()
+        os.replace(temporary, self._file_name)
+        self._file = open(self._file_name, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._count = len(records)
+        self._index.rebuild()
+
+    def compact(self):
+        """
+        Drops the rows set to None, writing the other records to a new file, in O(n)
+        The rows after a dropped one move, so they have to be looked up again.
+        """
+        self._rewrite([record for record in self.records() if record[5]])
+
+    def sort(self, key, reverse=False):
+        """
+        Stable sort of the rows by a key computed on the rentals, writing them to a new file like compact(), which
+        also drops the rows set to None
+        """
+        records = [record for record in self.records() if record[5]]
+        order = sorted(range(len(records)), key=lambda row: key(self._rental(records[row])), reverse=reverse)
+        self._rewrite([records[row] for row in order])
+
+    def flush(self):
+        """
+        Writes the changed pages of the map to the file
+        """
+        self._map.flush()
+        self._ids.flush()
+        self._index.flush()
+
+    def close(self):
+        if not self._map.closed:
+            self._map.flush()
+            self._ids.flush()
+            self._index.close()
+            self._map.close()
+        self._file.close()
+        self._ids.close()
+
+    def _found(self, rows, column, code):
+        """
+        Reads the records of the rows found by the index for a movie or client code, keeping those still holding a
+        rental of the code
+        Args:
+            rows: the rows found - iterable of int
+            column: 0 for a movie code, 1 for a client code - int
+            code: the code - int
+
+        Returns: the rows and their records, in the order of the rows - list of (int, tuple)
+        """
+        found = {}
+        for row in rows:
+            record = self.unpack(row)
+            if record[5] and record[column] == code:
+                found[row] = record
+        return sorted(found.items())
+
+    def _of_movie(self, movie_id):
+        movie = self._movies.code_of(movie_id)
+        return self._found(self._index.movie_rows(movie), 0, movie)
+
+    def rentals_of_movie(self, movie_id):
+        """
+        Returns: the rentals of a movie, in the order of their rows - list of Rental
+        """
+        return [self._rental(record) for row, record in self._of_movie(movie_id)]
+
+    def rentals_of_client(self, client_id):
+        """
+        Returns: the rentals of a client, in the order of their rows - list of Rental
+        """
+        client = self._clients.code_of(client_id)
+        return [self._rental(record) for row, record in self._found(self._index.client_rows(client), 1, client)]
+
+    def open_rentals(self):
+        """
+        Finds the rentals not returned yet, reading the returned dates of all the records
+        Returns: list of Rental
+        """
+        return [self._rental(record) for record in self.records() if record[5] and not record[4]]
+
+    def movie_rented_until(self, movie_id):
+        """
+        Returns: the latest returned date of the rentals of a movie, date.max if one is not returned yet, None if
+            the movie was never rented - date
+        """
+        reach = max((record[4] or self.NOT_RETURNED for row, record in self._of_movie(movie_id)), default=None)
+        return None if reach is None else date.fromordinal(reach)
+
+    def is_movie_free(self, movie_id, start, end=None):
+        """
+        Checks whether no rental of a movie overlaps a day or a range of days, reading the records of the movie
+        Args:
+            movie_id: id of the movie - string
+            start: the day, or the first day of the range - date
+            end: the last day of the range, None to check only the start - date
+
+        Returns: True if free, False if not
+        """
+        if end is None:
+            end = start
+        start, end = start.toordinal(), end.toordinal()
+        return not any(record[2] <= end and (record[4] or self.NOT_RETURNED) >= start
+                       for row, record in self._of_movie(movie_id))
+
+
+class TestRentalFile(TestCase):
+    def setUp(self):
+        descriptor, self.file_name = tempfile.mkstemp()
+        os.close(descriptor)
+        self.rows = RentalFile(self.file_name)
+        self.rows.append(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        self.rows.append(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17)))
+        self.rows.append(Rental('245', '423', date(2002, 1, 17), date(2002, 1, 27), date(2002, 1, 20)))
+
+    def tearDown(self):
+        self.rows.close()
+        for name in (self.file_name, self.file_name + '.ids', self.file_name + '.idx'):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_get_set(self):
+        self.assertEqual((self.rows[1].movie_id, self.rows[1].client_id, self.rows[1].returned_date),
+                         ('2', '423', None))
+        self.assertEqual(self.rows.row(RentalKey('245', '423', date(2002, 1, 17), date(2002, 1, 27))), 2)
+        self.assertIsNone(self.rows.row(RentalKey('245', '1', date(2002, 1, 17), date(2002, 1, 27))))
+        self.rows.set_returned_date(1, date(2002, 3, 1))
+        self.assertEqual(self.rows[1].returned_date, date(2002, 3, 1))
+        self.rows[0] = None
+        self.assertIsNone(self.rows.row(RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))))
+        self.assertEqual([rental is None for rental in self.rows], [True, False, False])
+        with self.assertRaises(IndexError):
+            self.rows[3]
+        with self.assertRaises(RentalFileError):
+            self.rows.append(None)
+
+    def test_reopen(self):
+        for i in range(2000):
+            self.rows.append(Rental(str(i), 'c', date(2003, 1, 1), date(2003, 1, 8)))
+        self.rows.set_returned_date(0, None)
+        self.rows.close()
+        self.rows = RentalFile(self.file_name)
+        self.assertEqual(len(self.rows), 2003)
+        self.assertIsNone(self.rows[0].returned_date)
+        self.assertEqual(self.rows[2002].movie_id, '1999')
+        self.assertEqual(self.rows.row(RentalKey('7', 'c', date(2003, 1, 1), date(2003, 1, 8))), 10)
+
+    def test_compact_sort(self):
+        self.rows[1] = None
+        self.assertEqual(len(self.rows), 3)
+        self.rows.compact()
+        self.assertEqual([rental.client_id for rental in self.rows], ['4243', '423'])
+        self.rows.close()
+        self.rows = RentalFile(self.file_name)
+        self.assertEqual(len(self.rows), 2)
+        self.rows.append(Rental('3', '423', date(2002, 3, 1), date(2002, 3, 8)))
+        self.rows.sort(key=lambda rental: rental.rented_date)
+        self.assertEqual([rental.client_id for rental in self.rows], ['423', '4243', '423'])
+        self.assertEqual(self.rows.row(RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))), 1)
+        self.assertEqual([rental.client_id for rental in self.rows.rentals_of_client('423')], ['423', '423'])
+
+    def test_queries(self):
+        self.rows.close()
+        self.rows = RentalFile(self.file_name)
+        self.assertEqual([rental.client_id for rental in self.rows.rentals_of_movie('245')], ['4243', '423'])
+        self.assertEqual([rental.movie_id for rental in self.rows.rentals_of_client('423')], ['2', '245'])
+        self.assertEqual([rental.movie_id for rental in self.rows.open_rentals()], ['2'])
+        self.assertEqual(self.rows.movie_rented_until('245'), date(2002, 3, 23))
+        self.assertEqual(self.rows.movie_rented_until('2'), date.max)
+        self.assertIsNone(self.rows.movie_rented_until('7'))
+        self.assertFalse(self.rows.is_movie_free('245', date(2002, 3, 1), date(2002, 4, 1)))
+        self.assertTrue(self.rows.is_movie_free('245', date(2002, 1, 21), date(2002, 2, 22)))
+        self.rows[0] = Rental('2', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23))
+        self.rows[2] = None
+        self.assertEqual(self.rows.rentals_of_movie('245'), [])
+        self.assertEqual([rental.client_id for rental in self.rows.rentals_of_movie('2')], ['4243', '423'])
+        self.assertIsNone(self.rows.movie_rented_until('245'))
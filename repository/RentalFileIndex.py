@@ -0,0 +1,305 @@
+"""
+RentalFileIndex class, the lookups of a RentalFile kept in a file next to it
+"""
+import mmap
+import os
+import struct
+import tempfile
+from unittest import TestCase
+
+
+def key_hash(key):
+    """
+    Hash of a rental key, the same in every run and Python version, unlike hash()
+    Args:
+        key: the movie code, client code, rented and due ordinals - tuple of int
+
+    Returns: int
+    """
+    movie, client, rented, due = key
+    value = (movie * 0x9E3779B1 + client * 0x85EBCA77 + rented * 0xC2B2AE3D + due * 0x27D4EB2F) & 0xFFFFFFFF
+    return value ^ (value >> 15)
+
+
+class RentalFileIndex:
+    """
+    Finds the rows of a RentalFile by rental key, by movie and by client, without reading its other records
+    The index is the file '<rental file>.idx', mapped in memory. After a header, it holds:
+        slots: an open addressing hash table of the rows by rental key, as row + 1, 0 for an empty slot
+        movie tails, client tails: the last node of the chain of every movie and client code, as node + 1
+        nodes: (row, previous node + 1) pairs, chaining the rows of every movie and client from the last one
+    A lookup reads the records the slots point to and compares their keys, so the slots of a rental whose key
+    changed, or that was removed, are skipped, and are reused when the key is added again. In the same way the nodes
+    are only appended: a row whose movie or client changes is chained to the new one and left in the old chain, the
+    rentals of a chain being checked against their records.
+    The index is rebuilt from the records when it is missing, when a table is full, and when it was not closed or
+    flushed after its last change, as after a crash.
+    Attributes:
+        file_name: path of the file - string
+        _rows: the records indexed - RentalFile
+    """
+    MAGIC = b'MRRI'
+    VERSION = 1
+    # version, clean, count, slots, used slots, movies, clients, nodes, capacity of the nodes
+    HEADER = struct.Struct('<4s9I')
+    INT = struct.Struct('<I')
+    NODE = struct.Struct('<II')
+    MIN_CAPACITY = 1024
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._file_name = rows.file_name + '.idx'
+        self._file = None
+        self._map = None
+        header = None
+        if os.path.exists(self._file_name) and os.path.getsize(self._file_name) >= self.HEADER.size:
+            self._open()
+            header = self.HEADER.unpack_from(self._map)
+        if header is None or header[:2] != (self.MAGIC, self.VERSION) or not header[2] or header[3] != len(rows):
+            self.rebuild()
+        else:
+            self._read_header()
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    def _open(self):
+        self._file = open(self._file_name, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def _read_header(self):
+        (_, _, self._clean, _, self._slots, self._used, self._movies, self._clients, self._nodes,
+         self._capacity) = self.HEADER.unpack_from(self._map)
+        self._movies_at = self.HEADER.size + self._slots * self.INT.size
+        self._clients_at = self._movies_at + self._movies * self.INT.size
+        self._nodes_at = self._clients_at + self._clients * self.INT.size
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.VERSION, self._clean, len(self._rows), self._slots,
+                              self._used, self._movies, self._clients, self._nodes, self._capacity)
+
+    def rebuild(self):
+        """
+        Indexes the records again, in a new file replacing the old one, in O(n)
+        """
+        count = len(self._rows)
+        slots = self.MIN_CAPACITY
+        while slots < 4 * count:
+            slots *= 2
+        self._slots = slots
+        self._movies = max(self.MIN_CAPACITY, 2 * len(self._rows.movies))
+        self._clients = max(self.MIN_CAPACITY, 2 * len(self._rows.clients))
+        self._capacity = max(self.MIN_CAPACITY, 4 * count)
+        table = [0] * slots
+        movie_tails = [0] * self._movies
+        client_tails = [0] * self._clients
+        nodes = []
+        self._used = 0
+        for row, record in enumerate(self._rows.records()):
+            if not record[5]:
+                continue
+            self._used += 1
+            slot = key_hash(record[:4]) & (slots - 1)
+            while table[slot]:
+                slot = (slot + 1) & (slots - 1)
+            table[slot] = row + 1
+            for tails, code in ((movie_tails, record[0]), (client_tails, record[1])):
+                nodes.append(row)
+                nodes.append(tails[code])
+                tails[code] = len(nodes) // 2
+        self._nodes = len(nodes) // 2
+        self._clean = 0
+        self._close()
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._file_name)))
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, 0, count, self._slots, self._used, self._movies,
+                                     self._clients, self._nodes, self._capacity))
+            for values in (table, movie_tails, client_tails, nodes):
+                f.write(struct.pack('<{}I'.format(len(values)), *values))
+            f.truncate(self.HEADER.size + (slots + self._movies + self._clients + 2 * self._capacity) * self.INT.size)
+        os.replace(temporary, self._file_name)
+        self._open()
+        self._read_header()
+
+    def _slot(self, key):
+        """
+        Returns: the slot holding the row of the key, or the empty slot ending its probe, and the row, None if it is
+            not found - (int, int)
+        """
+        mask = self._slots - 1
+        slot = key_hash(key) & mask
+        while True:
+            value = self.INT.unpack_from(self._map, self.HEADER.size + slot * self.INT.size)[0]
+            if not value:
+                return slot, None
+            record = self._rows.unpack(value - 1)
+            if record[:4] == key:
+                return slot, value - 1
+            slot = (slot + 1) & mask
+
+    def row(self, key):
+        """
+        Finds the row of a rental
+        Args:
+            key: the movie code, client code, rented and due ordinals of the rental - tuple of int
+
+        Returns: the row - int, None if not found
+        """
+        row = self._slot(key)[1]
+        return row if row is not None and self._rows.unpack(row)[5] else None
+
+    def changing(self):
+        """
+        Marks the index as changing until the next flush, so it is rebuilt if it is opened before
+        Called before a record is written.
+        """
+        if self._clean:
+            self._clean = 0
+            self._write_header()
+            self._map.flush(0, min(mmap.PAGESIZE, len(self._map)))
+
+    def added(self, row, record, old=None):
+        """
+        Indexes a record written in a row
+        Args:
+            row: the row - int
+            record: the record written - tuple of int
+            old: the record the row held before, None if it held no rental - tuple of int
+        """
+        if (record[0] >= self._movies or record[1] >= self._clients or self._nodes + 2 > self._capacity
+                or 2 * (self._used + 1) > self._slots):
+            self.rebuild()
+            return
+        if old is None or old[:4] != record[:4]:
+            slot, found = self._slot(record[:4])
+            if found is None:
+                self._used += 1
+            self.INT.pack_into(self._map, self.HEADER.size + slot * self.INT.size, row + 1)
+        if old is None or old[0] != record[0]:
+            self._link(self._movies_at, record[0], row)
+        if old is None or old[1] != record[1]:
+            self._link(self._clients_at, record[1], row)
+        self._write_header()
+
+    def _link(self, tails, code, row):
+        offset = tails + code * self.INT.size
+        self.NODE.pack_into(self._map, self._nodes_at + self._nodes * self.NODE.size, row,
+                            self.INT.unpack_from(self._map, offset)[0])
+        self._nodes += 1
+        self.INT.pack_into(self._map, offset, self._nodes)
+
+    def _chain(self, tails, count, code):
+        """
+        Returns: the rows chained to a code, the last added first, possibly more than once - generator
+        """
+        if code is None or code >= count:
+            return
+        node = self.INT.unpack_from(self._map, tails + code * self.INT.size)[0]
+        while node:
+            row, node = self.NODE.unpack_from(self._map, self._nodes_at + (node - 1) * self.NODE.size)
+            yield row
+
+    def movie_rows(self, movie):
+        """
+        Returns: the rows that held a rental of the movie code, the last added first - generator
+        """
+        return self._chain(self._movies_at, self._movies, movie)
+
+    def client_rows(self, client):
+        """
+        Returns: the rows that held a rental of the client code, the last added first - generator
+        """
+        return self._chain(self._clients_at, self._clients, client)
+
+    def flush(self):
+        """
+        Writes the index to the disk and marks it as matching the records, which must be written before
+        """
+        self._map.flush()
+        if not self._clean:
+            self._clean = 1
+            self._write_header()
+            self._map.flush(0, min(mmap.PAGESIZE, len(self._map)))
+
+    def close(self):
+        if self._map is not None:
+            self.flush()
+            self._close()
+
+
+class TestRentalFileIndex(TestCase):
+    class Rows:
+        """
+        The records of a RentalFile, in a list
+        """
+        RECORD = struct.Struct('<6i')
+
+        def __init__(self, file_name):
+            self.file_name = file_name
+            self.movies = range(7)
+            self.clients = range(11)
+            self.list = [(i % 7, i % 11, 731000 + i // 77, 732000, 0, 1) for i in range(3000)]
+
+        def __len__(self):
+            return len(self.list)
+
+        def records(self):
+            return iter(self.list)
+
+        def unpack(self, row):
+            return self.list[row]
+
+    def setUp(self):
+        descriptor, file_name = tempfile.mkstemp()
+        os.close(descriptor)
+        os.remove(file_name)
+        self.rows = self.Rows(file_name)
+        self.index = RentalFileIndex(self.rows)
+
+    def tearDown(self):
+        self.index.close()
+        os.remove(self.index.file_name)
+
+    def test_key_hash(self):
+        self.assertEqual(key_hash((1, 2, 3, 4)), key_hash((1, 2, 3, 4)))
+        self.assertNotEqual(key_hash((1, 2, 3, 4)), key_hash((2, 1, 3, 4)))
+
+    def test_lookups(self):
+        self.assertEqual(self.index.row((3, 10, 731000, 732000)), 10)
+        self.assertIsNone(self.index.row((3, 10, 731000, 732001)))
+        self.assertEqual(len(set(self.index.movie_rows(3))), 429)
+        self.assertEqual(list(self.index.client_rows(9))[-2:], [20, 9])
+        self.assertEqual(list(self.index.client_rows(20)), [])
+        self.index.changing()
+        old = self.rows.list[10]
+        self.rows.list[10] = (5, 10, 731000, 732000, 0, 1)
+        self.index.added(10, self.rows.list[10], old)
+        self.rows.list.append(old)
+        self.index.added(3000, old)
+        self.assertEqual((self.index.row((3, 10, 731000, 732000)), self.index.row((5, 10, 731000, 732000))), (3000, 10))
+        self.assertEqual(list(self.index.movie_rows(5))[0], 10)
+        self.assertEqual(list(self.index.movie_rows(3))[0], 3000)
+
+    def test_reopen(self):
+        self.index.close()
+        self.index = RentalFileIndex(self.rows)
+        self.assertEqual(self.index.row((6, 9, 731000, 732000)), 20)
+        self.index.changing()
+        self.rows.list.append((6, 9, 731001, 732001, 0, 1))
+        self.index.added(3000, self.rows.list[-1])
+        # Closed without a flush, as after a crash, so the index is rebuilt
+        self.index._close()
+        self.index = RentalFileIndex(self.rows)
+        self.assertEqual(self.index.row((6, 9, 731001, 732001)), 3000)
+        self.index.close()
+        # Appended while the index was closed, found by the count of the records
+        self.rows.list.append((6, 9, 731002, 732001, 0, 1))
+        self.index = RentalFileIndex(self.rows)
+        self.assertEqual(self.index.row((6, 9, 731002, 732001)), 3001)
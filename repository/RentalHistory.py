@@ -4,9 +4,15 @@ The RentalHistory class is a repository for movie rentals
 from unittest import TestCase
 
 from domain.Rental import Rental
-from datetime import date
+from domain.RentalKey import RentalKey
+from datetime import date, timedelta
 
+from repository.GroupIndex import GroupIndex
+from repository.IntervalIndex import IntervalIndex
 from repository.Iterable import Iterable
+from repository.RentalColumns import RentalColumns
+from repository.Repository import Repository
+from repository.SortedIndex import SortedIndex
 
 
 class RentalHistoryError(Exception):
@@ -14,9 +20,12 @@ class RentalHistoryError(Exception):
         self._message = message
 
 
-class RentalHistory:
+class RentalHistory(Repository):
     """
     The RentalHistory class is a repository for movie rentals
+    Indexed by rented, due and returned date for listing and time windows, grouped by movie, by client and of the
+    rentals not returned yet, and by the intervals every movie is rented in. A rental not returned yet keeps its movie
+    until it is returned, whatever its due date.
     Attributes:
         list: list of movie rentals - list of Rental
 
@@ -24,42 +33,205 @@ class RentalHistory:
          add_rental: adds a new Rental to the list
 
     """
-    def __init__(self, list=None):
-        if list is None:
-            list = Iterable()
-        self._list = list
+    error = RentalHistoryError
+    duplicate_message = "Rental already found"
+    missing_message = "Rental not in the list"
+    indexes = {
+        'rented_date': lambda: SortedIndex(lambda rental: rental.rented_date),
+        'due_date': lambda: SortedIndex(lambda rental: rental.due_date),
+        'returned_date': lambda: SortedIndex(lambda rental: rental.returned_date),
+        'movie_id': lambda: GroupIndex(lambda rental: rental.movie_id),
+        'client_id': lambda: GroupIndex(lambda rental: rental.client_id),
+        'open': lambda: GroupIndex(lambda rental: True if rental.returned_date is None else None),
+        'movie_intervals': lambda: IntervalIndex(
+            lambda rental: rental.movie_id,
+            lambda rental: (rental.rented_date, date.max if rental.returned_date is None else rental.returned_date)),
+    }
+    cursor_index = 'due_date'
 
-    @property
-    def list(self):
-        return self._list
+    def rentals_ordered_by_due_date(self, low=None, high=None, reverse=False):
+        """
+        Lists the rentals ordered by due date, optionally only those due between low and high
+        Args:
+            low: earliest due date, None for no lower bound - date
+            high: latest due date, None for no upper bound - date
+            reverse: descending order - bool
+
+        Returns: the rentals - generator
+        """
+        return self.list.between('due_date', low, high, reverse)
+
+    def rentals_between(self, field, start=None, end=None, reverse=False):
+        """
+        Lists the rentals whose date is in a window, going through the rentals of the window only
+        Rentals not returned yet have no returned date, so they are never listed by it.
+        Args:
+            field: 'rented_date', 'due_date' or 'returned_date' - string
+            start: first day of the window, None for no lower bound - date
+            end: last day of the window, None for no upper bound - date
+            reverse: descending order - bool
+
+        Returns: the rentals, ordered by the date - generator
+        Raises RentalHistoryError if the field is not a date of the rentals
+        """
+        if field not in ('rented_date', 'due_date', 'returned_date'):
+            raise RentalHistoryError("Unknown rental date")
+        return self.list.between(field, start, end, reverse)
+
+    def rentals_of_movie(self, movie_id):
+        """
+        Finds the rentals of a movie, without going through the other rentals
+        Args:
+            movie_id: id of the movie - string
+
+        Returns: list of Rental, in the order they were added
+        """
+        return list(self.list.items(self.list.index('movie_id').ids(movie_id)))
+
+    def rentals_of_client(self, client_id):
+        """
+        Finds the rentals of a client, without going through the other rentals
+        Args:
+            client_id: id of the client - string
+
+        Returns: list of Rental, in the order they were added
+        """
+        return list(self.list.items(self.list.index('client_id').ids(client_id)))
+
+    def open_rentals(self):
+        """
+        Finds the rentals that have not been returned yet
+        Returns: list of Rental
+        """
+        return list(self.list.items(self.list.index('open').ids(True)))
+
+    def update_rentals_movie_id(self, movie_id, new_movie_id):
+        """
+        Moves the rentals of a movie to its new id, changing their ids too, with one save
+        Only the rentals of the movie are gone through.
+        Args:
+            movie_id: current id of the movie - string
+            new_movie_id: replacement id - string
+
+        Returns: maps the old id of every moved rental to the moved rental - dict
+        Raises RentalHistoryError if a moved rental would have the id of a rental already found
+        """
+        moved = {rental.id: Rental(new_movie_id, rental.client_id, rental.rented_date, rental.due_date,
+                                   rental.returned_date) for rental in self.rentals_of_movie(movie_id)}
+        self.rekey_many(moved)
+        return moved
+
+    def update_rentals_client_id(self, client_id, new_client_id):
+        """
+        Moves the rentals of a client to its new id, changing their ids too, with one save
+        Only the rentals of the client are gone through.
+        Args:
+            client_id: current id of the client - string
+            new_client_id: replacement id - string
+
+        Returns: maps the old id of every moved rental to the moved rental - dict
+        Raises RentalHistoryError if a moved rental would have the id of a rental already found
+        """
+        moved = {rental.id: Rental(rental.movie_id, new_client_id, rental.rented_date, rental.due_date,
+                                   rental.returned_date) for rental in self.rentals_of_client(client_id)}
+        self.rekey_many(moved)
+        return moved
+
+    def movie_rented_until(self, movie_id):
+        """
+        Finds the last day the movie is rented, from the interval index
+        Args:
+            movie_id: id of the movie - string
+
+        Returns: the latest returned date, date.max if the movie is not returned yet, None if never rented - date
+        """
+        return self.list.index('movie_intervals').reach(movie_id)
+
+    def is_movie_free(self, movie_id, start, end=None):
+        """
+        Checks whether no rental of the movie overlaps a day or a range of days, in O(log n)
+        Args:
+            movie_id: id of the movie - string
+            start: the day, or the first day of the range - date
+            end: the last day of the range, None to check only the start - date
+
+        Returns: True if free, False if not
+        """
+        return self.list.index('movie_intervals').is_free(movie_id, start, end)
+
+    def next_free_window(self, movie_id, after, days):
+        """
+        Finds the first window of days, starting at or after a day, in which the movie is not rented
+        Args:
+            movie_id: id of the movie - string
+            after: earliest first day of the window - date
+            days: length of the window - int
+
+        Returns: the first day of the window - date, None if there is none
+        """
+        return self.list.index('movie_intervals').next_free(movie_id, after, days)
 
-    @list.setter
-    def list(self, list):
-        self._list = list[:]
+    def rented_days_by_movie(self):
+        """
+        Totals the days every movie was rented for, over the rentals already returned
+        Returns: the number of days by movie id, for the movies rented - dict
+        """
+        return self._rented_days(lambda rental: rental.movie_id)
+
+    def rented_days_by_client(self):
+        """
+        Totals the days every client rented movies for, over the rentals already returned
+        Returns: the number of days by client id, for the clients that rented - dict
+        """
+        return self._rented_days(lambda rental: rental.client_id)
+
+    def _rented_days(self, group):
+        days = {}
+        for rental in self.list:
+            if rental.returned_date is not None:
+                key = group(rental)
+                days[key] = days.get(key, 0) + (rental.returned_date - rental.rented_date).days
+        return days
+
+    def late_days_by_movie(self, today):
+        """
+        Totals the days of delay of every movie, as of a day
+        A rental not returned yet, or returned after the day, is late until the day.
+        Args:
+            today: the day the delays are counted until - date
+
+        Returns: the number of days by movie id, for the movies returned late - dict
+        """
+        days = {}
+        # Only the rentals due before today can be late, found with a range scan of the due dates
+        for rental in self.rentals_between('due_date', end=today - timedelta(days=1)):
+            returned_date = rental.returned_date
+            if returned_date is None or returned_date > today:
+                returned_date = today
+            if returned_date > rental.due_date:
+                days[rental.movie_id] = days.get(rental.movie_id, 0) + (returned_date - rental.due_date).days
+        return days
 
     def find_rental_by_id(self, id):
         """
         Finds a rental by id in the list
         Args:
-            id: the id to search by - string
+            id: the id to search by - RentalKey
 
         Returns: the rental found - Rental or False if not found
 
         """
-        for rental in self.list:
-            if rental.id == id:
-                return rental
-        return False
+        return self.find(id)
 
     def update_rental_returned_date(self, rental_id, returned_date):
         """
         Updates the returned date fot the rental with the given id
-        :param rental_id: id of the rental - string
+        :param rental_id: id of the rental - RentalKey
         :param returned_date: the updated date - date
         :return:
+        Raises RentalHistoryError if the rental is not found
         """
-        rental = self.find_rental_by_id(rental_id)
-        rental.returned_date = returned_date
+        self.update(rental_id, returned_date=returned_date)
 
     def add_rental(self, rental):
         """
@@ -71,25 +243,18 @@ class RentalHistory:
         Raises RentalHistoryError if rental already found
 
         """
-        if not self.find_rental_by_id(rental.id):
-            self.list.append(rental)
-        else:
-            raise RentalHistoryError("Rental already found")
+        self.add(rental)
 
     def remove_rental(self, id):
         """
         Removes a rental from the list
         Args:
-            id: id of the rental to be removed - string
+            id: id of the rental to be removed - RentalKey
 
         Returns:
-
+        Raises RentalHistoryError if the rental is not found
         """
-        rental = self.find_rental_by_id(id)
-        if isinstance(rental, Rental):
-            self.list.remove(rental)
-        else:
-            raise RentalHistoryError("Rental not in the list")
+        self.remove(id)
 
 
 class TestRentalHistory(TestCase):
@@ -104,7 +269,7 @@ class TestRentalHistory(TestCase):
     def test_update_rental_returned_date(self):
         rh = RentalHistory()
         rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         rh.update_rental_returned_date(id, date(2002, 5, 3))
         rental = rh.find_rental_by_id(id)
         self.assertEqual(rental.returned_date, date(2002, 5, 3))
@@ -120,7 +285,7 @@ class TestRentalHistory(TestCase):
         rh = RentalHistory()
         rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
         rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29)))
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         rh.remove_rental(id)
         rental = rh.find_rental_by_id(id)
         self.assertFalse(rental)
@@ -130,10 +295,142 @@ class TestRentalHistory(TestCase):
         rh = RentalHistory()
         rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
         rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29)))
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         rental = rh.find_rental_by_id(id)
         self.assertEqual(rental.rented_date, date(2002, 2, 23))
 
+    def test_rental_key(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('1', '23', date(2002, 2, 17), date(2002, 4, 17)))
+        rh.add_rental(Rental('12', '3', date(2002, 2, 17), date(2002, 4, 17)))
+        self.assertEqual(len(rh.list), 2)
+        id = RentalKey('12', '3', date(2002, 2, 17), date(2002, 4, 17))
+        self.assertEqual(rh.find_rental_by_id(id).client_id, '3')
+        self.assertEqual(str(id), '1232002-02-172002-04-17')
+
+    def test_rentals_of_movie_and_client(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17)))
+        rh.add_rental(Rental('245', '423', date(2002, 5, 17), date(2002, 6, 17)))
+        self.assertEqual([rental.client_id for rental in rh.rentals_of_movie('245')], ['4243', '423'])
+        self.assertEqual([rental.movie_id for rental in rh.rentals_of_client('423')], ['2', '245'])
+        self.assertEqual(rh.rentals_of_client('1'), [])
+        self.assertEqual([rental.movie_id for rental in rh.open_rentals()], ['2', '245'])
+        rh.update_rental_returned_date(RentalKey('2', '423', date(2002, 2, 17), date(2002, 4, 17)), date(2002, 3, 1))
+        self.assertEqual([rental.movie_id for rental in rh.open_rentals()], ['245'])
+        rh.remove_rental(RentalKey('245', '423', date(2002, 5, 17), date(2002, 6, 17)))
+        self.assertEqual(rh.open_rentals(), [])
+        self.assertEqual([rental.movie_id for rental in rh.rentals_of_client('423')], ['2'])
+
+    def test_rentals_between(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)))
+        rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        rh.add_rental(Rental('3', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1)))
+        rh.add_rental(Rental('4', '2', date(2002, 4, 1), date(2002, 4, 8)))
+        march = [rental.movie_id for rental in rh.rentals_between('rented_date', date(2002, 3, 1), date(2002, 3, 31))]
+        self.assertEqual(march, ['3', '1'])
+        self.assertEqual([rental.movie_id for rental in rh.rentals_between('due_date', end=date(2002, 3, 8))],
+                         ['2', '3'])
+        self.assertEqual([rental.movie_id for rental in rh.rentals_between('returned_date', reverse=True)], ['3', '1'])
+        rh.update_rental_returned_date(RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3)), date(2002, 3, 4))
+        self.assertEqual([rental.movie_id for rental in rh.rentals_between('returned_date', date(2002, 3, 1))],
+                         ['2', '1', '3'])
+        with self.assertRaises(RentalHistoryError):
+            rh.rentals_between('movie_id')
+
+    def test_rented_days(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)))
+        rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        rh.add_rental(Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1)))
+        self.assertEqual(rh.rented_days_by_movie(), {'1': 36})
+        self.assertEqual(rh.rented_days_by_client(), {'1': 5, '2': 31})
+        self.assertEqual(rh.late_days_by_movie(date(2002, 3, 10)), {'1': 2, '2': 7})
+        self.assertEqual(rh.late_days_by_movie(date(2002, 3, 3)), {})
+
+    def test_update_rentals_ids(self):
+        rh = RentalHistory(Iterable(rows=RentalColumns()))
+        rh.add_rental(Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)))
+        rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        rh.add_rental(Rental('1', '2', date(2002, 4, 1), date(2002, 4, 8)))
+        rh.update_rentals_client_id('1', '7')
+        self.assertEqual([str(rental.id) for rental in rh.list],
+                         ['172002-03-052002-03-20', '272002-02-252002-03-03', '122002-04-012002-04-08'])
+        self.assertEqual(rh.rentals_of_client('1'), [])
+        self.assertEqual(rh.find_rental_by_id(RentalKey('1', '7', date(2002, 3, 5), date(2002, 3, 20))).returned_date,
+                         date(2002, 3, 10))
+        rh.update_rentals_movie_id('1', '5')
+        self.assertEqual(sorted(rental.client_id for rental in rh.rentals_of_movie('5')), ['2', '7'])
+        self.assertTrue(rh.is_movie_free('1', date(2002, 4, 2)))
+        self.assertFalse(rh.is_movie_free('5', date(2002, 4, 2)))
+        rh.add_rental(Rental('6', '2', date(2002, 4, 1), date(2002, 4, 8)))
+        with self.assertRaises(RentalHistoryError):
+            rh.update_rentals_movie_id('5', '6')
+        self.assertEqual(len(rh.rentals_of_movie('5')), 2)
+
+    def test_movie_intervals(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        rh.add_rental(Rental('245', '423', date(2002, 5, 1), date(2002, 5, 17)))
+        self.assertEqual(rh.movie_rented_until('245'), date.max)
+        self.assertIsNone(rh.movie_rented_until('2'))
+        self.assertTrue(rh.is_movie_free('245', date(2002, 3, 24), date(2002, 4, 30)))
+        self.assertFalse(rh.is_movie_free('245', date(2002, 3, 24), date(2002, 5, 1)))
+        self.assertEqual(rh.next_free_window('245', date(2002, 3, 1), 7), date(2002, 3, 24))
+        self.assertIsNone(rh.next_free_window('245', date(2002, 4, 1), 31))
+        rh.update_rental_returned_date(RentalKey('245', '423', date(2002, 5, 1), date(2002, 5, 17)), date(2002, 5, 9))
+        self.assertEqual(rh.movie_rented_until('245'), date(2002, 5, 9))
+        self.assertEqual(rh.next_free_window('245', date(2002, 4, 1), 31), date(2002, 5, 10))
+
+    def test_rentals_ordered_by_due_date(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29)))
+        rh.add_rental(Rental('3', '423', date(2002, 2, 17), date(2002, 5, 17)))
+        result = rh.rentals_ordered_by_due_date()
+        self.assertEqual([rental.movie_id for rental in result], ['2', '245', '3'])
+        result = rh.rentals_ordered_by_due_date(date(2002, 4, 20), reverse=True)
+        self.assertEqual([rental.movie_id for rental in result], ['3', '245'])
+        result = rh.rentals_ordered_by_due_date(high=date(2002, 4, 23))
+        self.assertEqual([rental.movie_id for rental in result], ['2', '245'])
+
+    def test_cursor(self):
+        rh = RentalHistory()
+        rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
+        rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29)))
+        rh.add_rental(Rental('3', '423', date(2002, 2, 17), date(2002, 4, 17)))
+        pages = [[rental.movie_id for rental in page] for page in rh.cursor(2)]
+        self.assertEqual(pages, [['2', '3'], ['245']])
+
+    def test_add_remove_many(self):
+        rh = RentalHistory()
+        first = Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23))
+        second = Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29))
+        rh.add_many([first, second])
+        self.assertEqual(len(rh.list), 2)
+        with self.assertRaises(RentalHistoryError):
+            rh.add_many([first])
+        with self.assertRaises(RentalHistoryError):
+            rh.remove_many([first.id, 'x'])
+        rh.remove_many([first.id, second.id])
+        self.assertEqual(len(rh.list), 0)
+
+    def test_columnar_storage(self):
+        rh = RentalHistory(Iterable(rows=RentalColumns()))
+        rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23)))
+        rh.add_rental(Rental('2', '423', date(2002, 2, 17), date(2002, 4, 17), date(2002, 3, 29)))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
+        rh.update_rental_returned_date(id, date(2002, 5, 3))
+        self.assertEqual(rh.find_rental_by_id(id).returned_date, date(2002, 5, 3))
+        self.assertEqual([rental.movie_id for rental in rh.rentals_ordered_by_due_date()], ['2', '245'])
+        rh.remove_rental(id)
+        self.assertFalse(rh.find_rental_by_id(id))
+        self.assertEqual(len(rh.list), 1)
+        with self.assertRaises(RentalHistoryError):
+            rh.update_rental_returned_date(id, date(2002, 5, 3))
+
 
 # test_find_rental_by_id()
 # test_remove_rental()
@@ -1,11 +1,12 @@
 """
 The RentalHistory class is a repository for movie rentals
 """
-import pickle
 from datetime import date
 from unittest import TestCase
 
 from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.Persistence import BinaryFormatError, StructFile
 from repository.RentalHistory import RentalHistory, RentalHistoryError
 
 
@@ -21,36 +22,33 @@ class RentalHistoryBinary(RentalHistory):
     """
 
     def __init__(self, file):
-        super().__init__()
-        self._file_name = file
-
-    @property
-    def list(self):
-        return self._list
-
-    @list.setter
-    def list(self, list):
-        self._list = list[:]
+        super().__init__(persistence=StructFile(file, 'ssddd', self.obj_to_fields, Rental, self.string_to_obj,
+                                                self.obj_to_string))
 
     @property
     def file_name(self):
-        return self._file_name
+        return self.persistence.file_name
 
     @file_name.setter
     def file_name(self, file_name):
-        self._file_name = file_name
+        self.persistence.file_name = file_name
 
     @staticmethod
     def string_to_date(string):
         """
         Converts a string denoting a date into a Date
         Args:
-            string: string to be converted into a Date - string
+            string: string to be converted into a Date, 'YYYY-MM-DD', 'datetime.date(YYYY, MM, DD)' or 'None' - string
 
-        Returns: Date that has been converted - Date
+        Returns: Date that has been converted - Date, None for 'None'
 
         """
-        params = string.strip().split('(')
+        string = string.strip()
+        if string == 'None':
+            return None
+        if '(' not in string:
+            return date.fromisoformat(string)
+        params = string.split('(')
         formatted = params[1][:-1]
         digits = formatted.strip().split(',')
         d = date(int(digits[0]), int(digits[1]), int(digits[2]))
@@ -88,10 +86,22 @@ class RentalHistoryBinary(RentalHistory):
         Returns: string denoting the Rental - string
 
         """
-        string = rental.id + ';' + rental.movie_id + ';' + rental.client_id + ';' \
+        string = str(rental.id) + ';' + rental.movie_id + ';' + rental.client_id + ';' \
                  + str(rental.rented_date) + ';' + str(rental.due_date) + ';' + str(rental.returned_date) + '\n'
         return string
 
+    @staticmethod
+    def obj_to_fields(rental):
+        """
+        Gives the values of the fields stored in a record of the binary file for a Rental
+        Args:
+            rental: Rental to be stored - Rental
+
+        Returns: the values of the fields, in the order of the constructor of Rental - tuple
+
+        """
+        return rental.movie_id, rental.client_id, rental.rented_date, rental.due_date, rental.returned_date
+
     def load_file(self):
         """
         Loads into the repo the data found in the auxiliary file
@@ -99,15 +109,11 @@ class RentalHistoryBinary(RentalHistory):
 
         """
         try:
-            f = open(self._file_name, "rb")
-            string_list = pickle.load(f)
-            for str in string_list:
-                super(RentalHistoryBinary, self).add_rental(self.string_to_obj(str))
-            f.close()
+            self.load()
         except EOFError:
             raise RentalHistoryError("Empty binary file")
-        except IOError as e:
-            raise e
+        except BinaryFormatError:
+            raise RentalHistoryError("Unsupported binary file")
 
     def save_file(self):
         """
@@ -115,59 +121,7 @@ class RentalHistoryBinary(RentalHistory):
         Returns:
 
         """
-        f = open(self._file_name, "wb")
-        string_list = []
-        for rental in self.list:
-            rental_str = self.obj_to_string(rental)
-            string_list.append(rental_str)
-        pickle.dump(string_list, f)
-        f.close()
-
-    def find_rental_by_id(self, id):
-        """
-        Finds a rental by id in the list
-        Args:
-            id: the id to search by - string
-
-        Returns: the rental found - Rental or False if not found
-
-        """
-        return super(RentalHistoryBinary, self).find_rental_by_id(id)
-
-    def update_rental_returned_date(self, rental_id, returned_date):
-        """
-        Updates the returned date fot the rental with the given id
-        :param rental_id: id of the rental - string
-        :param returned_date: the updated date - date
-        :return:
-        """
-        super(RentalHistoryBinary, self).update_rental_returned_date(rental_id, returned_date)
-        self.save_file()
-
-    def add_rental(self, rental):
-        """
-        Adds a rental to the list
-        Args:
-            rental: Rental
-
-        Returns:
-        Raises RentalHistoryError if rental already found
-
-        """
-        super(RentalHistoryBinary, self).add_rental(rental)
-        self.save_file()
-
-    def remove_rental(self, id):
-        """
-        Removes a rental from the list
-        Args:
-            id: id of the rental to be removed - string
-
-        Returns:
-
-        """
-        super(RentalHistoryBinary, self).remove_rental(id)
-        self.save_file()
+        self.save()
 
 
 class TestRentalHistory(TestCase):
@@ -182,7 +136,7 @@ class TestRentalHistory(TestCase):
             self.rh.add_rental(Rental('245', '4243', date(2002, 2, 23), date(2002, 4, 23), date(2002, 3, 23)))
 
     def test_update_rental_returned_date(self):
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         self.rh.update_rental_returned_date(id, date(2002, 5, 3))
         rental = self.rh.find_rental_by_id(id)
         self.assertEqual(rental.returned_date, date(2002, 5, 3))
@@ -195,13 +149,13 @@ class TestRentalHistory(TestCase):
         rental_str = str(rental)
 
     def test_remove_rental(self):
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         self.rh.remove_rental(id)
         rental = self.rh.find_rental_by_id(id)
         self.assertFalse(rental)
         self.assertEqual(len(self.rh.list), 1)
 
     def test_find_rental_by_id(self):
-        id = '245' + '4243' + str(date(2002, 2, 23)) + str(date(2002, 4, 23))
+        id = RentalKey('245', '4243', date(2002, 2, 23), date(2002, 4, 23))
         rental = self.rh.find_rental_by_id(id)
         self.assertEqual(rental.rented_date, date(2002, 2, 23))
@@ -0,0 +1,105 @@
+"""
+The RentalHistoryColumnar class is a repository for movie rentals kept in typed arrays
+"""
+import os
+import tempfile
+from datetime import date
+from unittest import TestCase
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.RentalHistory import RentalHistoryError
+from repository.RentalHistoryBinary import RentalHistoryBinary
+from repository.RentalTable import RentalTable
+
+
+class RentalHistoryColumnar(RentalHistoryBinary):
+    """
+    The RentalHistory class is a repository for movie rentals, kept in a RentalTable
+    The rentals are columns of ints and the lookups of RentalHistory arrays of rows, instead of Rental objects and
+    indexes of their ids, so a rental takes tens of bytes instead of more than a kilobyte. The rentals are saved to
+    the binary file like RentalHistoryBinary, or kept in memory only if there is no file.
+    Attributes:
+        list: the rentals - RentalTable
+    """
+
+    def __init__(self, file=None):
+        super().__init__(file)
+        if file is None:
+            self.persistence = None
+        self._list = RentalTable()
+
+    @property
+    def list(self):
+        return self._list
+
+    @list.setter
+    def list(self, list):
+        self._list = RentalTable(list)
+        self._version += 1
+
+    def _create_indexes(self):
+        """
+        The lookups are kept by the RentalTable
+        """
+
+    def rentals_of_movie(self, movie_id):
+        return self.list.rentals_of_movie(movie_id)
+
+    def rentals_of_client(self, client_id):
+        return self.list.rentals_of_client(client_id)
+
+    def open_rentals(self):
+        return self.list.open_rentals()
+
+    def movie_rented_until(self, movie_id):
+        return self.list.movie_rented_until(movie_id)
+
+    def is_movie_free(self, movie_id, start, end=None):
+        return self.list.is_movie_free(movie_id, start, end)
+
+    def next_free_window(self, movie_id, after, days):
+        intervals = self.indexes['movie_intervals']()
+        intervals.add_many(self.rentals_of_movie(movie_id))
+        return intervals.next_free(movie_id, after, days)
+
+
+class TestRentalHistoryColumnar(TestCase):
+    def setUp(self):
+        self.rh = RentalHistoryColumnar()
+        self.rh.add_rental(Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)))
+        self.rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.rh.add_rental(Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1)))
+
+    def test_rentals(self):
+        id = RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3))
+        with self.assertRaises(RentalHistoryError):
+            self.rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.assertEqual([rental.client_id for rental in self.rh.rentals_of_movie('1')], ['1', '2'])
+        self.rh.update_rental_returned_date(id, date(2002, 3, 4))
+        self.assertEqual(self.rh.open_rentals(), [])
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_between('returned_date', date(2002, 3, 1))],
+                         ['2', '1', '1'])
+        self.assertEqual([len(page) for page in self.rh.cursor(2)], [2, 1])
+        self.rh.update_rentals_client_id('1', '7')
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_of_client('7')], ['1', '2'])
+        self.rh.remove_rental(RentalKey('2', '7', date(2002, 2, 25), date(2002, 3, 3)))
+        self.assertEqual(len(self.rh.list), 2)
+        self.assertEqual(self.rh.rented_days_by_movie(), {'1': 36})
+
+    def test_movie_intervals(self):
+        self.assertEqual(self.rh.movie_rented_until('2'), date.max)
+        self.assertFalse(self.rh.is_movie_free('1', date(2002, 3, 20)))
+        self.assertEqual(self.rh.next_free_window('1', date(2002, 2, 25), 7), date(2002, 4, 2))
+
+    def test_file(self):
+        descriptor, file_name = tempfile.mkstemp()
+        os.close(descriptor)
+        RentalHistoryColumnar(file_name).add_many(self.rh.list)
+        rh = RentalHistoryColumnar(file_name)
+        rh.load_file()
+        os.remove(file_name)
+        self.assertEqual([rental.client_id for rental in rh.rentals_of_movie('1')], ['1', '2'])
+        rh.list = [Rental('3', '3', date(2002, 1, 1), date(2002, 1, 8))]
+        self.assertEqual([rental.movie_id for rental in rh.list], ['3'])
+        self.assertTrue(rh.is_movie_free('1', date(2002, 3, 20)))
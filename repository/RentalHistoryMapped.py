@@ -0,0 +1,312 @@
+"""
+The RentalHistoryMapped class is a repository for movie rentals kept in a memory-mapped file
+"""
+import os
+import tempfile
+from datetime import date
+from time import monotonic
+from unittest import TestCase
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.Iterable import Iterable
+from repository.Persistence import paused_collector
+from repository.RentalFile import RentalFile
+from repository.RentalHistory import RentalHistory, RentalHistoryError
+from repository.Repository import locked
+
+
+class RentalHistoryMapped(RentalHistory):
+    """
+    The RentalHistory class is a repository for movie rentals, kept in a RentalFile
+    Opening the repository maps the file without reading the rentals, so it takes the same time whatever the size of
+    the history. Finding, adding, removing and returning a rental go to its record directly; a return writes the
+    returned date in place. The rentals of a movie or a client, the open rentals and whether a movie is free, which
+    renting, returning and removing clients and movies need, are read from the records by the RentalFile, as are the
+    changes of the ids of clients and movies. The indexes of RentalHistory, needed by the other queries, are built
+    from the file the first time the list is used, and kept up to date from then on.
+    A removed rental leaves an empty record in the file, whether the list is indexed or not; compact() drops them.
+    Changes are written to the map at once, the flush policy decides when the map is written to the disk.
+    Attributes:
+        list: the rentals, indexed on first use - Iterable over a RentalFile
+        rows: the file - RentalFile
+    """
+
+    def __init__(self, file):
+        self._rows = RentalFile(file)
+        super().__init__()
+        self._list = None
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def list(self):
+        if self._list is None:
+            with paused_collector(), self._rows.reading():
+                self._list = Iterable(rows=self._rows)
+                super()._create_indexes()
+        return self._list
+
+    @list.setter
+    def list(self, list):
+        raise RentalHistoryError("The rentals of a mapped history can't be replaced")
+
+    @property
+    def file_name(self):
+        return self._rows.file_name
+
+    @property
+    def indexed(self):
+        """
+        Whether the list and its indexes are built
+        """
+        return self._list is not None
+
+    def _create_indexes(self):
+        """
+        The indexes are created with the list, the first time it is used
+        """
+        if self._list is not None:
+            super()._create_indexes()
+
+    @locked
+    def _changed(self, added=(), updated=(), removed=()):
+        """
+        Counts the change until the flush policy writes the map to the disk
+        """
+        self._version += 1
+        self._changes += 1
+        if not self._batches:
+            self._flush_if_due()
+
+    @locked
+    def flush(self):
+        """
+        Writes the changed pages of the map to the disk
+        """
+        self._rows.flush()
+        self._changes = 0
+        self._flushed_at = monotonic()
+
+    def load(self):
+        """
+        The rentals are read from the file when needed, there is nothing to load
+        """
+        self._version += 1
+
+    def save(self):
+        self.flush()
+
+    def load_file(self):
+        self.load()
+
+    def save_file(self):
+        self.save()
+
+    @locked
+    def compact(self):
+        """
+        Drops the records of the removed rentals, replacing the file by a new one, in O(n)
+        The rows of the rentals change, so the indexes are built again the next time the list is used.
+        """
+        self._rows.compact()
+        self._list = None
+        self._version += 1
+
+    @locked
+    def close(self):
+        """
+        Writes the map to the disk and closes the file
+        """
+        self.flush()
+        self._rows.close()
+
+    def find(self, id):
+        row = self._rows.row(id)
+        return False if row is None else self._rows[row]
+
+    @locked
+    def add(self, rental):
+        if self.indexed:
+            return super().add(rental)
+        if self._rows.row(rental.id) is not None:
+            raise RentalHistoryError(self.duplicate_message)
+        self._rows.append(rental)
+        self._changed(added=[rental])
+
+    @locked
+    def add_many(self, rentals):
+        if self.indexed:
+            return super().add_many(rentals)
+        rentals = list(rentals)
+        ids = set()
+        for rental in rentals:
+            if rental.id in ids or self._rows.row(rental.id) is not None:
+                raise RentalHistoryError(self.duplicate_message)
+            ids.add(rental.id)
+        for rental in rentals:
+            self._rows.append(rental)
+        self._changed(added=rentals)
+
+    @locked
+    def remove(self, id):
+        if self.indexed:
+            return super().remove(id)
+        row = self._rows.row(id)
+        if row is None:
+            raise RentalHistoryError(self.missing_message)
+        rental = self._rows[row]
+        self._rows[row] = None
+        self._changed(removed=[rental])
+
+    @locked
+    def remove_many(self, ids):
+        if self.indexed:
+            return super().remove_many(ids)
+        rows = [self._rows.row(id) for id in ids]
+        if None in rows:
+            raise RentalHistoryError(self.missing_message)
+        rentals = [self._rows[row] for row in rows]
+        for row in rows:
+            self._rows[row] = None
+        self._changed(removed=rentals)
+
+    @locked
+    def rekey_many(self, items):
+        if self.indexed:
+            return super().rekey_many(items)
+        if not items:
+            return
+        rows = {}
+        for id, rental in items.items():
+            rows[id] = self._rows.row(id)
+            if rows[id] is None:
+                raise RentalHistoryError(self.missing_message)
+        new_ids = set()
+        for id, rental in items.items():
+            if rental.id in new_ids or rental.id != id and self._rows.row(rental.id) is not None:
+                raise RentalHistoryError(self.duplicate_message)
+            new_ids.add(rental.id)
+        removed = [self._rows[row] for row in rows.values()]
+        for id, rental in items.items():
+            self._rows[rows[id]] = rental
+        self._changed(added=list(items.values()), removed=removed)
+
+    @locked
+    def update(self, id, **fields):
+        if self.indexed:
+            return super().update(id, **fields)
+        row = self._rows.row(id)
+        if row is None:
+            raise RentalHistoryError(self.missing_message)
+        rental = self._rows[row]
+        for field, value in fields.items():
+            setattr(rental, field, value)
+        if set(fields) == {'returned_date'}:
+            self._rows.set_returned_date(row, rental.returned_date)
+        else:
+            self._rows[row] = rental
+        self._changed(updated=[rental])
+
+    def rentals_of_movie(self, movie_id):
+        if self.indexed:
+            return super().rentals_of_movie(movie_id)
+        return self._rows.rentals_of_movie(movie_id)
+
+    def rentals_of_client(self, client_id):
+        if self.indexed:
+            return super().rentals_of_client(client_id)
+        return self._rows.rentals_of_client(client_id)
+
+    def open_rentals(self):
+        if self.indexed:
+            return super().open_rentals()
+        return self._rows.open_rentals()
+
+    def movie_rented_until(self, movie_id):
+        if self.indexed:
+            return super().movie_rented_until(movie_id)
+        return self._rows.movie_rented_until(movie_id)
+
+    def is_movie_free(self, movie_id, start, end=None):
+        if self.indexed:
+            return super().is_movie_free(movie_id, start, end)
+        return self._rows.is_movie_free(movie_id, start, end)
+
+    def next_free_window(self, movie_id, after, days):
+        if self.indexed:
+            return super().next_free_window(movie_id, after, days)
+        intervals = self.indexes['movie_intervals']()
+        intervals.add_many(self.rentals_of_movie(movie_id))
+        return intervals.next_free(movie_id, after, days)
+
+
+class TestRentalHistoryMapped(TestCase):
+    def setUp(self):
+        descriptor, self.file_name = tempfile.mkstemp()
+        os.close(descriptor)
+        self.rh = RentalHistoryMapped(self.file_name)
+        self.rh.add_many([Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)),
+                          Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)),
+                          Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1))])
+
+    def tearDown(self):
+        self.rh.close()
+        for name in (self.file_name, self.file_name + '.ids', self.file_name + '.idx'):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def reopen(self):
+        self.rh.close()
+        self.rh = RentalHistoryMapped(self.file_name)
+
+    def test_unindexed(self):
+        id = RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3))
+        self.rh.update_rental_returned_date(id, date(2002, 3, 4))
+        with self.assertRaises(RentalHistoryError):
+            self.rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.rh.remove_rental(RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8)))
+        with self.assertRaises(RentalHistoryError):
+            self.rh.remove_rental(RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8)))
+        self.reopen()
+        self.assertEqual(self.rh.find_rental_by_id(id).returned_date, date(2002, 3, 4))
+        self.assertFalse(self.rh.indexed)
+        self.assertEqual([rental.client_id for rental in self.rh.rentals_of_movie('1')], ['1'])
+        self.assertEqual(self.rh.movie_rented_until('1'), date(2002, 3, 10))
+        self.assertFalse(self.rh.is_movie_free('2', date(2002, 3, 1)))
+        self.assertEqual(self.rh.next_free_window('1', date(2002, 3, 1), 7), date(2002, 3, 11))
+        self.assertEqual(self.rh.open_rentals(), [])
+        self.rh.update_rentals_client_id('1', '5')
+        self.rh.remove_many([RentalKey('2', '5', date(2002, 2, 25), date(2002, 3, 3))])
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_of_client('5')], ['1'])
+        self.assertFalse(self.rh.indexed)
+        self.reopen()
+        self.assertEqual(len(self.rh.list), 1)
+        self.assertEqual(self.rh.rented_days_by_client(), {'5': 5})
+
+    def test_indexed(self):
+        self.assertEqual(len(self.rh.list), 3)
+        self.assertEqual([rental.client_id for rental in self.rh.rentals_of_movie('1')], ['1', '2'])
+        self.assertTrue(self.rh.indexed)
+        self.rh.add_rental(Rental('3', '2', date(2002, 4, 1), date(2002, 4, 8)))
+        self.rh.update_rental_returned_date(RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3)), date(2002, 3, 4))
+        self.assertEqual([rental.movie_id for rental in self.rh.open_rentals()], ['3'])
+        self.rh.remove_many([RentalKey('1', '1', date(2002, 3, 5), date(2002, 3, 20)),
+                             RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8))])
+        self.assertTrue(self.rh.is_movie_free('1', date(2002, 3, 6)))
+        self.assertEqual(len(self.rh.rows), 4)
+        self.reopen()
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_between('rented_date')], ['2', '3'])
+
+    def test_compact(self):
+        self.assertEqual(len(self.rh.rentals_of_client('1')), 2)
+        self.rh.remove_rental(RentalKey('1', '1', date(2002, 3, 5), date(2002, 3, 20)))
+        self.rh.compact()
+        self.assertFalse(self.rh.indexed)
+        self.assertEqual(len(self.rh.rows), 2)
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_of_client('1')], ['2'])
+        self.reopen()
+        self.assertEqual(self.rh.find_rental_by_id(RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8))).client_id,
+                         '2')
@@ -0,0 +1,178 @@
+"""
+The RentalHistorySQLite class is a repository for movie rentals kept in an SQLite database
+"""
+from datetime import date
+from unittest import TestCase
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.RentalHistory import RentalHistory, RentalHistoryError
+from repository.SQLiteRepository import SQLiteRepository
+
+
+def to_date(text):
+    """
+    Converts the ISO 8601 text a date is stored as back into the date, None staying None
+    """
+    return None if text is None else date.fromisoformat(text)
+
+
+class RentalHistorySQLite(SQLiteRepository, RentalHistory):
+    """
+    The RentalHistory class is a repository for movie rentals, kept in the rentals table of an SQLite database
+    Dates are stored as ISO 8601 text, which sorts like the dates. The table is indexed by movie and rented date,
+    by client, by every date and by the rentals not returned yet, so the lookups, the time windows, the availability
+    of a movie and the totals of the statistics are answered by SQL without going through the other rentals.
+    A rental not returned yet keeps its movie until it is returned, as if it was returned on date.max.
+    Attributes:
+        list: the rentals table - SQLiteTable
+    """
+    table = 'rentals'
+    columns = ('movie_id', 'client_id', 'rented_date', 'due_date', 'returned_date')
+    key_columns = ('movie_id', 'client_id', 'rented_date', 'due_date')
+    schema = [
+        'CREATE TABLE IF NOT EXISTS rentals (movie_id TEXT NOT NULL, client_id TEXT NOT NULL, '
+        'rented_date TEXT NOT NULL, due_date TEXT NOT NULL, returned_date TEXT, '
+        'PRIMARY KEY (movie_id, client_id, rented_date, due_date))',
+        'CREATE INDEX IF NOT EXISTS rentals_movie ON rentals (movie_id, rented_date)',
+        'CREATE INDEX IF NOT EXISTS rentals_client ON rentals (client_id)',
+        'CREATE INDEX IF NOT EXISTS rentals_rented_date ON rentals (rented_date)',
+        'CREATE INDEX IF NOT EXISTS rentals_due_date ON rentals (due_date)',
+        'CREATE INDEX IF NOT EXISTS rentals_returned_date ON rentals (returned_date)',
+        'CREATE INDEX IF NOT EXISTS rentals_open ON rentals (movie_id) WHERE returned_date IS NULL',
+    ]
+    orders = {
+        'rented_date': ('rented_date',),
+        'due_date': ('due_date',),
+        'returned_date': ('returned_date',),
+    }
+
+    def to_obj(self, row):
+        return Rental(row[0], row[1], to_date(row[2]), to_date(row[3]), to_date(row[4]))
+
+    def to_row(self, rental):
+        return (rental.movie_id, rental.client_id, rental.rented_date.isoformat(), rental.due_date.isoformat(),
+                None if rental.returned_date is None else rental.returned_date.isoformat())
+
+    def key(self, id):
+        return tuple(id)
+
+    def rentals_of_movie(self, movie_id):
+        return list(self.list.select('movie_id = ?', (movie_id,)))
+
+    def rentals_of_client(self, client_id):
+        return list(self.list.select('client_id = ?', (client_id,)))
+
+    def open_rentals(self):
+        return list(self.list.select('returned_date IS NULL'))
+
+    def update_rentals_movie_id(self, movie_id, new_movie_id):
+        return self._move_rentals('movie_id', movie_id, new_movie_id, lambda rental: Rental(
+            new_movie_id, rental.client_id, rental.rented_date, rental.due_date, rental.returned_date))
+
+    def update_rentals_client_id(self, client_id, new_client_id):
+        return self._move_rentals('client_id', client_id, new_client_id, lambda rental: Rental(
+            rental.movie_id, new_client_id, rental.rented_date, rental.due_date, rental.returned_date))
+
+    def _move_rentals(self, column, id, new_id, move):
+        """
+        Changes the movie or client id of the rentals having it with one UPDATE
+        Args:
+            move: gives the moved rental of a rental - function
+
+        Returns: maps the old id of every moved rental to the moved rental - dict
+        Raises RentalHistoryError if a moved rental would have the id of a rental already found
+        """
+        moved = {rental.id: move(rental) for rental in self.list.select(column + ' = ?', (id,))}
+        self.execute(lambda cursor: cursor.execute('UPDATE rentals SET ' + column + ' = ? WHERE ' + column + ' = ?',
+                                                   (new_id, id)))
+        if moved:
+            self._changed()
+        return moved
+
+    def movie_rented_until(self, movie_id):
+        until = self.connection.execute('SELECT max(coalesce(returned_date, ?)) FROM rentals WHERE movie_id = ?',
+                                        (date.max.isoformat(), movie_id)).fetchone()[0]
+        return to_date(until)
+
+    def is_movie_free(self, movie_id, start, end=None):
+        if end is None:
+            end = start
+        return not self.connection.execute(
+            'SELECT EXISTS (SELECT 1 FROM rentals WHERE movie_id = ? AND rented_date <= ? '
+            'AND coalesce(returned_date, ?) >= ?)',
+            (movie_id, end.isoformat(), date.max.isoformat(), start.isoformat())).fetchone()[0]
+
+    def next_free_window(self, movie_id, after, days):
+        intervals = self.indexes['movie_intervals']()
+        intervals.add_many(self.rentals_of_movie(movie_id))
+        return intervals.next_free(movie_id, after, days)
+
+    def rented_days_by_movie(self):
+        return self._rented_days('movie_id')
+
+    def rented_days_by_client(self):
+        return self._rented_days('client_id')
+
+    def _rented_days(self, column):
+        return dict(self.connection.execute(
+            'SELECT ' + column + ', CAST(sum(julianday(returned_date) - julianday(rented_date)) AS INTEGER) '
+            'FROM rentals WHERE returned_date IS NOT NULL GROUP BY ' + column))
+
+    def late_days_by_movie(self, today):
+        return dict(self.connection.execute(
+            'SELECT movie_id, CAST(sum(julianday(min(coalesce(returned_date, :today), :today)) - julianday(due_date)) '
+            'AS INTEGER) FROM rentals WHERE due_date < :today '
+            'AND min(coalesce(returned_date, :today), :today) > due_date GROUP BY movie_id',
+            {'today': today.isoformat()}))
+
+
+class TestRentalHistorySQLite(TestCase):
+    def setUp(self):
+        self.rh = RentalHistorySQLite(':memory:')
+        self.rh.add_rental(Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)))
+        self.rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.rh.add_rental(Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1)))
+
+    def test_rentals(self):
+        id = RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3))
+        self.assertIsNone(self.rh.find_rental_by_id(id).returned_date)
+        with self.assertRaises(RentalHistoryError):
+            self.rh.add_rental(Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.assertEqual([rental.client_id for rental in self.rh.rentals_of_movie('1')], ['1', '2'])
+        self.assertEqual([rental.movie_id for rental in self.rh.open_rentals()], ['2'])
+        self.rh.update_rental_returned_date(id, date(2002, 3, 4))
+        self.assertEqual(self.rh.open_rentals(), [])
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_between('returned_date', date(2002, 3, 1))],
+                         ['2', '1', '1'])
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_ordered_by_due_date(reverse=True)],
+                         ['1', '1', '2'])
+        self.assertEqual([len(page) for page in self.rh.cursor(2)], [2, 1])
+        self.rh.remove_rental(id)
+        self.assertEqual(len(self.rh.list), 2)
+
+    def test_update_rentals_ids(self):
+        moved = self.rh.update_rentals_client_id('1', '7')
+        self.assertEqual(sorted(rental.client_id for rental in moved.values()), ['7', '7'])
+        self.assertEqual(sorted(id.client_id for id in moved), ['1', '1'])
+        self.assertEqual(self.rh.rentals_of_client('1'), [])
+        self.assertEqual([rental.movie_id for rental in self.rh.rentals_of_client('7')], ['1', '2'])
+        self.rh.add_rental(Rental('6', '2', date(2002, 3, 1), date(2002, 3, 8)))
+        with self.assertRaises(RentalHistoryError):
+            self.rh.update_rentals_movie_id('1', '6')
+        self.assertEqual(len(self.rh.rentals_of_movie('1')), 2)
+
+    def test_movie_intervals(self):
+        self.assertEqual(self.rh.movie_rented_until('1'), date(2002, 4, 1))
+        self.assertEqual(self.rh.movie_rented_until('2'), date.max)
+        self.assertIsNone(self.rh.movie_rented_until('3'))
+        self.assertFalse(self.rh.is_movie_free('1', date(2002, 3, 20)))
+        self.assertTrue(self.rh.is_movie_free('1', date(2002, 4, 2), date(2002, 5, 1)))
+        self.assertEqual(self.rh.next_free_window('1', date(2002, 2, 1), 7), date(2002, 2, 1))
+        self.assertEqual(self.rh.next_free_window('1', date(2002, 2, 25), 7), date(2002, 4, 2))
+
+    def test_rented_days(self):
+        self.assertEqual(self.rh.rented_days_by_movie(), {'1': 36})
+        self.assertEqual(self.rh.rented_days_by_client(), {'1': 5, '2': 31})
+        self.assertEqual(self.rh.late_days_by_movie(date(2002, 3, 10)), {'1': 2, '2': 7})
+        self.assertEqual(self.rh.late_days_by_movie(date(2002, 3, 3)), {})
@@ -0,0 +1,460 @@
+"""
+RentalTable class, the storage of RentalHistoryColumnar
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from unittest import TestCase
+
+from domain.Rental import Rental
+from domain.RentalKey import RentalKey
+from repository.Cursor import Cursor
+from repository.Query import Query
+from repository.RentalColumns import RentalColumns
+
+
+class RentalTableError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+def find_position(rows, column, row):
+    """
+    Finds where a row is, or goes, in rows sorted by a column and, for equal values, by row
+    Args:
+        rows: the sorted rows - array of int
+        column: the values the rows are sorted by - array of int
+        row: the row - int
+
+    Returns: the position - int
+    """
+    value = column[row]
+    low = bisect_left(rows, value, key=column.__getitem__)
+    high = bisect_right(rows, value, low, key=column.__getitem__)
+    return bisect_left(rows, row, low, high)
+
+
+def walk(rows, column, reverse):
+    """
+    Goes through rows sorted by a column, backwards by value if reverse, rows with equal values staying in order
+    """
+    if not reverse:
+        yield from rows
+        return
+    stop = len(rows)
+    while stop > 0:
+        start = bisect_left(rows, column[rows[stop - 1]], 0, stop, key=column.__getitem__)
+        yield from rows[start:stop]
+        stop = start
+
+
+class RentalTable:
+    """
+    Rentals kept in RentalColumns, with the lookups of RentalHistory kept on row numbers and interned codes
+    The indexes of an Iterable hold the id of every rental, a RentalKey with its strings and dates, and a tuple per
+    index entry. Here every index is an array of rows, 4 bytes per rental:
+        the rows of every movie, sorted by rented date, with the running maximum of the last days they keep the movie;
+        a rental is found by id through them: its movie, then its rented date, then its client and due date
+        the rows of every client, in the order they were added
+        the rows sorted by every date, the rentals without the date left out
+    and the rentals not returned yet are the keys of a dict. Rows with equal dates stay in the order they were added
+    in. A removed rental leaves its row empty, so rows never move and the tokens of the cursors stay valid.
+    Stands where RentalHistory expects an Iterable: lookups and changes by id and the reading methods.
+    Attributes:
+        rows: the rentals - RentalColumns
+        _by_movie: maps every movie code to its rows, sorted by rented date - dict of array
+        _reach: maps every movie code to the running maximum of the last days of its rows - dict of array
+        _by_client: maps every client code to its rows - dict of array
+        _by_date: maps every date to the rows sorted by it - dict of array
+        _open: the rows of the rentals not returned yet - dict
+        _holes: number of rows emptied by removals - int
+    """
+    DATES = ('rented_date', 'due_date', 'returned_date')
+    # A rental not returned yet keeps its movie until it is returned, as if it was returned on date.max
+    NOT_RETURNED = date.max.toordinal()
+    # Below this many rentals, extend indexes them one by one instead of sorting all the rows again
+    BULK = 16
+
+    def __init__(self, rentals=None):
+        self._rows = RentalColumns()
+        self._by_movie = {}
+        self._reach = {}
+        self._by_client = {}
+        self._by_date = {name: array('i') for name in self.DATES}
+        self._open = {}
+        self._holes = 0
+        if rentals is not None:
+            self.extend(rentals)
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def _row(self, id):
+        """
+        Returns: the row of the rental with the given id, None if not found - int
+        """
+        rows = self._by_movie.get(self._rows.movies.code_of(id.movie_id))
+        client = self._rows.clients.code_of(id.client_id)
+        if rows is None or client is None:
+            return None
+        rented, clients, due = (self._rows.column(name) for name in ('rented_date', 'client_id', 'due_date'))
+        rented_date, due_date = id.rented_date.toordinal(), id.due_date.toordinal()
+        for position in range(bisect_left(rows, rented_date, key=rented.__getitem__), len(rows)):
+            row = rows[position]
+            if rented[row] != rented_date:
+                break
+            if clients[row] == client and due[row] == due_date:
+                return row
+        return None
+
+    def _found(self, id):
+        """
+        Returns: the row of the rental with the given id - int
+        Raises RentalTableError if not found
+        """
+        row = self._row(id)
+        if row is None:
+            raise RentalTableError("Rental not found")
+        return row
+
+    def _refresh_reach(self, movie, position):
+        """
+        Recomputes the running maximum of the last days of the rows of a movie from a position on
+        """
+        returned = self._rows.column('returned_date')
+        reach = self._reach.setdefault(movie, array('i'))
+        del reach[position:]
+        current = reach[-1] if reach else 0
+        for row in self._by_movie[movie][position:]:
+            current = max(current, returned[row] or self.NOT_RETURNED)
+            reach.append(current)
+
+    def _index(self, row):
+        """
+        Adds a row to the indexes
+        """
+        movie = self._rows.column('movie_id')[row]
+        rows = self._by_movie.setdefault(movie, array('i'))
+        position = find_position(rows, self._rows.column('rented_date'), row)
+        rows.insert(position, row)
+        self._refresh_reach(movie, position)
+        insort(self._by_client.setdefault(self._rows.column('client_id')[row], array('i')), row)
+        for name, rows in self._by_date.items():
+            column = self._rows.column(name)
+            if column[row]:
+                rows.insert(find_position(rows, column, row), row)
+        if not self._rows.column('returned_date')[row]:
+            self._open[row] = None
+
+    def _unindex(self, row):
+        """
+        Removes a row from the indexes, before its columns change
+        """
+        movie = self._rows.column('movie_id')[row]
+        rows = self._by_movie[movie]
+        position = find_position(rows, self._rows.column('rented_date'), row)
+        del rows[position]
+        if rows:
+            self._refresh_reach(movie, position)
+        else:
+            del self._by_movie[movie]
+            del self._reach[movie]
+        client = self._rows.column('client_id')[row]
+        rows = self._by_client[client]
+        del rows[bisect_left(rows, row)]
+        if not rows:
+            del self._by_client[client]
+        for name, rows in self._by_date.items():
+            column = self._rows.column(name)
+            if column[row]:
+                del rows[find_position(rows, column, row)]
+        self._open.pop(row, None)
+
+    def _reindex(self):
+        """
+        Builds the indexes again from the columns, with one sort per date
+        Sorting is stable and the rows are taken in order, so rows with equal dates stay in order.
+        """
+        movies, clients, rented, returned = (self._rows.column(name) for name in
+                                             ('movie_id', 'client_id', 'rented_date', 'returned_date'))
+        live = [row for row, alive in enumerate(self._rows.column('live')) if alive]
+        self._by_movie = {}
+        for row in sorted(live, key=rented.__getitem__):
+            self._by_movie.setdefault(movies[row], array('i')).append(row)
+        self._reach = {}
+        for movie in self._by_movie:
+            self._refresh_reach(movie, 0)
+        self._by_client = {}
+        for row in live:
+            self._by_client.setdefault(clients[row], array('i')).append(row)
+        for name in self.DATES:
+            column = self._rows.column(name)
+            self._by_date[name] = array('i', sorted((row for row in live if column[row]), key=column.__getitem__))
+        self._open = {row: None for row in live if not returned[row]}
+
+    def find_item_by_id(self, id):
+        row = self._row(id)
+        return False if row is None else self._rows[row]
+
+    def __getitem__(self, id):
+        return self.find_item_by_id(id)
+
+    def __contains__(self, id):
+        return self._row(id) is not None
+
+    def items(self, ids):
+        """
+        Returns: the rentals with the given ids, in the order of the ids - generator
+        """
+        for id in ids:
+            yield self._rows[self._found(id)]
+
+    def append(self, rental):
+        """
+        Adds a rental, unless a rental with the same id is already stored
+        """
+        if rental.id not in self:
+            self._rows.append(rental)
+            self._index(len(self._rows) - 1)
+
+    def extend(self, rentals):
+        """
+        Adds several rentals, skipping those whose id is already stored or repeated
+        Many rentals are indexed by sorting all the rows once, instead of inserting them one by one.
+        Args:
+            rentals: rentals to be added - iterable
+
+        Returns: the rentals actually added - list
+        """
+        added = []
+        ids = set()
+        for rental in rentals:
+            if rental.id not in ids and rental.id not in self:
+                ids.add(rental.id)
+                added.append(rental)
+        for rental in added:
+            self._rows.append(rental)
+            if len(added) < self.BULK:
+                self._index(len(self._rows) - 1)
+        if len(added) >= self.BULK:
+            self._reindex()
+        return added
+
+    def __delitem__(self, id):
+        row = self._found(id)
+        self._unindex(row)
+        self._rows[row] = None
+        self._holes += 1
+
+    def remove_many(self, ids):
+        """
+        Removes the rentals with the given ids
+        Raises RentalTableError if a rental is not found, in which case none is removed
+        """
+        rows = [self._found(id) for id in set(ids)]
+        for row in rows:
+            self._unindex(row)
+            self._rows[row] = None
+        self._holes += len(rows)
+
+    def __setitem__(self, id, rental):
+        """
+        Replaces the rental with the given id, keeping its row
+        Raises RentalTableError if not found, or if the replacement has the id of another rental
+        """
+        row = self._found(id)
+        if rental.id != id and rental.id in self:
+            raise RentalTableError("Rental with the same id already exists")
+        self._unindex(row)
+        self._rows[row] = rental
+        self._index(row)
+
+    def rekey(self, id, new_id, rental=None):
+        """
+        Changes the id of the rental with the given id, keeping its row
+        Args:
+            id: current id - RentalKey
+            new_id: replacement id - RentalKey
+            rental: replacement of the rental, having the new id, None to only change the id of the rental
+
+        Raises RentalTableError if the rental is not found or the new id is already taken
+        """
+        if rental is None:
+            returned_date = self._rows[self._found(id)].returned_date
+            rental = Rental(new_id.movie_id, new_id.client_id, new_id.rented_date, new_id.due_date, returned_date)
+        self[id] = rental
+
+    def __iter__(self):
+        return (rental for rental in self._rows if rental is not None)
+
+    def __len__(self):
+        return len(self._rows) - self._holes
+
+    def _sorted(self, name):
+        if name not in self._by_date:
+            raise RentalTableError("Index not found")
+        return self._by_date[name], self._rows.column(name)
+
+    def ordered(self, name, reverse=False):
+        """
+        Lists the rentals ordered by one of the dates, without going through the other rentals
+        Returns: the rentals - generator
+        """
+        return self.between(name, None, None, reverse)
+
+    def between(self, name, low=None, high=None, reverse=False):
+        """
+        Lists the rentals whose date is between low and high, both included
+        Args:
+            name: 'rented_date', 'due_date' or 'returned_date' - string
+            low: earliest date, None for no lower bound - date
+            high: latest date, None for no upper bound - date
+            reverse: descending order - bool
+
+        Returns: the rentals, ordered by the date - generator
+        """
+        rows, column = self._sorted(name)
+        start = 0 if low is None else bisect_left(rows, low.toordinal(), key=column.__getitem__)
+        stop = len(rows) if high is None else bisect_right(rows, high.toordinal(), key=column.__getitem__)
+        # A copy of the rows, so the rentals can be changed while they are listed
+        return (self._rows[row] for row in walk(rows[start:stop], column, reverse))
+
+    def page(self, name, size, token=None):
+        """
+        Keyset pagination over one of the dates, see Cursor
+        Args:
+            name: 'rented_date', 'due_date' or 'returned_date' - string
+            size: maximum number of rentals returned - int
+            token: ordinal of the date and row of the last rental of the previous page, None for the first page - tuple
+
+        Returns: the rentals of the page and the token of the next page, None after the last page - (list, tuple)
+        """
+        rows, column = self._sorted(name)
+        start = 0
+        if token is not None:
+            low = bisect_left(rows, token[0], key=column.__getitem__)
+            high = bisect_right(rows, token[0], low, key=column.__getitem__)
+            start = bisect_right(rows, token[1], low, high)
+        stop = min(start + size, len(rows))
+        rentals = [self._rows[row] for row in rows[start:stop]]
+        if stop >= len(rows) or stop == start:
+            return rentals, None
+        last = rows[stop - 1]
+        return rentals, (column[last], last)
+
+    def cursor(self, name, page_size=20, token=None):
+        """
+        Returns: a Cursor paging through the rentals in the order of one of the dates - Cursor
+        """
+        return Cursor(self, name, page_size, token)
+
+    def query(self):
+        """
+        Starts a lazy query over the rentals, see Query
+        Returns: Query
+        """
+        return Query(self)
+
+    def rentals_of_movie(self, movie_id):
+        """
+        Returns: the rentals of a movie, in the order they were added - list of Rental
+        """
+        rows = self._by_movie.get(self._rows.movies.code_of(movie_id), ())
+        return [self._rows[row] for row in sorted(rows)]
+
+    def rentals_of_client(self, client_id):
+        """
+        Returns: the rentals of a client, in the order they were added - list of Rental
+        """
+        rows = self._by_client.get(self._rows.clients.code_of(client_id), ())
+        return [self._rows[row] for row in rows]
+
+    def open_rentals(self):
+        """
+        Returns: the rentals not returned yet - list of Rental
+        """
+        return [self._rows[row] for row in self._open]
+
+    def movie_rented_until(self, movie_id):
+        """
+        Returns: the latest returned date of the rentals of a movie, date.max if one is not returned yet, None if
+            the movie was never rented - date
+        """
+        reach = self._reach.get(self._rows.movies.code_of(movie_id))
+        return None if reach is None else date.fromordinal(reach[-1])
+
+    def is_movie_free(self, movie_id, start, end=None):
+        """
+        Checks whether no rental of a movie overlaps a day or a range of days, in O(log n)
+        Args:
+            movie_id: id of the movie - string
+            start: the day, or the first day of the range - date
+            end: the last day of the range, None to check only the start - date
+
+        Returns: True if free, False if not
+        """
+        if end is None:
+            end = start
+        movie = self._rows.movies.code_of(movie_id)
+        rows = self._by_movie.get(movie)
+        if rows is None:
+            return True
+        # The rentals rented at most on the last day are a prefix, they overlap the range if one reaches its start
+        count = bisect_right(rows, end.toordinal(), key=self._rows.column('rented_date').__getitem__)
+        return count == 0 or self._reach[movie][count - 1] < start.toordinal()
+
+
+class TestRentalTable(TestCase):
+    def setUp(self):
+        self.table = RentalTable([Rental('1', '1', date(2002, 3, 5), date(2002, 3, 20), date(2002, 3, 10)),
+                                  Rental('2', '1', date(2002, 2, 25), date(2002, 3, 3)),
+                                  Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8), date(2002, 4, 1)),
+                                  Rental('1', '3', date(2002, 3, 1), date(2002, 3, 9))])
+
+    def test_find(self):
+        self.assertEqual(self.table[RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8))].client_id, '2')
+        self.assertFalse(self.table[RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 9))])
+        self.assertFalse(RentalKey('3', '1', date(2002, 3, 1), date(2002, 3, 9)) in self.table)
+        self.table.append(Rental('1', '2', date(2002, 3, 1), date(2002, 3, 8)))
+        self.assertEqual(len(self.table), 4)
+
+    def test_indexes(self):
+        self.assertEqual([rental.client_id for rental in self.table.rentals_of_movie('1')], ['1', '2', '3'])
+        self.assertEqual([rental.movie_id for rental in self.table.rentals_of_client('1')], ['1', '2'])
+        self.assertEqual([rental.client_id for rental in self.table.open_rentals()], ['1', '3'])
+        self.assertEqual([rental.client_id for rental in self.table.ordered('rented_date')], ['1', '2', '3', '1'])
+        self.assertEqual([rental.client_id for rental in self.table.ordered('rented_date', reverse=True)],
+                         ['1', '2', '3', '1'])
+        self.assertEqual([rental.client_id for rental in self.table.between('returned_date', high=date(2002, 3, 31))],
+                         ['1'])
+        self.assertEqual(self.table.movie_rented_until('1'), date.max)
+        self.assertFalse(self.table.is_movie_free('1', date(2002, 2, 1), date(2002, 3, 1)))
+        self.assertTrue(self.table.is_movie_free('2', date(2002, 2, 1), date(2002, 2, 24)))
+
+    def test_changes(self):
+        id = RentalKey('1', '3', date(2002, 3, 1), date(2002, 3, 9))
+        self.table[id] = Rental('1', '3', date(2002, 3, 1), date(2002, 3, 9), date(2002, 3, 2))
+        self.assertEqual(self.table.movie_rented_until('1'), date(2002, 4, 1))
+        self.table.rekey(RentalKey('2', '1', date(2002, 2, 25), date(2002, 3, 3)),
+                         RentalKey('3', '1', date(2002, 2, 25), date(2002, 3, 3)))
+        self.assertEqual([rental.movie_id for rental in self.table.rentals_of_client('1')], ['1', '3'])
+        with self.assertRaises(RentalTableError):
+            self.table.rekey(id, RentalKey('1', '1', date(2002, 3, 5), date(2002, 3, 20)))
+        del self.table[RentalKey('1', '1', date(2002, 3, 5), date(2002, 3, 20))]
+        with self.assertRaises(RentalTableError):
+            self.table.remove_many([id, RentalKey('1', '1', date(2002, 3, 5), date(2002, 3, 20))])
+        self.table.remove_many([id])
+        self.assertEqual([rental.client_id for rental in self.table], ['1', '2'])
+        self.assertEqual(self.table.rentals_of_client('3'), [])
+        self.assertIsNone(self.table.movie_rented_until('2'))
+
+    def test_page(self):
+        rentals, token = self.table.page('rented_date', 2)
+        self.assertEqual([rental.movie_id for rental in rentals], ['2', '1'])
+        del self.table[RentalKey('1', '2', date(2002, 3, 1), date(2002, 3, 8))]
+        self.table.extend([Rental('4', '4', date(2002, 3, 1), date(2002, 3, 2))])
+        self.assertEqual([[rental.client_id for rental in page] for page in self.table.cursor('rented_date', 2, token)],
+                         [['3', '4'], ['1']])
+        with self.assertRaises(RentalTableError):
+            self.table.page('title', 2)
@@ -0,0 +1,523 @@
+"""
+Repository class, the generic core of ClientBase, MovieCollection and RentalHistory
+"""
+from contextlib import contextmanager
+from copy import copy
+from functools import wraps
+from threading import RLock, Timer
+from time import monotonic, sleep
+from unittest import TestCase
+
+from domain.Client import Client
+from repository.FlushPolicy import FlushPolicy
+from repository.Iterable import Iterable
+from repository.QueryCache import QueryCache
+from repository.SortedIndex import SortedIndex, id_key
+
+
+def locked(method):
+    """
+    Decorator running a method of a repository while holding its lock, so the flush timer never saves in the middle
+    of a change
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Repository:
+    """
+    Generic repository of items identified by their id attribute, the primary key of the Iterable keeping them
+    Specialisations declare, as class attributes:
+        error: the exception raised - class
+        duplicate_message: message of the error raised when an id already exists - string
+        missing_message: message of the error raised when an id is not found - string
+        indexes: the secondary indexes, by name, as functions creating an empty index - dict
+        cursor_index: name of the sorted index the cursors page through - string
+        cache_size: maximum number of query results cached - int
+    Attributes:
+        list: storage engine of the items - Iterable, a plain list is wrapped into one
+        persistence: where the items are saved, None to keep them in memory only, see repository.Persistence
+        flush_policy: when the changes are saved, after every one of them by default - FlushPolicy
+        pending: number of changes not saved yet - int
+        version: mutation counter, increased by every change made through the repository - int
+        cache: results of the queries decorated with repository.QueryCache.cached - QueryCache
+
+    Methods:
+        find, add, add_many, remove, remove_many, update, rekey, rekey_many: lookups and changes by id
+        ordered, query, cursor: reading the items
+        load, save: reading and writing the items through the persistence
+        flush: saves the pending changes
+        batch: context manager saving the changes made inside it together
+    A repository is also a context manager, saving its pending changes when the with block ends.
+    With a flush policy having an interval, a timer saves the pending changes once it has passed, even if no other
+    change comes. The timer saves from its own thread, holding the lock of the repository, which the changes hold
+    too, see locked.
+    """
+    error = Exception
+    duplicate_message = "Item already found"
+    missing_message = "Item not found"
+    indexes = {}
+    cursor_index = 'id'
+    cache_size = 128
+
+    def __init__(self, list=None, persistence=None):
+        if list is None:
+            list = Iterable()
+        elif not isinstance(list, Iterable):
+            list = Iterable(list)
+        self._list = list
+        self._persistence = persistence
+        self._flush_policy = FlushPolicy.immediate()
+        self._pending = {}
+        self._changes = 0
+        self._flushed_at = monotonic()
+        self._lock = RLock()
+        self._timer = None
+        self._batches = 0
+        self._version = 0
+        self._cache = QueryCache(self.cache_size)
+        self._create_indexes()
+
+    @property
+    def list(self):
+        return self._list
+
+    @list.setter
+    def list(self, list):
+        self._list = Iterable(list)
+        self._create_indexes()
+        self._version += 1
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def persistence(self):
+        return self._persistence
+
+    @persistence.setter
+    def persistence(self, persistence):
+        self._persistence = persistence
+
+    @property
+    def flush_policy(self):
+        return self._flush_policy
+
+    @flush_policy.setter
+    def flush_policy(self, flush_policy):
+        self._flush_policy = flush_policy
+
+    @property
+    def pending(self):
+        return self._changes
+
+    @property
+    def dirty(self):
+        return self._changes > 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.flush()
+
+    def _create_indexes(self):
+        """
+        Adds to the list the declared secondary indexes
+        """
+        for name, create_index in self.indexes.items():
+            self._list.add_index(name, create_index())
+
+    @locked
+    def _changed(self, added=(), updated=(), removed=()):
+        """
+        Called after every change of the items, keeps it until the flush policy saves it, if the repository is
+        persistent
+        Args:
+            added, updated, removed: the items added, changed and removed - list
+        """
+        self._version += 1
+        if self._persistence is None:
+            return
+        for item in removed:
+            self._keep('remove', item)
+        for item in added:
+            self._keep('add', item)
+        for item in updated:
+            self._keep('update', item)
+        self._changes += 1
+        if not self._batches:
+            self._flush_if_due()
+
+    def _keep(self, operation, item):
+        """
+        Keeps the last change of an item, folding it into the one pending for the same id
+        """
+        previous = self._pending.pop(item.id, (None, None))[0]
+        if operation == 'remove':
+            if previous == 'add':
+                # Never saved, nothing to remove
+                return
+        elif previous == 'remove':
+            operation = 'update'
+        elif previous == 'add':
+            operation = 'add'
+        self._pending[item.id] = (operation, item)
+
+    def _flush_if_due(self):
+        """
+        Saves the pending changes if the flush policy says so, otherwise starts the timer saving them once the
+        interval of the policy has passed, if it has one
+        """
+        if not self._changes:
+            return
+        elapsed = (monotonic() - self._flushed_at) * 1000
+        if self._flush_policy.due(self._changes, elapsed):
+            self.flush()
+        elif self._flush_policy.interval is not None and self._timer is None:
+            self._timer = Timer((self._flush_policy.interval - elapsed) / 1000, self._flush_on_time)
+            # The pending changes are saved by the with block or the close of the repository when the program ends
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_on_time(self):
+        """
+        Run by the timer: saves the pending changes, unless a batch is open, which checks the policy when it ends
+        """
+        with self._lock:
+            self._timer = None
+            if not self._batches:
+                self._flush_if_due()
+
+    @locked
+    def flush(self):
+        """
+        Saves the changes not saved yet, all in one record of the persistence
+        """
+        if self._pending:
+            changes = {'add': [], 'update': [], 'remove': []}
+            for operation, item in self._pending.values():
+                changes[operation].append(item)
+            self._persistence.record(self.list, changes['add'], changes['update'], changes['remove'])
+        self._pending = {}
+        self._changes = 0
+        self._flushed_at = monotonic()
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager keeping the changes made inside it pending, so they are saved together
+        The whole batch counts as one change for the flush policy. Batches can be nested.
+        """
+        if not self._batches:
+            changes = self._changes
+        self._batches += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batches -= 1
+                if not self._batches and self._changes > changes:
+                    self._changes = changes + 1
+                    self._flush_if_due()
+
+    @locked
+    def load(self):
+        """
+        Adds the items saved by the persistence, without saving them again
+        Raises the error of the repository if an id is repeated, in which case none is added
+        """
+        self._insert_many(self._persistence.load())
+        self._version += 1
+        self._pending = {}
+        self._changes = 0
+
+    @locked
+    def save(self):
+        """
+        Saves the current items through the persistence, pending changes included
+        """
+        self._persistence.save(self.list)
+        self._pending = {}
+        self._changes = 0
+        self._flushed_at = monotonic()
+
+    def find(self, id):
+        """
+        Returns: the item with the given id, False if not found
+        """
+        return self.list.find_item_by_id(id)
+
+    @locked
+    def add(self, item):
+        """
+        Adds an item
+        Raises the error of the repository if its id already exists
+        """
+        if item.id in self.list:
+            raise self.error(self.duplicate_message)
+        self.list.append(item)
+        self._changed(added=[item])
+
+    @locked
+    def add_many(self, items):
+        """
+        Adds several items at once
+        Raises the error of the repository if an id already exists or is repeated, in which case none is added
+        """
+        self._changed(added=self._insert_many(items))
+
+    def _insert_many(self, items):
+        """
+        Returns: the items added - list
+        """
+        items = list(items)
+        ids = set()
+        for item in items:
+            if item.id in ids or item.id in self.list:
+                raise self.error(self.duplicate_message)
+            ids.add(item.id)
+        self.list.extend(items)
+        return items
+
+    @locked
+    def remove(self, id):
+        """
+        Removes the item with the given id
+        Raises the error of the repository if not found
+        """
+        if id not in self.list:
+            raise self.error(self.missing_message)
+        item = self.find(id)
+        del self.list[id]
+        self._changed(removed=[item])
+
+    @locked
+    def remove_many(self, ids):
+        """
+        Removes the items with the given ids at once
+        Raises the error of the repository if an item is not found, in which case none is removed
+        """
+        ids = list(ids)
+        for id in ids:
+            if id not in self.list:
+                raise self.error(self.missing_message)
+        items = list(self.list.items(ids))
+        self.list.remove_many(ids)
+        self._changed(removed=items)
+
+    @locked
+    def update(self, id, **fields):
+        """
+        Changes fields of the item with the given id and updates the indexes
+        The item is written back, as the storage may have handed out a copy of it.
+        Args:
+            id: id of the item
+            fields: the new values, by field name
+
+        Raises the error of the repository if not found
+        """
+        item = self.find(id)
+        if not item:
+            raise self.error(self.missing_message)
+        for field, value in fields.items():
+            setattr(item, field, value)
+        self.list[id] = item
+        self._changed(updated=[item])
+
+    @locked
+    def rekey(self, id, new_id):
+        """
+        Changes the id of an item
+        Raises the error of the repository if not found or if the new id already exists
+        """
+        if id not in self.list:
+            raise self.error(self.missing_message)
+        if new_id != id and new_id in self.list:
+            raise self.error(self.duplicate_message)
+        # Copied, as the item stored may be the one whose id changes
+        item = copy(self.find(id))
+        self.list.rekey(id, new_id)
+        self._changed(added=[self.find(new_id)], removed=[item])
+
+    @locked
+    def rekey_many(self, items):
+        """
+        Replaces several items with items having other ids at once, keeping their places
+        Args:
+            items: maps the id of every item replaced to its replacement - dict
+
+        Raises the error of the repository if an item is not found or a new id already exists or is repeated,
+        in which case none is replaced
+        """
+        if not items:
+            return
+        new_ids = set()
+        for id, item in items.items():
+            if id not in self.list:
+                raise self.error(self.missing_message)
+            if item.id in new_ids or item.id != id and item.id in self.list:
+                raise self.error(self.duplicate_message)
+            new_ids.add(item.id)
+        removed = list(self.list.items(items))
+        for id, item in items.items():
+            self.list.rekey(id, item.id, item)
+        self._changed(added=list(items.values()), removed=removed)
+
+    def ordered(self, field, reverse=False):
+        """
+        Lists the items ordered by a sorted index, without changing the order of the repository
+        Args:
+            field: name of the index - string
+            reverse: descending order - bool
+
+        Returns: the items - generator
+        """
+        return self.list.ordered(field, reverse)
+
+    def query(self):
+        """
+        Starts a lazy query over the items
+        Returns: Query
+        """
+        return self.list.query()
+
+    def cursor(self, page_size=20, token=None):
+        """
+        Pages through the items in the order of the cursor index
+        Args:
+            page_size: maximum number of items on a page - int
+            token: resume token of a previous cursor, None to start from the first item - tuple
+
+        Returns: Cursor
+        """
+        return self.list.cursor(self.cursor_index, page_size, token)
+
+
+class TestRepository(TestCase):
+    class People(Repository):
+        error = KeyError
+        indexes = {'name': lambda: SortedIndex(lambda person: person.name), 'id': lambda: SortedIndex(
+            lambda person: id_key(person.id))}
+
+    class Saved:
+        def __init__(self):
+            self.items = [Client('9', 'Ion')]
+            self.saves = 0
+
+        def load(self):
+            return self.items
+
+        def save(self, items):
+            self.items = list(items)
+            self.saves += 1
+
+        def record(self, items, added=(), updated=(), removed=()):
+            self.save(items)
+            self.changes = ([(item.id, item.name) for item in added], [item.id for item in updated],
+                            [item.id for item in removed])
+
+    def setUp(self):
+        self.people = self.People([Client('2', 'Dan'), Client('1', 'Ana')])
+
+    def test_add_remove(self):
+        self.people.add(Client('3', 'Bob'))
+        self.assertEqual([person.id for person in self.people.ordered('name')], ['1', '3', '2'])
+        with self.assertRaises(KeyError):
+            self.people.add(Client('3', 'Bob'))
+        self.people.remove('2')
+        self.assertFalse(self.people.find('2'))
+        with self.assertRaises(KeyError):
+            self.people.remove('2')
+        with self.assertRaises(KeyError):
+            self.people.add_many([Client('4', 'Eva'), Client('1', 'Ana')])
+        self.people.remove_many(['1', '3'])
+        self.assertEqual(len(self.people.list), 0)
+
+    def test_update(self):
+        self.people.update('2', name='Al', worthy=False)
+        self.assertEqual([person.id for person in self.people.ordered('name')], ['2', '1'])
+        self.assertFalse(self.people.find('2').worthy)
+        self.people.rekey('2', '0')
+        self.assertEqual([person.name for person in self.people.cursor().fetch()], ['Al', 'Ana'])
+        with self.assertRaises(KeyError):
+            self.people.rekey('0', '1')
+        with self.assertRaises(KeyError):
+            self.people.update('2', name='Bo')
+        self.people.rekey_many({'0': Client('5', 'Bo'), '1': Client('1', 'Ana')})
+        self.assertEqual([(person.id, person.name) for person in self.people.list], [('5', 'Bo'), ('1', 'Ana')])
+        with self.assertRaises(KeyError):
+            self.people.rekey_many({'5': Client('2', 'Al'), '1': Client('2', 'Al')})
+        with self.assertRaises(KeyError):
+            self.people.rekey_many({'5': Client('1', 'Al')})
+        self.assertEqual([person.id for person in self.people.list], ['5', '1'])
+
+    def test_persistence(self):
+        saved = self.Saved()
+        people = self.People(persistence=saved)
+        people.load()
+        self.assertEqual(saved.saves, 0)
+        people.add(Client('1', 'Ana'))
+        people.update('9', name='Ionel')
+        self.assertEqual(saved.saves, 2)
+        self.assertEqual(people.version, 3)
+        self.assertEqual([(person.id, person.name) for person in saved.items], [('9', 'Ionel'), ('1', 'Ana')])
+
+    def test_flush_policy(self):
+        saved = self.Saved()
+        people = self.People(persistence=saved)
+        people.load()
+        with people.batch():
+            people.add(Client('1', 'Ana'))
+            people.remove('1')
+            with people.batch():
+                people.update('9', name='Ionel')
+        self.assertEqual((saved.saves, saved.changes), (1, ([], ['9'], [])))
+        saved.saves = 0
+        people.flush_policy = FlushPolicy.every_changes(3)
+        people.add(Client('1', 'Ana'))
+        people.update('1', name='Anca')
+        self.assertEqual((saved.saves, people.pending), (0, 2))
+        people.remove('9')
+        self.assertEqual((saved.saves, people.pending), (1, 0))
+        self.assertEqual(saved.changes, ([('1', 'Anca')], [], ['9']))
+        with people.batch():
+            for id in range(10, 20):
+                people.add(Client(str(id), 'Bob'))
+            people.remove('10')
+            people.rekey('1', '2')
+        self.assertEqual(saved.saves, 1)
+        people.flush_policy = FlushPolicy.manual()
+        with people:
+            people.update('11', name='Bo')
+            self.assertTrue(people.dirty)
+        self.assertEqual(saved.saves, 2)
+        self.assertEqual(len(saved.changes[0]), 10)
+        self.assertEqual(saved.changes[2], ['1'])
+        self.assertFalse(people.dirty)
+
+    def test_flush_interval(self):
+        saved = self.Saved()
+        people = self.People(persistence=saved)
+        people.load()
+        people.flush_policy = FlushPolicy.every_milliseconds(100)
+        people.flush()
+        people.add(Client('1', 'Ana'))
+        self.assertEqual((saved.saves, people.pending), (0, 1))
+        sleep(0.3)
+        self.assertEqual((saved.saves, people.pending), (1, 0))
+        self.assertEqual(saved.changes[0], [('1', 'Ana')])
+        with people.batch():
+            people.update('1', name='Anca')
+            sleep(0.3)
+            self.assertEqual(saved.saves, 1)
+        sleep(0.3)
+        self.assertEqual((saved.saves, saved.changes[1]), (2, ['1']))
@@ -0,0 +1,389 @@
+"""
+SQLiteRepository class, the generic core of the SQLite repositories
+"""
+import sqlite3
+from threading import RLock
+from time import monotonic, sleep
+from unittest import TestCase
+
+from domain.Client import Client
+from repository.FlushPolicy import FlushPolicy
+from repository.Repository import Repository, locked
+from repository.SQLiteTable import SQLiteTable
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository keeping its items in a table of an SQLite database instead of memory
+    The database is opened in write-ahead log mode: a commit appends the changed pages to the log instead of
+    rewriting the database, and readers are not blocked while it is written. Every change runs in a savepoint of an
+    open transaction, so a failed change leaves no trace, and the flush policy decides when the transaction is
+    committed: the changes made between two flushes, or inside a batch, are written by one commit.
+    The repositories share one lock, as they may share a connection: the timer of an interval flush policy commits
+    from its own thread, so it must not commit in the middle of a savepoint of another repository. A connection
+    given to a repository with such a policy must be opened with check_same_thread=False.
+    Specialisations declare, besides the class attributes of Repository:
+        table: name of the table - string
+        columns: the columns of the table, in the order of the rows - tuple of string
+        key_columns: the columns of the primary key - tuple of string
+        schema: the statements creating the table and its indexes if missing - list of string
+        orders: the SQL expressions the sorted indexes order the items by, by index name - dict of tuple of string
+    and the methods to_obj, to_row and key.
+    Attributes:
+        connection: the database - sqlite3.Connection
+        list: the table - SQLiteTable
+    Methods:
+        index: one of the declared in-memory indexes, built from the table
+        execute: runs a change in a savepoint
+        commit: writes the open transaction
+        load_file, save_file: kept for parity with the text and binary repositories
+    """
+    table = None
+    columns = ()
+    key_columns = ('id',)
+    schema = []
+    orders = {}
+    lock = RLock()
+
+    def __init__(self, file):
+        """
+        Args:
+            file: path of the database, or a connection shared with other repositories - string or sqlite3.Connection
+        """
+        if isinstance(file, sqlite3.Connection):
+            self._connection = file
+        else:
+            # Transactions are begun and committed explicitly, see execute and commit
+            self._connection = sqlite3.connect(file, isolation_level=None, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+        for statement in self.schema:
+            self._connection.execute(statement)
+        super().__init__()
+        self._lock = self.lock
+        self._built_indexes = {}
+        self._list = SQLiteTable(self._connection, self.table, self.columns, self.key_columns, self.key, self.to_obj,
+                                 self.orders)
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def list(self):
+        return self._list
+
+    @list.setter
+    def list(self, list):
+        """
+        Replaces all the rows of the table with the given items
+        """
+        def replace(cursor):
+            cursor.execute('DELETE FROM ' + self.table)
+            cursor.executemany(self._insert, [self.to_row(item) for item in list])
+        self.execute(replace)
+        self._changed()
+
+    @property
+    def file_name(self):
+        return self._connection.execute('PRAGMA database_list').fetchone()[2]
+
+    @property
+    def _insert(self):
+        return 'INSERT INTO ' + self.table + ' VALUES (' + ', '.join('?' * len(self.columns)) + ')'
+
+    @property
+    def _update(self):
+        return 'UPDATE ' + self.table + ' SET ' + ', '.join(column + ' = ?' for column in self.columns) + ' WHERE ' \
+            + ' AND '.join(column + ' = ?' for column in self.key_columns)
+
+    @property
+    def _delete(self):
+        return 'DELETE FROM ' + self.table + ' WHERE ' + ' AND '.join(column + ' = ?' for column in self.key_columns)
+
+    def to_obj(self, row):
+        """
+        Returns: the item stored in a row
+        """
+        raise NotImplementedError
+
+    def to_row(self, item):
+        """
+        Returns: the values of the columns storing an item - tuple
+        """
+        raise NotImplementedError
+
+    def key(self, id):
+        """
+        Returns: the values of the key columns for an id - tuple
+        """
+        return id,
+
+    def _create_indexes(self):
+        """
+        The sorted indexes are the ones of the table, created by the schema, the others are built when needed
+        """
+
+    def index(self, name):
+        """
+        Builds one of the declared in-memory indexes from the table, for the searches SQL cannot answer
+        The index is kept until the items change.
+        Args:
+            name: name of the index, a key of indexes - string
+
+        Returns: the index
+        """
+        index, version = self._built_indexes.get(name, (None, None))
+        if version != self._version:
+            index = self.indexes[name]()
+            index.add_many(self._list)
+            self._built_indexes[name] = (index, self._version)
+        return index
+
+    @locked
+    def execute(self, change):
+        """
+        Runs a change in a savepoint of the open transaction, beginning one if needed
+        Args:
+            change: function making the change with the cursor it gets - function
+
+        Raises the error of the repository, with the duplicate message, if the change breaks the primary key, in
+        which case the savepoint is rolled back
+        """
+        if not self._connection.in_transaction:
+            self._connection.execute('BEGIN')
+        self._connection.execute('SAVEPOINT change')
+        try:
+            change(self._connection.cursor())
+        except sqlite3.IntegrityError:
+            self._rollback()
+            raise self.error(self.duplicate_message)
+        except BaseException:
+            self._rollback()
+            raise
+        self._connection.execute('RELEASE change')
+
+    def _rollback(self):
+        self._connection.execute('ROLLBACK TO change')
+        self._connection.execute('RELEASE change')
+
+    @locked
+    def _changed(self, added=(), updated=(), removed=()):
+        """
+        Counts the change until the flush policy commits it
+        """
+        self._version += 1
+        self._changes += 1
+        if not self._batches:
+            self._flush_if_due()
+
+    def commit(self):
+        """
+        Writes the open transaction, if any
+        """
+        if self._connection.in_transaction:
+            self._connection.execute('COMMIT')
+
+    @locked
+    def flush(self):
+        """
+        Commits the changes not committed yet
+        """
+        self.commit()
+        self._changes = 0
+        self._flushed_at = monotonic()
+
+    def load(self):
+        """
+        The items are read from the database when needed, there is nothing to load
+        """
+        self._version += 1
+
+    def save(self):
+        self.flush()
+
+    def load_file(self):
+        self.load()
+
+    def save_file(self):
+        self.save()
+
+    @locked
+    def close(self):
+        """
+        Commits the pending changes and closes the database
+        """
+        self.flush()
+        self._connection.close()
+
+    def add(self, item):
+        """
+        Adds an item
+        Raises the error of the repository if its id already exists
+        """
+        self.execute(lambda cursor: cursor.execute(self._insert, self.to_row(item)))
+        self._changed(added=[item])
+
+    def add_many(self, items):
+        """
+        Adds several items at once, with one prepared statement
+        Raises the error of the repository if an id already exists or is repeated, in which case none is added
+        """
+        items = list(items)
+        self.execute(lambda cursor: cursor.executemany(self._insert, [self.to_row(item) for item in items]))
+        self._changed(added=items)
+
+    def _missing(self):
+        raise self.error(self.missing_message)
+
+    def remove(self, id):
+        """
+        Removes the item with the given id
+        Raises the error of the repository if not found
+        """
+        item = self.find(id)
+        if not item:
+            self._missing()
+        self.execute(lambda cursor: cursor.execute(self._delete, self._list.key(id)))
+        self._changed(removed=[item])
+
+    def remove_many(self, ids):
+        """
+        Removes the items with the given ids at once
+        Raises the error of the repository if an item is not found, in which case none is removed
+        """
+        ids = list(ids)
+
+        def remove(cursor):
+            cursor.executemany(self._delete, [self._list.key(id) for id in ids])
+            if cursor.rowcount != len(ids):
+                self._missing()
+        self.execute(remove)
+        self._changed(removed=ids)
+
+    def update(self, id, **fields):
+        """
+        Changes fields of the item with the given id
+        Raises the error of the repository if not found
+        """
+        item = self.find(id)
+        if not item:
+            self._missing()
+        for field, value in fields.items():
+            setattr(item, field, value)
+        self.execute(lambda cursor: cursor.execute(self._update, self.to_row(item) + self._list.key(id)))
+        self._changed(updated=[item])
+
+    def rekey(self, id, new_id):
+        """
+        Changes the id of an item
+        Raises the error of the repository if not found or if the new id already exists
+        """
+        item = self.find(id)
+        if not item:
+            self._missing()
+        item.id = new_id
+        self.rekey_many({id: item})
+
+    def rekey_many(self, items):
+        """
+        Replaces several items with items having other ids at once, keeping their places
+        Args:
+            items: maps the id of every item replaced to its replacement - dict
+
+        Raises the error of the repository if an item is not found or a new id already exists or is repeated,
+        in which case none is replaced
+        """
+        if not items:
+            return
+
+        def rekey(cursor):
+            cursor.executemany(self._update, [self.to_row(item) + self._list.key(id) for id, item in items.items()])
+            if cursor.rowcount != len(items):
+                self._missing()
+        self.execute(rekey)
+        self._changed(added=list(items.values()), removed=list(items))
+
+    def ordered(self, field, reverse=False):
+        """
+        Lists the items ordered by one of the orders of the table
+        """
+        return self._list.ordered(field, reverse)
+
+
+class TestSQLiteRepository(TestCase):
+    class People(SQLiteRepository):
+        error = KeyError
+        table = 'people'
+        columns = ('id', 'name')
+        schema = ['CREATE TABLE IF NOT EXISTS people (id TEXT PRIMARY KEY, name TEXT)',
+                  'CREATE INDEX IF NOT EXISTS people_name ON people (name)']
+        orders = {'id': ('length(id)', 'id'), 'name': ('name',)}
+
+        def to_obj(self, row):
+            return Client(*row)
+
+        def to_row(self, item):
+            return item.id, item.name
+
+    def setUp(self):
+        self.people = self.People(':memory:')
+        self.people.add_many([Client('2', 'Dan'), Client('1', 'Ana')])
+
+    def test_add_remove(self):
+        self.people.add(Client('3', 'Bob'))
+        self.assertEqual([person.id for person in self.people.ordered('name')], ['1', '3', '2'])
+        with self.assertRaises(KeyError):
+            self.people.add(Client('3', 'Bob'))
+        self.people.remove('2')
+        self.assertFalse(self.people.find('2'))
+        with self.assertRaises(KeyError):
+            self.people.remove('2')
+        with self.assertRaises(KeyError):
+            self.people.add_many([Client('4', 'Eva'), Client('1', 'Ana')])
+        self.assertFalse(self.people.find('4'))
+        with self.assertRaises(KeyError):
+            self.people.remove_many(['1', '4'])
+        self.people.remove_many(['1', '3'])
+        self.assertEqual(len(self.people.list), 0)
+
+    def test_update(self):
+        self.people.update('2', name='Al')
+        self.assertEqual([person.id for person in self.people.ordered('name')], ['2', '1'])
+        self.people.rekey('2', '0')
+        self.assertEqual([person.name for person in self.people.cursor().fetch()], ['Al', 'Ana'])
+        with self.assertRaises(KeyError):
+            self.people.rekey('0', '1')
+        with self.assertRaises(KeyError):
+            self.people.update('2', name='Bo')
+        self.people.rekey_many({'0': Client('5', 'Bo'), '1': Client('1', 'Ana')})
+        self.assertEqual([(person.id, person.name) for person in self.people.list], [('5', 'Bo'), ('1', 'Ana')])
+        with self.assertRaises(KeyError):
+            self.people.rekey_many({'5': Client('2', 'Al'), '1': Client('2', 'Al')})
+        with self.assertRaises(KeyError):
+            self.people.rekey_many({'5': Client('6', 'Al'), '7': Client('7', 'Al')})
+        self.assertEqual([person.id for person in self.people.list], ['5', '1'])
+
+    def test_transactions(self):
+        connection = self.people.connection
+        self.assertFalse(connection.in_transaction)
+        self.people.flush_policy = FlushPolicy.every_changes(2)
+        self.people.add(Client('3', 'Bob'))
+        self.assertTrue(connection.in_transaction)
+        with self.people.batch():
+            for id in range(10, 20):
+                self.people.add(Client(str(id), 'Eva'))
+        self.assertFalse(connection.in_transaction)
+        self.people.flush_policy = FlushPolicy.manual()
+        with self.people:
+            self.people.remove('3')
+            self.assertTrue(self.people.dirty)
+        self.assertFalse(connection.in_transaction)
+        self.assertEqual(len(self.people.list), 12)
+        self.people.flush_policy = FlushPolicy.every_milliseconds(100)
+        self.people.flush()
+        self.people.update('1', name='Anca')
+        self.assertTrue(connection.in_transaction)
+        sleep(0.3)
+        self.assertFalse(connection.in_transaction)
+        self.assertFalse(self.people.dirty)
@@ -0,0 +1,224 @@
+"""
+SQLiteTable class
+"""
+import sqlite3
+from datetime import date
+from unittest import TestCase
+
+from domain.Client import Client
+from repository.Cursor import Cursor
+from repository.Query import Query
+
+
+def sql_value(value):
+    """
+    Converts a value into the one stored in the database: dates are stored as ISO 8601 text, which sorts like them
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class SQLiteTable:
+    """
+    The rows of an SQLite table seen as items, with the reading methods of Iterable that repositories, cursors and
+    queries use, so the table can stand where an Iterable is expected. Nothing is kept in memory: every method runs
+    a parameterized statement, prepared once and cached by the connection.
+    The items keep the order of their rowid, which is the order they were added in.
+    Attributes:
+        connection: the database - sqlite3.Connection
+        name: name of the table - string
+        columns: the columns, in the order to_obj takes them - tuple of string
+        key_columns: the columns of the primary key - tuple of string
+        key: function giving the values of the key columns for an id - function
+        to_obj: function converting a row into an item - function
+        orders: the SQL expressions the items can be ordered by, by name - dict of tuple of string
+
+    Methods:
+        select: the items matching a condition
+        ordered, between, page: the items in an order, backed by the indexes of the table
+        find_item_by_id, items: the items with given ids
+        query: a lazy query over the items
+    """
+    def __init__(self, connection, name, columns, key_columns, key, to_obj, orders):
+        self._connection = connection
+        self._name = name
+        self._columns = columns
+        self._key_columns = key_columns
+        self._key = key
+        self._to_obj = to_obj
+        self._orders = orders
+        self._where_key = ' AND '.join(column + ' = ?' for column in key_columns)
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def name(self):
+        return self._name
+
+    def key(self, id):
+        """
+        Returns: the values of the key columns for an id - tuple
+        """
+        return tuple(sql_value(value) for value in self._key(id))
+
+    def select(self, where=None, params=(), order='rowid', limit=None):
+        """
+        Finds the items matching a condition
+        Args:
+            where: SQL condition, None for all the items - string
+            params: values of the parameters of the condition - tuple
+            order: SQL ORDER BY clause - string
+            limit: maximum number of items, None for all - int
+
+        Returns: the items - generator
+        """
+        statement = 'SELECT ' + ', '.join(self._columns) + ' FROM ' + self._name
+        if where is not None:
+            statement += ' WHERE ' + where
+        statement += ' ORDER BY ' + order + ' LIMIT ?'
+        rows = self._connection.execute(statement, tuple(sql_value(param) for param in params)
+                                        + (-1 if limit is None else limit,))
+        return (self._to_obj(row) for row in rows)
+
+    def __iter__(self):
+        return self.select()
+
+    def __len__(self):
+        return self._connection.execute('SELECT count(*) FROM ' + self._name).fetchone()[0]
+
+    def __contains__(self, id):
+        return self._connection.execute('SELECT 1 FROM ' + self._name + ' WHERE ' + self._where_key,
+                                        self.key(id)).fetchone() is not None
+
+    def find_item_by_id(self, id):
+        """
+        Returns: the item with the given id, False if not found
+        """
+        for item in self.select(self._where_key, self.key(id)):
+            return item
+        return False
+
+    def __getitem__(self, id):
+        return self.find_item_by_id(id)
+
+    def items(self, ids):
+        """
+        Returns: the items with the given ids, in the order of the ids - generator
+        """
+        for id in ids:
+            yield self.find_item_by_id(id)
+
+    def _order(self, name):
+        """
+        Returns: the expressions of an order, as a row value - string
+        """
+        return '(' + ', '.join(self._orders[name]) + ')'
+
+    def _clause(self, name, reverse):
+        direction = ' DESC' if reverse else ''
+        return ', '.join(expression + direction for expression in self._orders[name]) + ', rowid'
+
+    def ordered(self, name, reverse=False):
+        """
+        Lists the items ordered by one of the orders, items with equal keys in the order they were added
+        Items whose first key is NULL are left out, like the items whose key is None in a SortedIndex.
+
+        Returns: the items - generator
+        """
+        return self.between(name, None, None, reverse)
+
+    def between(self, name, low=None, high=None, reverse=False):
+        """
+        Lists the items whose key in an order is between low and high, both included
+        Args:
+            name: name of the order - string
+            low: smallest key, None for no lower bound, a tuple for orders of several expressions
+            high: largest key, None for no upper bound, a tuple for orders of several expressions
+            reverse: descending order - bool
+
+        Returns: the items - generator
+        """
+        order = self._order(name)
+        conditions = [self._orders[name][0] + ' IS NOT NULL']
+        params = ()
+        for bound, operator in ((low, ' >= '), (high, ' <= ')):
+            if bound is not None:
+                bound = bound if isinstance(bound, tuple) else (bound,)
+                conditions.append(order + operator + '(' + ', '.join('?' * len(bound)) + ')')
+                params += bound
+        return self.select(' AND '.join(conditions), params, self._clause(name, reverse))
+
+    def page(self, name, size, token=None):
+        """
+        Keyset pagination over one of the orders, see Cursor
+        Args:
+            name: name of the order - string
+            size: maximum number of items returned - int
+            token: keys and rowid of the last item of the previous page, None for the first page - tuple
+
+        Returns: the items of the page and the token of the next page, None after the last page - (list, tuple)
+        """
+        expressions = self._orders[name]
+        statement = 'SELECT ' + ', '.join(expressions + ('rowid',) + self._columns) + ' FROM ' + self._name \
+            + ' WHERE ' + expressions[0] + ' IS NOT NULL'
+        params = ()
+        if token is not None:
+            statement += ' AND (' + ', '.join(expressions) + ', rowid) > (' + ', '.join('?' * len(token)) + ')'
+            params = token
+        statement += ' ORDER BY ' + self._clause(name, False) + ' LIMIT ?'
+        rows = self._connection.execute(statement, params + (size + 1,)).fetchall()
+        keys = len(expressions) + 1
+        items = [self._to_obj(row[keys:]) for row in rows[:size]]
+        if len(rows) <= size:
+            return items, None
+        return items, tuple(rows[size - 1][:keys])
+
+    def cursor(self, name, page_size=20, token=None):
+        """
+        Returns: a Cursor paging through the items in one of the orders - Cursor
+        """
+        return Cursor(self, name, page_size, token)
+
+    def query(self):
+        """
+        Starts a lazy query over the items, see Query
+        Returns: Query
+        """
+        return Query(self)
+
+
+class TestSQLiteTable(TestCase):
+    def setUp(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute('CREATE TABLE clients (id TEXT PRIMARY KEY, name TEXT)')
+        connection.executemany('INSERT INTO clients VALUES (?, ?)',
+                               [('10', 'Ana'), ('9', 'dan'), ('2', 'Bob'), ('30', 'ana')])
+        self.table = SQLiteTable(connection, 'clients', ('id', 'name'), ('id',), lambda id: (id,),
+                                 lambda row: Client(*row),
+                                 {'id': ('length(id)', 'id'), 'name': ('lower(name)',)})
+
+    def test_read(self):
+        self.assertEqual([client.id for client in self.table], ['10', '9', '2', '30'])
+        self.assertEqual(len(self.table), 4)
+        self.assertIn('2', self.table)
+        self.assertNotIn('3', self.table)
+        self.assertEqual(self.table['9'].name, 'dan')
+        self.assertFalse(self.table['3'])
+        self.assertEqual([client.name for client in self.table.items(['30', '10'])], ['ana', 'Ana'])
+        self.assertEqual(self.table.query().where(lambda client: client.id > '2').count(), 2)
+
+    def test_order(self):
+        self.assertEqual([client.id for client in self.table.ordered('id')], ['2', '9', '10', '30'])
+        self.assertEqual([client.id for client in self.table.ordered('name', True)], ['9', '2', '10', '30'])
+        self.assertEqual([client.id for client in self.table.between('name', 'b', 'c')], ['2'])
+        self.assertEqual([client.id for client in self.table.between('id', (2, '10'))], ['10', '30'])
+
+    def test_page(self):
+        pages = [[client.id for client in page] for page in self.table.cursor('id', 3)]
+        self.assertEqual(pages, [['2', '9', '10'], ['30']])
+        items, token = self.table.page('name', 2)
+        self.table.connection.execute("DELETE FROM clients WHERE id = '2'")
+        self.assertEqual([client.id for client in self.table.page('name', 2, token)[0]], ['9'])
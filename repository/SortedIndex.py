@@ -0,0 +1,248 @@
+"""
+SortedIndex class
+"""
+from bisect import bisect_left, bisect_right, insort
+from unittest import TestCase
+
+from domain.Client import Client
+
+
+def id_key(id):
+    """
+    Sort key for ids: shorter ids first, so ids made of digits are ordered by their numeric value
+    """
+    return len(id), id
+
+
+class SortedIndex:
+    """
+    Secondary index keeping the ids of items sorted by a key
+    Items with the same key keep the order in which they were first added, in both directions.
+    Items whose key is None are not indexed.
+    Attributes:
+        key: function giving the value an item is sorted by - function
+        _entries: sorted list of (key, sequence number, id) - list of tuple
+        _by_id: maps every indexed id to its entry - dict
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        ids: all the ids, in order
+        between: the ids whose key is in a range, in order
+    """
+    def __init__(self, key):
+        self._key = key
+        self._entries = []
+        self._by_id = {}
+        self._sequence = 0
+
+    @property
+    def key(self):
+        return self._key
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries = []
+        self._by_id = {}
+
+    def add(self, item):
+        """
+        Adds the item to the index, or moves it to its new place if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        entry = self._by_id.pop(item.id, None)
+        if entry is None:
+            sequence = self._sequence
+            self._sequence += 1
+        else:
+            sequence = entry[1]
+            self._remove_entry(entry)
+        key = self._key(item)
+        if key is not None:
+            entry = (key, sequence, item.id)
+            insort(self._entries, entry)
+            self._by_id[item.id] = entry
+
+    def add_many(self, items):
+        """
+        Adds or refreshes several items, sorting the entries once instead of inserting them one by one
+        """
+        items = list(items)
+        if len(items) < 16:
+            for item in items:
+                self.add(item)
+            return
+        # The last version of an item is indexed, at the place of its first one, as with add
+        latest = {item.id: item for item in items}
+        sequences = {id: self._by_id[id][1] for id in latest if id in self._by_id}
+        self.discard_many(sequences)
+        for id, item in latest.items():
+            sequence = sequences.get(id)
+            if sequence is None:
+                sequence = self._sequence
+                self._sequence += 1
+            key = self._key(item)
+            if key is not None:
+                entry = (key, sequence, id)
+                self._entries.append(entry)
+                self._by_id[id] = entry
+        self._entries.sort()
+
+    def discard_many(self, ids):
+        """
+        Removes the items with the given ids, rebuilding the entries in a single pass
+        """
+        removed = set()
+        for id in ids:
+            entry = self._by_id.pop(id, None)
+            if entry is not None:
+                removed.add(entry[1])
+        if removed:
+            self._entries = [entry for entry in self._entries if entry[1] not in removed]
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        entry = self._by_id.pop(id, None)
+        if entry is not None:
+            self._remove_entry(entry)
+
+    def _remove_entry(self, entry):
+        del self._entries[bisect_left(self._entries, entry)]
+
+    def ids(self, reverse=False):
+        """
+        Returns: the indexed ids, sorted by key - generator
+        """
+        return self._ids(0, len(self._entries), reverse)
+
+    def between(self, low=None, high=None, reverse=False):
+        """
+        Finds the ids whose key is between low and high, both included
+        Args:
+            low: smallest key, None for no lower bound
+            high: largest key, None for no upper bound
+            reverse: descending order - bool
+
+        Returns: the ids, sorted by key - generator
+
+        """
+        start = 0 if low is None else bisect_left(self._entries, (low,))
+        stop = len(self._entries) if high is None else bisect_right(self._entries, (high, float('inf')))
+        return self._ids(start, stop, reverse)
+
+    def page(self, size, token=None):
+        """
+        Keyset pagination: finds the next ids in key order after the position described by a token
+        The token only depends on the last id returned, so pages stay consistent while items are added or removed.
+        Args:
+            size: maximum number of ids returned - int
+            token: token returned with the previous page, None for the first page - tuple
+
+        Returns: the ids of the page and the token of the next page, None if this is the last page - (list, tuple)
+
+        """
+        start = 0 if token is None else bisect_left(self._entries, (token[0], token[1] + 1))
+        stop = min(start + size, len(self._entries))
+        ids = [entry[2] for entry in self._entries[start:stop]]
+        if stop >= len(self._entries) or stop == start:
+            return ids, None
+        last = self._entries[stop - 1]
+        return ids, (last[0], last[1])
+
+    def _ids(self, start, stop, reverse):
+        if not reverse:
+            for i in range(start, stop):
+                yield self._entries[i][2]
+        else:
+            # Walks the keys backwards, but items with equal keys still come in the order they were added
+            while stop > start:
+                group = bisect_left(self._entries, (self._entries[stop - 1][0],), start, stop)
+                for i in range(group, stop):
+                    yield self._entries[i][2]
+                stop = group
+
+
+class TestSortedIndex(TestCase):
+    def setUp(self):
+        self.index = SortedIndex(lambda client: client.name)
+        self.clients = [Client('1', 'dan'), Client('2', 'ana'), Client('3', 'mara'), Client('4', 'ana')]
+        for client in self.clients:
+            self.index.add(client)
+
+    def test_ids(self):
+        self.assertEqual(list(self.index.ids()), ['2', '4', '1', '3'])
+        self.assertEqual(list(self.index.ids(reverse=True)), ['3', '1', '2', '4'])
+        self.assertEqual(len(self.index), 4)
+
+    def test_between(self):
+        self.assertEqual(list(self.index.between('ana', 'dan')), ['2', '4', '1'])
+        self.assertEqual(list(self.index.between('b')), ['1', '3'])
+        self.assertEqual(list(self.index.between(high='c')), ['2', '4'])
+        self.assertEqual(list(self.index.between('b', 'c')), [])
+        self.assertEqual(list(self.index.between('ana', 'dan', reverse=True)), ['1', '2', '4'])
+
+    def test_discard(self):
+        self.index.discard('2')
+        self.index.discard('7')
+        self.assertEqual(list(self.index.ids()), ['4', '1', '3'])
+
+    def test_update(self):
+        self.clients[1].name = 'zoe'
+        self.index.add(self.clients[1])
+        self.assertEqual(list(self.index.ids()), ['4', '1', '3', '2'])
+        self.clients[1].name = 'ana'
+        self.index.add(self.clients[1])
+        self.assertEqual(list(self.index.ids()), ['2', '4', '1', '3'])
+
+    def test_none_keys(self):
+        self.clients[0].name = None
+        self.index.add(self.clients[0])
+        self.assertEqual(list(self.index.ids()), ['2', '4', '3'])
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+
+    def test_id_key(self):
+        self.assertEqual(sorted(['10', '9', '021', '100', 'b', 'a1'], key=id_key), ['9', 'b', '10', 'a1', '021', '100'])
+
+    def test_add_many(self):
+        clients = [Client(str(i), 'name' + str(i % 7)) for i in range(5, 40)]
+        self.index.add_many(clients)
+        self.clients[0].name = 'zed'
+        self.index.add_many([self.clients[0]])
+        expected = sorted(self.clients + clients, key=lambda client: client.name)
+        self.assertEqual(list(self.index.ids()), [client.id for client in expected])
+
+    def test_add_many_keeps_order(self):
+        clients = [Client(str(i), 'ana') for i in range(5, 25)]
+        self.index.add_many(clients)
+        self.clients[1].name = 'ana'
+        self.index.add_many([self.clients[1]] + clients + [self.clients[3]])
+        bulk = list(self.index.ids())
+        for client in [self.clients[1]] + clients + [self.clients[3]]:
+            self.index.add(client)
+        self.assertEqual(list(self.index.ids()), bulk)
+        self.assertEqual(bulk[:3], ['2', '4', '5'])
+        self.assertEqual(len(self.index), 24)
+
+    def test_discard_many(self):
+        self.index.discard_many(['2', '3', '9'])
+        self.assertEqual(list(self.index.ids()), ['4', '1'])
+        self.index.add(self.clients[1])
+        self.assertEqual(list(self.index.ids()), ['4', '2', '1'])
+
+    def test_page(self):
+        ids, token = self.index.page(3)
+        self.assertEqual(ids, ['2', '4', '1'])
+        self.index.discard('1')
+        self.index.add(Client('5', 'bob'))
+        self.index.add(Client('6', 'zoe'))
+        ids, token = self.index.page(3, token)
+        self.assertEqual(ids, ['3', '6'])
+        self.assertIsNone(token)
+        self.assertEqual(self.index.page(10), (['2', '4', '5', '3', '6'], None))
+        self.assertEqual(self.index.page(0), ([], None))
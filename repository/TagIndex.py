@@ -0,0 +1,254 @@
+"""
+TagIndex class
+"""
+import re
+from unittest import TestCase
+
+from domain.Movie import Movie
+
+
+class TagIndexError(Exception):
+    def __init__(self, message):
+        self._message = message
+
+
+def tags(text):
+    """
+    Parses a comma separated list of tags, like 'Animation, adventure'
+    Returns: the distinct tags, lowercase and with single spaces - set of string
+    """
+    return {' '.join(tag.lower().split()) for tag in text.split(',') if tag.strip()}
+
+
+def evaluate(query, index):
+    """
+    Evaluates a query made of terms, AND, OR, NOT and parentheses over the posting sets of an index
+    The index gives the sequence numbers of the items matching a term with _posting(term), and of all its items with
+    _all(), as TagIndex and TokenIndex do.
+    Args:
+        query: the query - string
+        index: the index searched - TagIndex or TokenIndex
+
+    Returns: the sequence numbers of the matching items - set
+    Raises TagIndexError if the query is malformed
+    """
+    tokens = re.findall(r'\(|\)|[^\s()]+', query)
+    parser = _QueryParser(tokens, index)
+    sequences = parser.expression()
+    if parser.position != len(tokens):
+        raise TagIndexError("Unexpected '" + tokens[parser.position] + "' in the query")
+    return sequences
+
+
+class TagIndex:
+    """
+    Index of the items by the tags of a field, answering set-algebra queries such as 'action AND NOT animation'
+    Every tag has the set of sequence numbers of the items having it, so a query costs set operations on the sets of
+    the tags it names instead of a pass over every item.
+    Attributes:
+        text: function giving the comma separated tags of an item - function
+        _postings: maps every tag to the sequence numbers of the items having it - dict of set
+        _by_id: maps every indexed id to its sequence number and tags - dict
+        _ids: maps sequence numbers back to ids, in the order the items were added - dict
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        search: the ids of the items matching a query
+        counts: the number of items having every tag
+    """
+    def __init__(self, text):
+        self._text = text
+        self._postings = {}
+        self._by_id = {}
+        self._ids = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._postings = {}
+        self._by_id = {}
+        self._ids = {}
+
+    def add(self, item):
+        """
+        Adds the item to the index, or updates its tags if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        new = tags(self._text(item))
+        entry = self._by_id.get(item.id)
+        if entry is None:
+            sequence = self._sequence
+            self._sequence += 1
+            old = set()
+        else:
+            sequence, old = entry
+        for tag in old - new:
+            self._remove_posting(tag, sequence)
+        for tag in new - old:
+            self._postings.setdefault(tag, set()).add(sequence)
+        self._by_id[item.id] = (sequence, new)
+        self._ids[sequence] = item.id
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        entry = self._by_id.pop(id, None)
+        if entry is not None:
+            sequence, item_tags = entry
+            for tag in item_tags:
+                self._remove_posting(tag, sequence)
+            del self._ids[sequence]
+
+    def discard_many(self, ids):
+        for id in ids:
+            self.discard(id)
+
+    def _remove_posting(self, tag, sequence):
+        posting = self._postings[tag]
+        posting.discard(sequence)
+        if not posting:
+            del self._postings[tag]
+
+    def tags(self):
+        """
+        Returns: the tags of the indexed items - list of string
+        """
+        return list(self._postings)
+
+    def counts(self):
+        """
+        Returns: the number of items having every tag - dict
+        """
+        return {tag: len(posting) for tag, posting in self._postings.items()}
+
+    def search(self, query):
+        """
+        Finds the items matching a query made of tags, AND, OR, NOT and parentheses
+        NOT binds tightest and AND binds tighter than OR, so 'a OR b AND NOT c' means 'a OR (b AND (NOT c))'.
+        Consecutive words form one tag, as in 'science fiction'. Tags are case insensitive.
+        Args:
+            query: the query - string
+
+        Returns: the ids, in the order the items were added - list
+        Raises TagIndexError if the query is malformed
+        """
+        return [self._ids[sequence] for sequence in sorted(evaluate(query, self))]
+
+    def _posting(self, tag):
+        return self._postings.get(tag, set())
+
+    def _all(self):
+        return self._ids.keys()
+
+
+class _QueryParser:
+    """
+    Recursive descent parser evaluating a query while reading it
+        expression: term (OR term)*
+        term: factor (AND factor)*
+        factor: NOT factor | ( expression ) | tag
+    A tag is made of the consecutive words between the keywords, the index decides what it matches.
+    """
+    KEYWORDS = ('AND', 'OR', 'NOT', '(', ')')
+
+    def __init__(self, tokens, index):
+        self._tokens = tokens
+        self._index = index
+        self.position = 0
+
+    def _peek(self):
+        return self._tokens[self.position] if self.position < len(self._tokens) else None
+
+    def expression(self):
+        result = self.term()
+        while self._peek() == 'OR':
+            self.position += 1
+            result |= self.term()
+        return result
+
+    def term(self):
+        """
+        Intersects the positive factors from the smallest one, then removes the negated ones,
+        so 'a AND NOT b' costs the size of a and not the size of the whole index
+        """
+        included = []
+        excluded = []
+        self._factor(included, excluded)
+        while self._peek() == 'AND':
+            self.position += 1
+            self._factor(included, excluded)
+        if included:
+            included.sort(key=len)
+            result = set(included[0])
+            for sequences in included[1:]:
+                result &= sequences
+        else:
+            result = set(self._index._all())
+        for sequences in excluded:
+            result -= sequences
+        return result
+
+    def _factor(self, included, excluded):
+        negated = False
+        while self._peek() == 'NOT':
+            self.position += 1
+            negated = not negated
+        token = self._peek()
+        if token == '(':
+            self.position += 1
+            sequences = self.expression()
+            if self._peek() != ')':
+                raise TagIndexError("Missing ')' in the query")
+            self.position += 1
+        elif token is None or token in self.KEYWORDS:
+            raise TagIndexError("Missing tag in the query")
+        else:
+            words = []
+            while self._peek() is not None and self._peek() not in self.KEYWORDS:
+                words.append(self._peek())
+                self.position += 1
+            sequences = self._index._posting(' '.join(words).lower())
+        (excluded if negated else included).append(sequences)
+
+
+class TestTagIndex(TestCase):
+    def setUp(self):
+        self.index = TagIndex(lambda movie: movie.genre)
+        self.index.add_many([Movie('1', 'a', 'a', 'Action'), Movie('2', 'a', 'a', 'non-action, comedy'),
+                             Movie('3', 'a', 'a', 'animation, action'), Movie('4', 'a', 'a', 'Science  Fiction'),
+                             Movie('5', 'a', 'a', 'comedy, animation')])
+
+    def test_tags(self):
+        self.assertEqual(tags('Animation,  adventure ,'), {'animation', 'adventure'})
+        self.assertEqual(tags('Science  Fiction'), {'science fiction'})
+
+    def test_search(self):
+        self.assertEqual(self.index.search('action'), ['1', '3'])
+        self.assertEqual(self.index.search('action AND NOT animation'), ['1'])
+        self.assertEqual(self.index.search('action OR comedy'), ['1', '2', '3', '5'])
+        self.assertEqual(self.index.search('NOT action'), ['2', '4', '5'])
+        self.assertEqual(self.index.search('comedy AND (animation OR non-action)'), ['2', '5'])
+        self.assertEqual(self.index.search('action OR comedy AND NOT animation'), ['1', '2', '3'])
+        self.assertEqual(self.index.search('science fiction'), ['4'])
+        self.assertEqual(self.index.search('horror'), [])
+        for query in ['', 'action AND', '(action', 'action )', 'NOT']:
+            with self.assertRaises(TagIndexError):
+                self.index.search(query)
+
+    def test_update(self):
+        self.index.add(Movie('1', 'a', 'a', 'comedy'))
+        self.assertEqual(self.index.search('action'), ['3'])
+        self.index.discard('5')
+        self.assertEqual(self.index.counts(), {'non-action': 1, 'comedy': 2, 'animation': 1, 'action': 1,
+                                               'science fiction': 1})
+        self.index.discard_many(['2', '3'])
+        self.assertEqual(sorted(self.index.tags()), ['comedy', 'science fiction'])
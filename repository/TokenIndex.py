@@ -0,0 +1,239 @@
+"""
+TokenIndex class
+"""
+import re
+from bisect import bisect_left, insort
+from heapq import merge
+from unittest import TestCase
+
+from domain.Movie import Movie
+from repository.TagIndex import TagIndexError, evaluate
+
+
+def tokens(text):
+    """
+    Splits a text into its normalised words: lowercase, letters and digits only
+    Returns: the distinct words - set of string
+    """
+    return set(re.findall(r'\w+', text.lower()))
+
+
+def intersect(first, second):
+    """
+    Intersects two sorted lists, searching the elements of the shorter one in the longer one
+    Returns: the common elements, sorted - list
+    """
+    if len(first) > len(second):
+        first, second = second, first
+    result = []
+    position = 0
+    for element in first:
+        position = bisect_left(second, element, position)
+        if position == len(second):
+            break
+        if second[position] == element:
+            result.append(element)
+    return result
+
+
+class TokenIndex:
+    """
+    Inverted index from the words of a text field to the ids of the items containing them
+    Every item gets a sequence number when it is first added, the posting lists are sorted lists of sequence numbers,
+    so matches come out in the order the items were added.
+    Attributes:
+        text: function giving the text of an item that is split into words - function
+        _postings: maps every word to the sorted sequence numbers of the items containing it - dict
+        _by_id: maps every indexed id to its sequence number and words - dict
+        _ids: maps sequence numbers back to ids - dict
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        match_all: the ids of the items containing all the words of a query
+        match_any: the ids of the items containing at least one word of a query
+        search: the ids of the items matching a query of words joined by AND, OR and NOT
+    """
+    def __init__(self, text):
+        self._text = text
+        self._postings = {}
+        self._by_id = {}
+        self._ids = {}
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._postings = {}
+        self._by_id = {}
+        self._ids = {}
+
+    def add(self, item):
+        """
+        Adds the item to the index, or updates its words if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        words = tokens(self._text(item))
+        entry = self._by_id.get(item.id)
+        if entry is None:
+            sequence = self._sequence
+            self._sequence += 1
+            old_words = set()
+        else:
+            sequence, old_words = entry
+        for word in old_words - words:
+            self._remove_posting(word, sequence)
+        for word in words - old_words:
+            posting = self._postings.setdefault(word, [])
+            if not posting or posting[-1] < sequence:
+                posting.append(sequence)
+            else:
+                insort(posting, sequence)
+        self._by_id[item.id] = (sequence, words)
+        self._ids[sequence] = item.id
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        entry = self._by_id.pop(id, None)
+        if entry is not None:
+            sequence, words = entry
+            for word in words:
+                self._remove_posting(word, sequence)
+            del self._ids[sequence]
+
+    def discard_many(self, ids):
+        """
+        Removes the items with the given ids, rebuilding every posting list that changes once
+        """
+        removed = {}
+        for id in ids:
+            entry = self._by_id.pop(id, None)
+            if entry is not None:
+                sequence, words = entry
+                del self._ids[sequence]
+                for word in words:
+                    removed.setdefault(word, set()).add(sequence)
+        for word, sequences in removed.items():
+            posting = [sequence for sequence in self._postings[word] if sequence not in sequences]
+            if posting:
+                self._postings[word] = posting
+            else:
+                del self._postings[word]
+
+    def _remove_posting(self, word, sequence):
+        posting = self._postings[word]
+        del posting[bisect_left(posting, sequence)]
+        if not posting:
+            del self._postings[word]
+
+    def match_all(self, query):
+        """
+        Finds the items containing every word of the query, intersecting the posting lists from the shortest one
+        Args:
+            query: the words searched for - string
+
+        Returns: the ids, in the order the items were added - list
+        """
+        return [self._ids[sequence] for sequence in self._match_all(tokens(query))]
+
+    def _match_all(self, words):
+        """
+        Returns: the sorted sequence numbers of the items containing every word - list
+        """
+        if not words:
+            return []
+        postings = sorted((self._postings.get(word, []) for word in words), key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            if not result:
+                break
+            result = intersect(result, posting)
+        return result
+
+    def match_any(self, query):
+        """
+        Finds the items containing at least one word of the query, merging the posting lists
+        Args:
+            query: the words searched for - string
+
+        Returns: the ids, in the order the items were added - list
+        """
+        result = []
+        last = None
+        for sequence in merge(*(self._postings.get(word, []) for word in tokens(query))):
+            if sequence != last:
+                result.append(self._ids[sequence])
+                last = sequence
+        return result
+
+    def search(self, query):
+        """
+        Finds the items matching a query of words joined by AND, OR, NOT and parentheses, such as
+        'space AND (war OR alien)'
+        Consecutive words must all be in the text, as if joined by AND. NOT binds tightest and AND binds tighter than
+        OR, as in TagIndex.search.
+        Args:
+            query: the query - string
+
+        Returns: the ids, in the order the items were added - list
+        Raises TagIndexError if the query is malformed
+        """
+        return [self._ids[sequence] for sequence in sorted(evaluate(query, self))]
+
+    def _posting(self, words):
+        return set(self._match_all(tokens(words)))
+
+    def _all(self):
+        return self._ids.keys()
+
+
+class TestTokenIndex(TestCase):
+    def setUp(self):
+        self.index = TokenIndex(lambda movie: movie.title)
+        self.index.add_many([Movie('1', 'The Lord of the Rings', 'a', 'a'), Movie('2', 'Rings', 'a', 'a'),
+                             Movie('3', 'The Two Towers', 'a', 'a'), Movie('4', 'Lord of War', 'a', 'a')])
+
+    def test_tokens(self):
+        self.assertEqual(tokens('Cars, cars 2!'), {'cars', '2'})
+        self.assertEqual(tokens(' '), set())
+
+    def test_intersect(self):
+        self.assertEqual(intersect([1, 3, 5, 7], [0, 3, 4, 7, 9]), [3, 7])
+        self.assertEqual(intersect([], [1]), [])
+
+    def test_match_all(self):
+        self.assertEqual(self.index.match_all('lord RINGS'), ['1'])
+        self.assertEqual(self.index.match_all('the'), ['1', '3'])
+        self.assertEqual(self.index.match_all('lord hobbit'), [])
+        self.assertEqual(self.index.match_all(''), [])
+
+    def test_match_any(self):
+        self.assertEqual(self.index.match_any('rings towers'), ['1', '2', '3'])
+        self.assertEqual(self.index.match_any('war lord'), ['1', '4'])
+
+    def test_search(self):
+        self.assertEqual(self.index.search('lord rings'), ['1'])
+        self.assertEqual(self.index.search('the AND towers OR war'), ['3', '4'])
+        self.assertEqual(self.index.search('the AND (towers OR war)'), ['3'])
+        self.assertEqual(self.index.search('rings AND NOT lord'), ['2'])
+        self.assertEqual(self.index.search('NOT the'), ['2', '4'])
+        with self.assertRaises(TagIndexError):
+            self.index.search('lord OR')
+
+    def test_update(self):
+        self.index.add(Movie('2', 'Towers of War', 'a', 'a'))
+        self.assertEqual(self.index.match_all('rings'), ['1'])
+        self.assertEqual(self.index.match_any('towers'), ['2', '3'])
+        self.index.discard('3')
+        self.assertEqual(self.index.match_all('towers'), ['2'])
+        self.index.discard_many(['1', '4', '9'])
+        self.assertEqual(self.index.match_any('lord the'), [])
+        self.assertEqual(len(self.index), 1)
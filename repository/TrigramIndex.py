@@ -0,0 +1,197 @@
+"""
+TrigramIndex class
+"""
+from array import array
+from bisect import bisect_left
+from unittest import TestCase
+
+from domain.Client import Client
+from repository.TokenIndex import intersect
+
+
+def trigrams(text):
+    """
+    Returns: the distinct substrings of length 3 of the text - set of string
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Index answering substring queries, like str.find, over a text field
+    Maps every trigram to the sorted sequence numbers of the items whose text contains it. A query is answered by
+    intersecting the posting lists of its trigrams and checking the few candidates left, so the time taken depends
+    on the number of matches and not on the number of items.
+    Queries shorter than a trigram are answered by scanning the texts, stopping once the limit is reached.
+    Attributes:
+        text: function giving the text of an item, the queries are matched against it as given - function
+        _postings: maps every trigram to the sequence numbers of the items containing it - dict of array
+        _by_id: maps every indexed id to its sequence number - dict
+        _ids, _texts: id and text of the item with each sequence number, None once discarded - list
+
+    Methods:
+        add: adds or refreshes an item
+        discard: removes the item with the given id
+        search: the ids of the items whose text contains a string
+    """
+    def __init__(self, text):
+        self._text = text
+        self.clear()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def clear(self):
+        self._postings = {}
+        self._by_id = {}
+        self._ids = []
+        self._texts = []
+
+    def add(self, item):
+        """
+        Adds the item to the index, or updates its trigrams if it was already indexed
+        Args:
+            item: the item to be indexed, must have an id
+        """
+        self._store(item.id, self._text(item))
+
+    def _store(self, id, text):
+        sequence = self._by_id.get(id)
+        if sequence is None:
+            sequence = len(self._ids)
+            self._ids.append(id)
+            self._texts.append(text)
+            self._by_id[id] = sequence
+            old = set()
+        else:
+            old = trigrams(self._texts[sequence])
+            self._texts[sequence] = text
+        new = trigrams(text)
+        for gram in old - new:
+            self._remove_posting(gram, sequence)
+        for gram in new - old:
+            posting = self._postings.get(gram)
+            if posting is None:
+                self._postings[gram] = array('i', [sequence])
+            elif posting[-1] < sequence:
+                posting.append(sequence)
+            else:
+                posting.insert(bisect_left(posting, sequence), sequence)
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def discard(self, id):
+        """
+        Removes the item with the given id from the index, if indexed
+        """
+        sequence = self._by_id.pop(id, None)
+        if sequence is not None:
+            for gram in trigrams(self._texts[sequence]):
+                self._remove_posting(gram, sequence)
+            self._ids[sequence] = None
+            self._texts[sequence] = None
+            self._compact()
+
+    def discard_many(self, ids):
+        """
+        Removes the items with the given ids, rebuilding every posting list that changes once
+        """
+        removed = {}
+        for id in ids:
+            sequence = self._by_id.pop(id, None)
+            if sequence is not None:
+                for gram in trigrams(self._texts[sequence]):
+                    removed.setdefault(gram, set()).add(sequence)
+                self._ids[sequence] = None
+                self._texts[sequence] = None
+        for gram, sequences in removed.items():
+            posting = array('i', (sequence for sequence in self._postings[gram] if sequence not in sequences))
+            if posting:
+                self._postings[gram] = posting
+            else:
+                del self._postings[gram]
+        self._compact()
+
+    def _compact(self):
+        """
+        Renumbers the items once more than half of the sequence numbers belong to discarded items
+        """
+        if len(self._ids) > 2 * len(self._by_id) + 16:
+            live = [(id, text) for id, text in zip(self._ids, self._texts) if id is not None]
+            self.clear()
+            for id, text in live:
+                self._store(id, text)
+
+    def _remove_posting(self, gram, sequence):
+        posting = self._postings[gram]
+        del posting[bisect_left(posting, sequence)]
+        if not posting:
+            del self._postings[gram]
+
+    def search(self, query, limit=None):
+        """
+        Finds the items whose text contains the query
+        Args:
+            query: the string searched for - string
+            limit: maximum number of ids returned, None for all - int
+
+        Returns: the ids, in the order the items were first added - list
+        """
+        if len(query) < 3:
+            candidates = range(len(self._texts))
+        else:
+            postings = sorted((self._postings.get(gram, ()) for gram in trigrams(query)), key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates = intersect(candidates, posting)
+        result = []
+        for sequence in candidates:
+            if limit is not None and len(result) >= limit:
+                break
+            text = self._texts[sequence]
+            if text is not None and query in text:
+                result.append(self._ids[sequence])
+        return result
+
+
+class TestTrigramIndex(TestCase):
+    def setUp(self):
+        self.index = TrigramIndex(lambda client: client.name.lower())
+        self.index.add_many([Client('1', 'Ana Maria'), Client('2', 'Marian'), Client('3', 'Ioana'),
+                             Client('4', 'Mariana')])
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('anan'), {'ana', 'nan'})
+        self.assertEqual(trigrams('an'), set())
+
+    def test_search(self):
+        self.assertEqual(self.index.search('mari'), ['1', '2', '4'])
+        self.assertEqual(self.index.search('ana'), ['1', '3', '4'])
+        self.assertEqual(self.index.search('mariana'), ['4'])
+        self.assertEqual(self.index.search('a m'), ['1'])
+        self.assertEqual(self.index.search('xyz'), [])
+        self.assertEqual(self.index.search('an'), ['1', '2', '3', '4'])
+        self.assertEqual(self.index.search('an', limit=2), ['1', '2'])
+        self.assertEqual(self.index.search('maria', limit=1), ['1'])
+        self.assertEqual(len(self.index.search('')), 4)
+
+    def test_update(self):
+        self.index.add(Client('2', 'Dan'))
+        self.assertEqual(self.index.search('mari'), ['1', '4'])
+        self.assertEqual(self.index.search('dan'), ['2'])
+        self.index.discard('1')
+        self.assertEqual(self.index.search('ana'), ['3', '4'])
+        self.index.discard_many(['3', '4', '9'])
+        self.assertEqual(self.index.search('a'), ['2'])
+        self.assertEqual(len(self.index), 1)
+
+    def test_compact(self):
+        self.index.add_many(Client(str(i), 'name' + str(i)) for i in range(10, 60))
+        self.index.discard_many(str(i) for i in range(10, 55))
+        self.assertLess(len(self.index._ids), 30)
+        self.assertEqual(self.index.search('me5'), ['55', '56', '57', '58', '59'])
+        self.assertEqual(self.index.search('ana'), ['1', '3', '4'])
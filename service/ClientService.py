@@ -4,9 +4,10 @@ from datetime import date
 from domain.Client import Client
 from domain.Movie import Movie
 from domain.Rental import Rental
+from domain.RentalKey import RentalKey
 from repository.ClientBase import ClientBase, ClientBaseError
 from repository.MovieCollection import MovieCollection
-from repository.RentalHistory import RentalHistory
+from repository.RentalHistory import RentalHistory, RentalHistoryError
 from service.UndoService import FunctionCall, Operation, UndoService, CascadedOperation
 
 
@@ -28,6 +29,7 @@ class ClientService:
 
     Methods:
         remove_client: removes client from the repo and all the rental associated to it
+        update_client_id: changes the id of a client and of its rentals
     """
     def __init__(self, client_base=None, movie_collection=None, rental_history=None, undo_service=None):
         if client_base is None:
@@ -87,7 +89,7 @@ class ClientService:
         """
         casop = CascadedOperation()
 
-        rental_list = list(filter(lambda x: x.client_id == client_id, self.rental_repo.list))
+        rental_list = self.rental_repo.rentals_of_client(client_id)
         ok = True
         for rt in rental_list:
             if rt.returned_date is None:
@@ -95,11 +97,11 @@ class ClientService:
         if not ok:
             raise ClientServiceError("Client can't be removed as it has a rental in process")
         else:
-            for rental in rental_list:
-                op = Operation(FunctionCall(self.rental_repo.add_rental, rental),
-                               FunctionCall(self.rental_repo.remove_rental, rental.id))
-                casop.add_operation(op)
-                self.rental_repo.remove_rental(rental.id)
+            rental_ids = [rental.id for rental in rental_list]
+            op = Operation(FunctionCall(self.rental_repo.add_many, rental_list),
+                           FunctionCall(self.rental_repo.remove_many, rental_ids))
+            casop.add_operation(op)
+            self.rental_repo.remove_many(rental_ids)
 
             client = self.client_repo.find_client(client_id)
             op = Operation(FunctionCall(self.client_repo.add_client, client),
@@ -155,6 +157,34 @@ class ClientService:
         self.client_repo.update_client_worthy(client_id, worth)
         self.undo_service.record(op)
 
+    def update_client_id(self, client_id, new_id):
+        """
+        Changes the id of a client and of all its rentals, as a single operation to be undone
+        Only the rentals of the client are gone through, and each repository is saved once.
+        Args:
+            client_id: current id of the client - string
+            new_id: replacement id - string
+
+        Returns:
+        Raises ClientBaseError if the client is not found or the new id is already taken,
+            RentalHistoryError if a rental would get the id of another one, in which case nothing changes
+        """
+        self.client_repo.update_client_id(client_id, new_id)
+        try:
+            moved = self.rental_repo.update_rentals_client_id(client_id, new_id)
+        except RentalHistoryError:
+            self.client_repo.update_client_id(new_id, client_id)
+            raise
+        casop = CascadedOperation()
+        casop.add_operation(Operation(FunctionCall(self.client_repo.update_client_id, new_id, client_id),
+                                      FunctionCall(self.client_repo.update_client_id, client_id, new_id)))
+        # Only the rentals moved are moved back, not the ones that already had the new id
+        restored = {rental.id: Rental(rental.movie_id, client_id, rental.rented_date, rental.due_date,
+                                      rental.returned_date) for rental in moved.values()}
+        casop.add_operation(Operation(FunctionCall(self.rental_repo.rekey_many, restored),
+                                      FunctionCall(self.rental_repo.rekey_many, moved)))
+        self.undo_service.record(casop)
+
 
 class TestClientService(unittest.TestCase):
     def setUp(self):
@@ -178,6 +208,17 @@ class TestClientService(unittest.TestCase):
         self.assertEqual(len(self.cs.rental_repo.list), 0)
         self.assertEqual(len(self.cs.client_repo.list), 0)
 
+    def test_remove_client_with_rentals(self):
+        self.cs.rental_repo.add_rental(Rental('566', '213', date(2, 3, 2), date(2, 3, 10), date(2, 3, 9)))
+        self.cs.client_repo.add_client(Client('214', 'Dana', True))
+        self.cs.rental_repo.add_rental(Rental('566', '214', date(2, 4, 2), date(2, 4, 10), date(2, 4, 9)))
+        self.cs.remove_client('213')
+        self.assertEqual([rental.client_id for rental in self.cs.rental_repo.list], ['214'])
+        self.cs.undo_service.undo()
+        self.assertEqual(len(self.cs.rental_repo.list), 3)
+        self.cs.undo_service.redo()
+        self.assertEqual(len(self.cs.rental_repo.list), 1)
+
     def test_add_client(self):
         self.cs.add_client(Client('1', 'a'))
         self.assertEqual(len(self.cs.client_repo.list), 2)
@@ -202,3 +243,27 @@ class TestClientService(unittest.TestCase):
         self.cs.undo_service.redo()
         self.assertEqual(self.cs.client_repo.find_client('213').worthy, False)
 
+    def test_update_client_id(self):
+        self.cs.rental_repo.add_rental(Rental('566', '213', date(2, 3, 2), date(2, 3, 10)))
+        self.cs.client_repo.add_client(Client('214', 'Dana', True))
+        self.cs.update_client_id('213', '1')
+        self.assertFalse(self.cs.client_repo.find_client('213'))
+        self.assertEqual(len(self.cs.rental_repo.rentals_of_client('1')), 2)
+        self.assertTrue(self.cs.rental_repo.find_rental_by_id(RentalKey('566', '1', date(2, 3, 2), date(2, 3, 10))))
+        with self.assertRaises(ClientBaseError):
+            self.cs.update_client_id('1', '214')
+        self.cs.undo_service.undo()
+        self.assertEqual(self.cs.client_repo.find_client('213').name, 'Mirel')
+        self.assertEqual(len(self.cs.rental_repo.rentals_of_client('213')), 2)
+        self.assertEqual(self.cs.rental_repo.rentals_of_client('1'), [])
+        self.cs.undo_service.redo()
+        self.assertEqual(len(self.cs.rental_repo.rentals_of_client('1')), 2)
+
+    def test_update_client_id_undo_keeps_orphans(self):
+        self.cs.rental_repo.add_rental(Rental('566', '1', date(2, 5, 2), date(2, 5, 10)))
+        self.cs.update_client_id('213', '1')
+        self.cs.undo_service.undo()
+        self.assertEqual([rental.rented_date for rental in self.cs.rental_repo.rentals_of_client('1')], [date(2, 5, 2)])
+        self.assertEqual(len(self.cs.rental_repo.rentals_of_client('213')), 1)
+        self.cs.undo_service.redo()
+        self.assertEqual(len(self.cs.rental_repo.rentals_of_client('1')), 2)
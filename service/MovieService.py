@@ -9,7 +9,7 @@ from domain.Movie import Movie
 from domain.Rental import Rental
 from repository.ClientBase import ClientBase
 from repository.MovieCollection import MovieCollection
-from repository.RentalHistory import RentalHistory
+from repository.RentalHistory import RentalHistory, RentalHistoryError
 from service.UndoService import FunctionCall, Operation, UndoService, CascadedOperation
 
 
@@ -30,6 +30,7 @@ class MovieService:
         rental_repo = rental repository - RentalHistory
     Methods:
         remove_movie: removes a movie from the repo and all rental associated to it
+        update_movie_id: changes the id of a movie and of its rentals
     """
     def __init__(self, client_base=None, movie_collection=None, rental_history=None, undo_service=None):
         if client_base is None:
@@ -71,7 +72,7 @@ class MovieService:
 
         """
         casop = CascadedOperation()
-        rental_list = list(filter(lambda x: x.movie_id == movie_id, self.rental_repo.list))
+        rental_list = self.rental_repo.rentals_of_movie(movie_id)
         ok = True
         for rt in rental_list:
             if rt.returned_date is None:
@@ -79,11 +80,11 @@ class MovieService:
         if not ok:
             raise MovieServiceError("Movie can't be removed as it has a rental in process")
         else:
-            for rental in rental_list:
-                self.rental_repo.remove_rental(rental.id)
-                op = Operation(FunctionCall(self.rental_repo.add_rental, rental),
-                               FunctionCall(self.rental_repo.remove_rental, rental.id))
-                casop.add_operation(op)
+            rental_ids = [rental.id for rental in rental_list]
+            self.rental_repo.remove_many(rental_ids)
+            op = Operation(FunctionCall(self.rental_repo.add_many, rental_list),
+                           FunctionCall(self.rental_repo.remove_many, rental_ids))
+            casop.add_operation(op)
 
             movie = self.movie_repo.find_movie(movie_id)
             op = Operation(FunctionCall(self.movie_repo.add_movie, movie),
@@ -144,6 +145,34 @@ class MovieService:
         self.undo_service.record(op)
         self.movie_repo.update_movie_genre(movie_id, value)
 
+    def update_movie_id(self, movie_id, new_id):
+        """
+        Changes the id of a movie and of all its rentals, as a single operation to be undone
+        Only the rentals of the movie are gone through, and each repository is saved once.
+        Args:
+            movie_id: current id of the movie - string
+            new_id: replacement id - string
+
+        Returns:
+        Raises MovieCollectionError if the movie is not found or the new id is already taken,
+            RentalHistoryError if a rental would get the id of another one, in which case nothing changes
+        """
+        self.movie_repo.update_movie_id(movie_id, new_id)
+        try:
+            moved = self.rental_repo.update_rentals_movie_id(movie_id, new_id)
+        except RentalHistoryError:
+            self.movie_repo.update_movie_id(new_id, movie_id)
+            raise
+        casop = CascadedOperation()
+        casop.add_operation(Operation(FunctionCall(self.movie_repo.update_movie_id, new_id, movie_id),
+                                      FunctionCall(self.movie_repo.update_movie_id, movie_id, new_id)))
+        # Only the rentals moved are moved back, not the ones that already had the new id
+        restored = {rental.id: Rental(movie_id, rental.client_id, rental.rented_date, rental.due_date,
+                                      rental.returned_date) for rental in moved.values()}
+        casop.add_operation(Operation(FunctionCall(self.rental_repo.rekey_many, restored),
+                                      FunctionCall(self.rental_repo.rekey_many, moved)))
+        self.undo_service.record(casop)
+
 
 class TestMovieService(unittest.TestCase):
     def setUp(self):
@@ -191,4 +220,29 @@ class TestMovieService(unittest.TestCase):
         self.ms.undo_service.undo()
         self.assertEqual(self.ms.movie_repo.find_movie('566').genre, 'animation, adventure')
         self.ms.undo_service.redo()
-        self.assertEqual(self.ms.movie_repo.find_movie('566').genre, 'a')
\ No newline at end of file
+        self.assertEqual(self.ms.movie_repo.find_movie('566').genre, 'a')
+
+    def test_update_movie_id(self):
+        self.ms.movie_repo.add_movie(Movie('1', 'Up', 'UP', 'animation'))
+        self.ms.rental_repo.add_rental(Rental('1', '213', date(2, 2, 2), date(2, 2, 10)))
+        self.ms.update_movie_id('566', '2')
+        self.assertEqual(self.ms.movie_repo.find_movie('2').title, 'Cars')
+        self.assertEqual([rental.movie_id for rental in self.ms.rental_repo.rentals_of_client('213')], ['1', '2'])
+        self.ms.rental_repo.add_rental(Rental('3', '213', date(2, 2, 2), date(2, 2, 10)))
+        with self.assertRaises(RentalHistoryError):
+            self.ms.update_movie_id('1', '3')
+        self.assertEqual(self.ms.movie_repo.find_movie('1').title, 'Up')
+        self.assertFalse(self.ms.movie_repo.find_movie('3'))
+        self.ms.undo_service.undo()
+        self.assertEqual(self.ms.movie_repo.find_movie('566').title, 'Cars')
+        self.assertEqual(self.ms.rental_repo.rentals_of_movie('2'), [])
+        self.assertEqual(len(self.ms.rental_repo.rentals_of_movie('566')), 1)
+
+    def test_update_movie_id_undo_keeps_orphans(self):
+        self.ms.rental_repo.add_rental(Rental('2', '213', date(2, 5, 2), date(2, 5, 10)))
+        self.ms.update_movie_id('566', '2')
+        self.ms.undo_service.undo()
+        self.assertEqual([rental.rented_date for rental in self.ms.rental_repo.rentals_of_movie('2')], [date(2, 5, 2)])
+        self.assertEqual(len(self.ms.rental_repo.rentals_of_movie('566')), 1)
+        self.ms.undo_service.redo()
+        self.assertEqual(len(self.ms.rental_repo.rentals_of_movie('2')), 2)
@@ -5,14 +5,13 @@ RentalService class
 from datetime import date
 import unittest
 
-import self as self
-
 from domain.Client import Client
 from domain.Movie import Movie
-from repository.MovieCollection import MovieCollection
+from repository.MovieCollection import MovieCollection, MovieCollectionError
 from repository.ClientBase import *
 from repository.RentalHistory import RentalHistory, RentalHistoryError
 from domain.Rental import Rental
+from domain.RentalKey import RentalKey
 from service.UndoService import FunctionCall, Operation, UndoService
 
 
@@ -32,6 +31,8 @@ class RentalService:
     Methods:
         is_client_worthy: checks if a client can rent a movie
         is_movie_available: checks if a movie is available for renting
+        available_movies: the movies not rented between two dates
+        next_free_window: the first days a movie is not rented
         rent_movie: a client rents a movie
         return_movie: a client returns a movie
     """
@@ -95,19 +96,36 @@ class RentalService:
         Returns: True if available, False is not
 
         """
-        available_date = date(1, 1, 1)
-        rental_list = list(filter(lambda x: x.movie_id == movie_id, self.rental_repo.list))
-        for rental in rental_list:
-            if rental.returned_date is not None:
-                if rental.returned_date > available_date:
-                    available_date = rental.returned_date
-            else:
-                return False
-
-        if available_date < rented_date:
-            return True
-        else:
-            return False
+        available_date = self.rental_repo.movie_rented_until(movie_id)
+        return available_date is None or available_date < rented_date
+
+    def available_movies(self, start, end):
+        """
+        Finds the movies that are not rented on any day between two dates
+        Every movie is checked with a binary search in the rental intervals of that movie, the rental history
+        is not walked through
+        Args:
+            start: first day - date
+            end: last day - date
+
+        Returns: list of Movie
+        """
+        return [movie for movie in self.movie_repo.list if self.rental_repo.is_movie_free(movie.id, start, end)]
+
+    def next_free_window(self, movie_id, after, days):
+        """
+        Finds the first day from which the movie is not rented for a number of days
+        Args:
+            movie_id: id of the movie - string
+            after: earliest day - date
+            days: number of days - int
+
+        Returns: date, None if the movie is not returned yet and not free before its rental
+        Raises MovieCollectionError if the movie is not found
+        """
+        if not self.movie_repo.find_movie(movie_id):
+            raise MovieCollectionError("Movie not found")
+        return self.rental_repo.next_free_window(movie_id, after, days)
 
     def rent_movie(self, movie_id, client_id, rented_date, due_date):
         """
@@ -127,7 +145,7 @@ class RentalService:
         elif not self.is_movie_available(movie_id, rented_date):
             raise RentalServiceError("Movie not available yet")
         else:
-            rental_id = movie_id + client_id + str(rented_date) + str(due_date)
+            rental_id = RentalKey(movie_id, client_id, rented_date, due_date)
             rental = Rental(movie_id, client_id, rented_date, due_date)
             op = Operation(FunctionCall(self.rental_repo.remove_rental, rental_id),
                            FunctionCall(self.rental_repo.add_rental, rental))
@@ -152,14 +170,13 @@ class RentalService:
 
         """
 
-        rental_id = movie_id + client_id + str(rented_date) + str(due_date)
+        rental_id = RentalKey(movie_id, client_id, rented_date, due_date)
         rental = self.rental_repo.find_rental_by_id(rental_id)
         if rental:
-            rental.returned_date = returned_date
+            self.rental_repo.update_rental_returned_date(rental_id, returned_date)
             if returned_date > due_date:
-                client = self.client_repo.find_client(client_id)
-                if client:
-                    client.worthy = False
+                if self.client_repo.find_client(client_id):
+                    self.client_repo.update_client_worthy(client_id, False)
                 else:
                     raise ClientBaseError("Client that returned not found")
 
@@ -182,7 +199,7 @@ class TestsRentalService(unittest.TestCase):
     def tearDown(self):
         self.rs.client_repo.remove_client('213')
         self.rs.movie_repo.remove_movie('566')
-        self.rs.rental_repo.remove_rental('566'+'213'+str(date(3, 2, 3))+str(date(3, 3, 10)))
+        self.rs.rental_repo.remove_rental(RentalKey('566', '213', date(3, 2, 3), date(3, 3, 10)))
 
     def test_is_client_worthy(self):
         rs = RentalService()
@@ -199,7 +216,7 @@ class TestsRentalService(unittest.TestCase):
         rs.movie_repo.add_movie(Movie('567', 'Cars', 'LIFE', 'animation, adventure'))
         rs.rental_repo.add_rental(Rental('567', '214', date(2, 2, 2), date(2, 2, 11), date(2, 2, 9)))
         rs.rent_movie('567', '214', date(3,2,3), date(3,3,10))
-        rid = '567' + '214' + str(date(3,2,3)) + str(date(3,3,10))
+        rid = RentalKey('567', '214', date(3,2,3), date(3,3,10))
         self.assertEqual(rs.rental_repo.find_rental_by_id(rid).due_date, date(3,3,10))
         rs.undo_service.undo()
         self.assertFalse(rs.rental_repo.find_rental_by_id(rid))
@@ -207,9 +224,23 @@ class TestsRentalService(unittest.TestCase):
         self.assertEqual(rs.rental_repo.find_rental_by_id(rid).due_date, date(3, 3, 10))
 
     def test_return_movie(self):
-        rid = '566' + '213' + str(date(3, 2, 3)) + str(date(3, 3, 10))
+        rid = RentalKey('566', '213', date(3, 2, 3), date(3, 3, 10))
         self.assertEqual(self.rs.rental_repo.find_rental_by_id(rid).returned_date, date(3, 3, 11))
         self.rs.undo_service.undo()
         self.assertEqual(self.rs.rental_repo.find_rental_by_id(rid).returned_date, None)
         self.rs.undo_service.redo()
         self.assertEqual(self.rs.rental_repo.find_rental_by_id(rid).returned_date, date(3, 3, 11))
+
+    def test_available_movies(self):
+        self.rs.movie_repo.add_movie(Movie('567', 'Planes', 'LIFE', 'animation'))
+        self.rs.rental_repo.add_rental(Rental('567', '213', date(3, 4, 1), date(3, 4, 10)))
+        result = self.rs.available_movies(date(3, 3, 12), date(3, 3, 30))
+        self.assertEqual([movie.id for movie in result], ['566', '567'])
+        result = self.rs.available_movies(date(3, 3, 1), date(3, 4, 1))
+        self.assertEqual(result, [])
+        self.assertEqual(self.rs.next_free_window('566', date(3, 3, 1), 5), date(3, 3, 12))
+        self.assertIsNone(self.rs.next_free_window('567', date(3, 3, 20), 20))
+        with self.assertRaises(MovieCollectionError):
+            self.rs.next_free_window('1', date(3, 3, 1), 5)
+        self.rs.rental_repo.remove_rental(RentalKey('567', '213', date(3, 4, 1), date(3, 4, 10)))
+        self.rs.movie_repo.remove_movie('567')
@@ -5,6 +5,8 @@ from domain.Movie import Movie
 from domain.Rental import Rental
 from repository.ClientBase import ClientBase
 from repository.MovieCollection import MovieCollection
+from repository.Query import Query
+from repository.QueryCache import cached, QueryCache
 from repository.RentalHistory import RentalHistory
 from service.RentalService import RentalService
 from datetime import date
@@ -15,20 +17,52 @@ class StatisticsService(RentalService):
     StatisticsService class implements statistics functions
     Attributes:
          RentalService attributes
+         cache: results of the statistics, computed again only after the repositories change - QueryCache
 
     Methods:
         most_rented_movies
         most_active_clients
         late_rentals
+        most_common_genres
 
     """
 
     def __init__(self, client_base, movie_collection, rental_history):
         super().__init__(client_base, movie_collection, rental_history)
+        self._cache = QueryCache()
 
-    def most_rented_movies(self):
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def version(self):
+        """
+        The versions of the repositories the statistics are computed from, changing after any of them changes
+        """
+        return self.client_repo.version, self.movie_repo.version, self.rental_repo.version
+
+    @staticmethod
+    def ranking(days, name, limit=None):
+        """
+        Orders the entries descending by their number of days, keeping only the first limit ones in a heap
+        Arguments:
+            days: number of days for every id - dict
+            name: function giving the name displayed for an id - function
+            limit: number of entries wanted, None for all - int
+        Returns: list of MovieRentedDays
+
+        """
+        entries = Query(days.items()).order_by(lambda entry: entry[1], reverse=True).limit(limit)
+        return [MovieRentedDays(name(id), count) for id, count in entries]
+
+    @cached
+    def most_rented_movies(self, limit=None):
         """
         This will provide the list of movies, sorted in descending order of the number of days they were rented.
+        Only the rentals already returned are counted, the days are totalled by the rental repository.
+        Arguments:
+            limit: number of movies wanted, None for all of them - int
         Returns: list of MovieRentedDays
 
         """
@@ -36,22 +70,19 @@ class StatisticsService(RentalService):
         for movie in self.movie_repo.list:
             movie_dict[movie.id] = 0
 
-        for rental in self.rental_repo.list:
-            if rental.rented_date is not None:
-                key = rental.movie_id
-                movie_dict[key] += int((rental.returned_date - rental.rented_date).days)
-
-        result =[]
-        for entry in movie_dict:
-            result.append(MovieRentedDays(self.movie_repo.find_movie(entry).title, movie_dict[entry]))
+        for id, days in self.rental_repo.rented_days_by_movie().items():
+            movie_dict[id] += days
 
-        result.sort(key=lambda x: x.rented_days, reverse=True)
-        return result
+        return self.ranking(movie_dict, lambda id: self.movie_repo.find_movie(id).title, limit)
 
-    def most_active_clients(self):
+    @cached
+    def most_active_clients(self, limit=None):
         """
         This will provide the list of clients, sorted in descending order of the number
         of movie rental days they have (e.g. having 2 rented movies for 3 days each counts as 2 x 3 = 6 days).
+        Only the rentals already returned are counted, the days are totalled by the rental repository.
+        Arguments:
+            limit: number of clients wanted, None for all of them - int
         Returns: list of MovieRentedDays
 
         """
@@ -60,41 +91,43 @@ class StatisticsService(RentalService):
         for client in self.client_repo.list:
             client_dict[client.id] = 0
 
-        for rental in self.rental_repo.list:
-            if rental.rented_date is not None:
-                key = rental.client_id
-                client_dict[key] += int((rental.returned_date - rental.rented_date).days)
+        for id, days in self.rental_repo.rented_days_by_client().items():
+            client_dict[id] += days
 
-        result = []
-        for key in client_dict:
-            result.append(MovieRentedDays(self.client_repo.find_client(key).name, client_dict[key]))
-        result.sort(key=lambda x: x.rented_days, reverse=True)
-        return result
+        return self.ranking(client_dict, lambda id: self.client_repo.find_client(id).name, limit)
 
-    def late_rentals(self, today):
+    @cached
+    def late_rentals(self, today, limit=None):
         """
-        This will provide the list of all the movies that are currently rented, for which the due date for return
-        has passed, sorted in descending order of the number of days of delay.
+        This will provide the list of the movies, sorted in descending order of the days their rentals were late
+        until today: a rental returned after its due date counts the days until it was returned, a rental not returned
+        yet the days until today.
         Arguments:
             today: date from which the delay from due date is calculated - datetime.date
-        Returns:
+            limit: number of movies wanted, None for all of them - int
+        Returns: list of MovieRentedDays
 
         """
         movie_dict = {}
         for movie in self.movie_repo.list:
             movie_dict[movie.id] = 0
 
-        for rental in self.rental_repo.list:
-            if rental.rented_date is not None:
-                key = rental.movie_id
-                movie_dict[key] += int((today - rental.due_date).days)
+        for id, days in self.rental_repo.late_days_by_movie(today).items():
+            movie_dict[id] += days
 
-        result = []
-        for entry in movie_dict:
-            result.append(MovieRentedDays(self.movie_repo.find_movie(entry).title, movie_dict[entry]))
+        return self.ranking(movie_dict, lambda id: self.movie_repo.find_movie(id).title, limit)
 
-        result.sort(key=lambda x: x.rented_days, reverse=True)
-        return result
+
+    @cached
+    def most_common_genres(self, limit=None):
+        """
+        This will provide the list of genre tags, sorted in descending order of the number of movies having them.
+        Arguments:
+            limit: number of genres wanted, None for all of them - int
+        Returns: list of MovieRentedDays
+
+        """
+        return self.ranking(self.movie_repo.genre_counts(), lambda tag: tag, limit)
 
 
 class MovieRentedDays:
@@ -146,11 +179,45 @@ class TestStatisticsService(TestCase):
     def test_most_rented_movies(self):
         result = self.ss.most_rented_movies()
         self.assertEqual(result[0].rental_id, 'Expandables II')
+        self.assertEqual(len(result), 5)
+        result = self.ss.most_rented_movies(limit=2)
+        self.assertEqual([entry.rental_id for entry in result], ['Expandables II', 'Transformers'])
+        self.ss.rental_repo.add_rental(Rental('123', '964', date(2, 3, 1), date(2, 3, 10)))
+        self.assertEqual(self.ss.most_rented_movies()[1].rented_days, 18)
 
     def test_most_active_client(self):
         result = self.ss.most_active_clients()
         self.assertEqual(result[0].rental_id, 'Gelu')
+        result = self.ss.most_active_clients(limit=1)
+        self.assertEqual([entry.rental_id for entry in result], ['Gelu'])
 
     def test_late_rentals(self):
         result = self.ss.late_rentals(date(2,3,1))
-        self.assertEqual(result[0].rental_id, 'Expandables II')
\ No newline at end of file
+        self.assertEqual(result[0].rental_id, 'Expandables II')
+        self.assertEqual(len(self.ss.late_rentals(date(2, 3, 1), limit=3)), 3)
+        self.assertEqual([(entry.rental_id, entry.rented_days) for entry in result[:2]],
+                         [('Expandables II', 16), ('Expandables', 2)])
+        self.ss.rental_repo.add_rental(Rental('566', '964', date(2, 2, 25), date(2, 2, 27)))
+        self.assertEqual(self.ss.late_rentals(date(2, 3, 1))[2].rental_id, 'Cars')
+        self.assertEqual(self.ss.late_rentals(date(2, 2, 27))[0].rental_id, 'Expandables II')
+
+    def test_most_common_genres(self):
+        result = self.ss.most_common_genres()
+        self.assertEqual((result[0].rental_id, result[0].rented_days), ('action', 4))
+        self.assertEqual(sorted((entry.rental_id, entry.rented_days) for entry in result[1:]),
+                         [('adventure', 1), ('animation', 1)])
+        self.assertEqual(len(self.ss.most_common_genres(limit=1)), 1)
+
+    def test_cache(self):
+        self.assertEqual(self.ss.most_rented_movies(limit=1)[0].rental_id, 'Expandables II')
+        self.assertEqual(self.ss.most_rented_movies(limit=1)[0].rental_id, 'Expandables II')
+        self.assertEqual((self.ss.cache.hits, self.ss.cache.misses), (1, 1))
+        self.ss.movie_repo.add_movie(Movie('1', 'Up', 'UP', 'animation'))
+        self.ss.rent_movie('1', '964', date(2, 1, 1), date(2, 3, 1))
+        self.ss.return_movie('1', '964', date(2, 1, 1), date(2, 3, 1), date(2, 3, 1))
+        self.assertEqual(self.ss.most_rented_movies(limit=1)[0].rental_id, 'Up')
+        self.ss.undo_service.undo()
+        self.ss.undo_service.undo()
+        self.ss.movie_repo.remove_movie('1')
+        self.assertEqual(self.ss.most_rented_movies(limit=1)[0].rental_id, 'Expandables II')
+        self.assertEqual((self.ss.cache.hits, self.ss.cache.misses), (1, 3))
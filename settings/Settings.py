@@ -7,7 +7,8 @@ class Settings:
 
     def repository_type(self):
         """
-        Gets the repository type
+        Gets the repository type: 'inmemory', 'text', 'binary', 'columnar' (binary, with the rentals kept in
+        columns), 'mapped' (binary, with the rentals in a memory-mapped file) or 'sqlite'
         Returns: type of repo - string
 
         """
@@ -65,6 +66,19 @@ class Settings:
             line = f.readline()
         f.close()
 
+    def flush_policy(self):
+        """
+        Gets when the file repos save their changes: 'immediate', 'every <changes>', 'interval <milliseconds>'
+        or 'manual'
+        Returns: the flush policy, None if not set - string
+
+        """
+        with open(self.file_name, "r") as f:
+            for line in f:
+                tokens = line.strip().split('=')
+                if tokens[0] == 'flush':
+                    return str(tokens[1])
+        return None
 
 # s = settings()
 # print(s.client_file())